@@ -0,0 +1 @@
+const f={};export function mapsheetUrl(n){return "mapsheet/"+(f[n]??n);}
\ No newline at end of file
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate_mapsheet import generateMapsheet
+
+#Runs compile_mapsheet.py on synthetic mapsheets of several sizes and records how long each stage takes and how much memory the compilation needs, to see how the compiler scales and to catch performance regressions
+
+#Use paths relative to the current script
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+scales = {    #Name: (width, height, paths, vertices), see generate_mapsheet.py
+    "small": (80, 60, 30, 120),
+    "medium": (160, 120, 100, 400),
+    "large": (250, 180, 300, 800)    #About the size of the real mapsheet
+}
+
+def runCompiler(svg: str, compilerArgs: list[str]) -> dict:
+    #Compiles the mapsheet in a temporary copy of the folder structure that compile_mapsheet.py writes to, the stages are timed by compile_mapsheet.py itself with --profile
+    with tempfile.TemporaryDirectory() as folder:
+        os.makedirs(os.path.join(folder, "mapsheet"))
+        os.makedirs(os.path.join(folder, "build", "model", "mapsheet"))
+        os.makedirs(os.path.join(folder, "build", "view", "init"))
+        shutil.copy("compile_mapsheet.py", os.path.join(folder, "mapsheet"))
+        with open(os.path.join(folder, "mapsheet", "azimuthal_projection.svg"), "w", encoding="utf-8") as file:
+            file.write(svg)
+
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(folder, "mapsheet", "compile_mapsheet.py"), "--profile", "profile.json"] + compilerArgs, stdout = subprocess.DEVNULL)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peakMemory = usage.ru_maxrss / 1024 if sys.platform != "darwin" else usage.ru_maxrss / 1024 ** 2    #In MiB, ru_maxrss is in KiB except on macOS where it's in bytes
+        else:
+            process.wait()
+            peakMemory = None
+        end = time.perf_counter()
+        if process.returncode != 0:
+            raise RuntimeError("compile_mapsheet.py failed with exit code {}".format(process.returncode))
+        with open(os.path.join(folder, "mapsheet", "profile.json"), "r", encoding="utf-8") as file:
+            profile = json.load(file)
+    return {"wallTime": end - start, "cpuTime": profile["cpuTime"], "peakMemory": peakMemory, "stages": profile["stages"]}
+
+def compareResults(results: dict, baseline: dict, tolerance: float) -> bool:
+    #Prints how the results compare to the baseline and returns whether everything is within the tolerance
+    withinTolerance = True
+    for name, result in results["scales"].items():
+        if name not in baseline["scales"]:
+            continue
+        baselineResult = baseline["scales"][name]
+        comparisons = [("wall time", result["wallTime"], baselineResult["wallTime"]), ("peak memory", result["peakMemory"], baselineResult["peakMemory"])]
+        comparisons += [(stage, counters["wallTime"], baselineResult["stages"].get(stage, {}).get("wallTime")) for stage, counters in result["stages"].items()]
+        for what, value, baselineValue in comparisons:
+            if value is None or not baselineValue:
+                continue
+            ratio = value / baselineValue
+            if ratio > 1 + tolerance and (what == "peak memory" or value - baselineValue > 0.05):    #Ignore very short stages, they vary too much
+                withinTolerance = False
+                print("Regression in {} {}: {:.3g} instead of {:.3g} ({:+.0%})".format(name, what, value, baselineValue, ratio - 1))
+            elif what in ["wall time", "peak memory"]:
+                print("{} {}: {:.3g} instead of {:.3g} ({:+.0%})".format(name, what, value, baselineValue, ratio - 1))
+    return withinTolerance
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmarks compile_mapsheet.py on synthetic mapsheets of different sizes.", epilog = "Arguments after -- are passed on to compile_mapsheet.py.")
+    parser.add_argument("--scales", nargs = "+", choices = scales.keys(), default = list(scales.keys()), help = "the mapsheet sizes to benchmark (default: all)")
+    parser.add_argument("--repeat", type = int, default = 1, help = "the number of times to compile each mapsheet, the fastest time is kept (default: 1)")
+    parser.add_argument("--output", help = "the JSON file to write the results to, relative to the mapsheet folder (default: benchmark_baseline.json, or nothing with --compare)")
+    parser.add_argument("--compare", metavar = "BASELINE", help = "compare the results to a previous output file (relative to the mapsheet folder) and exit with status 1 if something is slower or uses more memory than the tolerance allows")
+    parser.add_argument("--tolerance", type = float, default = 0.25, help = "how much slower or bigger than the baseline counts as a regression, as a fraction (default: 0.25)")
+    args, compilerArgs = parser.parse_known_args()
+    if compilerArgs[:1] == ["--"]:
+        compilerArgs = compilerArgs[1:]
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "compilerArgs": compilerArgs,
+        "scales": {}
+    }
+    for name in args.scales:
+        width, height, paths, vertices = scales[name]
+        svg = generateMapsheet(width, height, paths, vertices)
+        runs = [runCompiler(svg, compilerArgs) for i in range(args.repeat)]
+        result = min(runs, key = lambda it: it["wallTime"])
+        results["scales"][name] = {"width": width, "height": height, "paths": paths, "vertices": vertices, "svgSize": len(svg)} | result
+        print("{}: {}x{} hexes, {} paths, {:.2f} s, {} MiB".format(name, width, height, paths, result["wallTime"], "?" if result["peakMemory"] is None else round(result["peakMemory"])))
+        for stage, counters in result["stages"].items():
+            print("    {}: {:.2f} s".format(stage, counters["wallTime"]))
+
+    if args.output is not None or args.compare is None:
+        with open(args.output or "benchmark_baseline.json", "w", encoding="utf-8") as file:
+            json.dump(results, file, indent = 4)
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if not compareResults(results, baseline, args.tolerance):
+            sys.exit(1)
@@ -1,19 +1,37 @@
 from __future__ import annotations
 
+import argparse
+import cProfile
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
 import numpy as np
 import os
+import pickle
 import re
+import time
+import traceback
 import xml.etree.ElementTree as XML
 
-from copy import copy
-from svg.path import parse_path, Line, Close    #If this doesn't work, do pip install svg.path
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from math import ceil, floor
+from typing import IO
+from svg.path import parse_path, Arc, Close, CubicBezier, Line, Move, QuadraticBezier    #If this doesn't work, do pip install svg.path
 
 #Don't use typechecking for performance reasons (otherwise to typecheck use from typeguard import typechecked and then add @typechecked before each function and class)
 
-#Use paths relative to the current script
-os.chdir(os.path.dirname(os.path.abspath(__file__)))
-
 zoom = 3    #When changing this, also change it in mapsheet.css
+levelsOfDetail = [8, 32, 128, 512]    #The widths of a hex in screen pixels up to which each level of detail of the world map is shown, the paths of each level are at most half a pixel off at that width
+fileHashLength = 12    #The number of hex digits of the hash in the output file names with --hashed-names
+landmarkCount = 8    #The number of landmarks for each of the land and sea distance tables in landmarks.bin, each one adds 2 bytes per hex and table
+canals = [((105, 86), (106, 86)), ((162, 169), (163, 169)), ((173, 200), (173, 201))]    #Panama Canal, Kiel Canal and Suez Canal, written to create-hexes.js for Hex.adjacentSeaHexes in hex.ts so that this is the only list of them
+sideOffsets = [    #The x and y offsets of the hex across each side (0=top, 1=top left, 2=bottom left, 3=bottom, 4=bottom right, 5=top right)
+    [(0, -1), (-1, -1), (-1, 0), (0, 1), (1, 0), (1, -1)],    #Even columns
+    [(0, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0)]       #Odd columns, which are half a hex lower
+]
 
 def pointInsidePolygon(point: complex, polygon: list[complex]) -> bool:
     x = point.real
@@ -30,19 +48,155 @@ def pointInsidePolygon(point: complex, polygon: list[complex]) -> bool:
             inside = not inside
     return inside
 
-def lineEquation(line: Line) -> tuple[float, float]:
-    slope = (line.start.imag - line.end.imag) / (line.start.real - line.end.real)
-    intercept = line.start.imag - slope * line.start.real
-    return slope, intercept
+pointsTested = 0    #The number of points that pointsInsidePolygon and PreparedPolygon have tested in this process, for the profiler
+
+def pointsInsidePolygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    #Same algorithm as pointInsidePolygon, but tests all the points against all the edges of the polygon at once with NumPy. The arithmetic is done in the same order as in pointInsidePolygon so that the results are exactly the same.
+    global pointsTested
+    points = np.asarray(points, dtype=complex)
+    pointsTested += len(points)
+    polygon = np.asarray(polygon, dtype=complex)
+    xi = polygon.real
+    yi = polygon.imag
+    xj = np.roll(xi, 1)    #Vertex i - 1, like j in pointInsidePolygon
+    yj = np.roll(yi, 1)
+    result = np.empty(len(points), dtype=bool)
+    chunkSize = max(1, 1_000_000 // max(1, len(polygon)))    #Limit the size of the temporary points × edges arrays so that memory usage stays reasonable for big continents
+    for start in range(0, len(points), chunkSize):
+        chunk = points[start:start + chunkSize]
+        x = chunk.real[:, np.newaxis]
+        y = chunk.imag[:, np.newaxis]
+        with np.errstate(divide="ignore", invalid="ignore"):    #Horizontal edges divide by zero, but those are never counted since the first condition is false for them
+            intersect = ((yi > y) != (yj > y)) & (x < (xj - xi) * (y - yi) / (yj - yi) + xi)
+        result[start:start + chunkSize] = np.count_nonzero(intersect, axis=1) % 2 == 1
+    return result
+
+class PreparedPolygon:
+    #A polygon with its edges sorted into horizontal slabs, for testing many points against a big polygon such as a continent. A point can only be on the same height as the edges in its slab, and the other edges never count as crossings in pointInsidePolygon, so only those edges need to be tested. Gives exactly the same results as pointInsidePolygon.
+    #The polygon can have several rings, like the subpaths of a compound path. Each ring is closed on its own and the rings aren't joined to each other, so a point is inside if it's inside an odd number of rings.
+    xi: np.ndarray
+    yi: np.ndarray
+    xj: np.ndarray
+    yj: np.ndarray
+    minY: float
+    slabHeight: float
+    slabCount: int
+    slabOffsets: np.ndarray    #The edges in slab i are slabEdges[slabOffsets[i]:slabOffsets[i + 1]]
+    slabEdges: np.ndarray
+
+    edgesPerSlab = 4    #On average, an edge is in more than one slab if it's long
+
+    def __init__(this, polygon: np.ndarray, ringStarts: Sequence[int] = (0,)):
+        #ringStarts is the index of the first vertex of each ring
+        polygon = np.asarray(polygon, dtype=complex)
+        previousVertices = np.arange(len(polygon)) - 1    #Vertex i - 1, like j in pointInsidePolygon, except that the first vertex of a ring comes after the last vertex of the same ring
+        previousVertices[list(ringStarts)] = np.append(ringStarts[1:], len(polygon)) - 1
+        this.xi = polygon.real
+        this.yi = polygon.imag
+        this.xj = this.xi[previousVertices]
+        this.yj = this.yi[previousVertices]
+        this.slabCount = max(1, len(polygon) // PreparedPolygon.edgesPerSlab)
+        this.minY = float(this.yi.min())
+        this.slabHeight = (float(this.yi.max()) - this.minY) / this.slabCount or 1.0
+
+        #Each edge goes in every slab between its ends, except horizontal edges which are never crossings
+        firstSlabs = this.slabIndices(np.minimum(this.yi, this.yj))
+        slabSpans = np.where(this.yi != this.yj, this.slabIndices(np.maximum(this.yi, this.yj)) - firstSlabs + 1, 0)
+        edges = np.repeat(np.arange(len(polygon)), slabSpans)
+        slabs = np.repeat(firstSlabs, slabSpans) + np.arange(len(edges)) - np.repeat(np.cumsum(slabSpans) - slabSpans, slabSpans)
+        order = np.argsort(slabs, kind="stable")
+        this.slabEdges = edges[order]
+        this.slabOffsets = np.searchsorted(slabs[order], np.arange(this.slabCount + 1))
+
+    def slabIndices(this, ys: np.ndarray) -> np.ndarray:
+        #Points above or below the polygon are put in the first or last slab, where no edge counts as a crossing for them
+        return np.clip(np.floor((ys - this.minY) / this.slabHeight), 0, this.slabCount - 1).astype(int)
+
+    def containsPoints(this, points: np.ndarray) -> np.ndarray:
+        #Same as pointsInsidePolygon, the arithmetic for each point and edge is the same
+        global pointsTested
+        points = np.asarray(points, dtype=complex)
+        pointsTested += len(points)
+        slabs = this.slabIndices(points.imag)
+        edgeCounts = this.slabOffsets[slabs + 1] - this.slabOffsets[slabs]
+        pointIndices = np.repeat(np.arange(len(points)), edgeCounts)
+        edges = this.slabEdges[np.repeat(this.slabOffsets[slabs] - (np.cumsum(edgeCounts) - edgeCounts), edgeCounts) + np.arange(len(pointIndices))]
+        x = points.real[pointIndices]
+        y = points.imag[pointIndices]
+        xi, yi, xj, yj = this.xi[edges], this.yi[edges], this.xj[edges], this.yj[edges]
+        intersect = ((yi > y) != (yj > y)) & (x < (xj - xi) * (y - yi) / (yj - yi) + xi)    #Horizontal edges aren't in any slab, so this never divides by zero
+        return np.bincount(pointIndices[intersect], minlength=len(points)) % 2 == 1
+
+def offsetLines(starts: np.ndarray, ends: np.ndarray, distance: float, isClosed: bool) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Moves the lines of a weather zone border to both sides and joins the moved lines with miters, returns the two resulting polylines.
+    Line i is moved by ±distance × (m, 1) / √(m² + 1) where m is its slope, with the sign alternating from one line to the next. The borders follow hexsides, and for those this keeps all the moved lines on the same side of the border.
+    The slope isn't calculated, so vertical lines work too (they're moved like lines that lean very slightly to the right). Where consecutive moved lines are parallel and have no single intersection, both the end of the previous line and the start of the next one are used.
+    """
+    directions = ends - starts
+    lengths = np.abs(directions)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unitOffsets = np.where(lengths > 0, (np.where(directions.real < 0, -directions.imag, directions.imag) + 1j * np.abs(directions.real)) / lengths, 0)    #(m, 1) / √(m² + 1) without dividing by the x difference
+    previousStarts = np.roll(starts, 1)
+    previousDirections = np.roll(directions, 1)
+    cross = (previousDirections.conjugate() * directions).imag
+    isParallel = np.abs(cross) <= 1e-12 * lengths * np.roll(lengths, 1)
+    polylines = []
+    for side in range(2):
+        signs = (-1.0) ** (np.arange(len(starts)) + side)
+        movedStarts = starts + signs * distance * unitOffsets
+        movedPreviousStarts = previousStarts - signs * distance * np.roll(unitOffsets, 1)    #The previous line is moved to the other side than the line itself, which also applies to the last line before the first one of a closed path
+        #Closed-form intersection of each moved line with the moved previous line
+        with np.errstate(divide="ignore", invalid="ignore"):
+            miters = movedPreviousStarts + previousDirections * ((movedStarts - movedPreviousStarts).conjugate() * directions).imag / cross
+        corners = np.stack((np.where(isParallel, movedPreviousStarts + previousDirections, miters), np.where(isParallel, movedStarts, np.nan)), axis=1)
+        if not isClosed:
+            corners[0] = movedStarts[0], np.nan
+        corners = corners.reshape(-1)
+        corners = corners[~np.isnan(corners)]
+        if not isClosed:
+            corners = np.append(corners, movedStarts[-1] + directions[-1])
+        polylines.append(corners)
+    return polylines[0], polylines[1]
+
+class LineIndex:
+    #Finds lines whose endpoints are both within epsilon of a line's endpoints, in either direction, without comparing with every line. Lines are put in buckets keyed on their snapped endpoints, with cells 2 epsilon wide so that the points within epsilon of a point are in at most 2 cells along each axis.
+    lines: list[Line]
+    epsilon: float
+    buckets: defaultdict[tuple[tuple[int, int], tuple[int, int]], list[int]]
 
-def lineIntersection(l1: Line, l2: Line) -> complex:
-    slope1, intercept1 = lineEquation(l1)
-    slope2, intercept2 = lineEquation(l2)
-    matrix = np.array([[-slope1, 1],
-                       [-slope2, 1]])
-    interceptVector = np.array([intercept1, intercept2])
-    solutionVector = np.linalg.inv(matrix) @ interceptVector
-    return complex(solutionVector[0], solutionVector[1])
+    def __init__(this, epsilon: float, lines: Iterable[Line] = ()):
+        this.lines = []
+        this.epsilon = epsilon
+        this.buckets = defaultdict(list)
+        for line in lines:
+            this.add(line)
+
+    def cell(this, point: complex) -> tuple[int, int]:
+        cellSize = 2 * this.epsilon
+        return floor(point.real / cellSize), floor(point.imag / cellSize)
+
+    def nearbyCells(this, point: complex) -> set[tuple[int, int]]:
+        cellSize = 2 * this.epsilon
+        xs = {floor((point.real + dx) / cellSize) for dx in [-this.epsilon, 0, this.epsilon]}
+        ys = {floor((point.imag + dy) / cellSize) for dy in [-this.epsilon, 0, this.epsilon]}
+        return {(x, y) for x in xs for y in ys}
+
+    def add(this, line: Line) -> None:
+        startCell, endCell = this.cell(line.start), this.cell(line.end)
+        this.buckets[min(startCell, endCell), max(startCell, endCell)].append(len(this.lines))
+        this.lines.append(line)
+
+    def linesAreEqual(this, l1: Line, l2: Line) -> bool:
+        epsilon = this.epsilon
+        return (abs(l1.start - l2.start) < epsilon and abs(l1.end - l2.end) < epsilon) or (abs(l1.start - l2.end) < epsilon and abs(l1.end - l2.start) < epsilon)
+
+    def find(this, line: Line) -> int | None:
+        #Returns the first matching line like a linear search would, so that the result doesn't depend on the order of the buckets
+        startCells, endCells = this.nearbyCells(line.start), this.nearbyCells(line.end)
+        keys = {(min(startCell, endCell), max(startCell, endCell)) for startCell in startCells for endCell in endCells}
+        matches = [i for key in keys if key in this.buckets for i in this.buckets[key] if this.linesAreEqual(line, this.lines[i])]
+        return min(matches) if len(matches) > 0 else None
 
 def booleanToMinifiedString(b: bool) -> str:
     return "!0" if b else "!1"
@@ -52,55 +206,88 @@ def booleanListToMinifiedString(bl: list[bool]) -> str:
         return "a"    #a and f are defined as these arrays in the Javascript function to save space
     elif bl == [False] * 6:
         return "f"
-    result = "["
-    for b in bl:
-        result += booleanToMinifiedString(b) + ","
-    result = result[:-1]    #Remove the extra comma at the end
-    result += "]"
-    return result
+    return "[" + ",".join(booleanToMinifiedString(b) for b in bl) + "]"
+
+def booleanColumn(name: str) -> property:
+    #An attribute of Hex that is stored in a boolean column of the grid
+    def get(hex: Hex) -> bool:
+        return bool(getattr(hex.grid, name)[hex.index])
+    def set(hex: Hex, value: bool) -> None:
+        getattr(hex.grid, name)[hex.index] = value
+    return property(get, set)
+
+def codedColumn(name: str, valuesName: str) -> property:
+    #An attribute of Hex that is stored in a column of the grid as indices in the list of possible values, new values are added to the list
+    def get(hex: Hex) -> str | None:
+        return getattr(hex.grid, valuesName)[getattr(hex.grid, name)[hex.index]]
+    def set(hex: Hex, value: str | None) -> None:
+        values = getattr(hex.grid, valuesName)
+        if value not in values:
+            values.append(value)
+        getattr(hex.grid, name)[hex.index] = values.index(value)
+    return property(get, set)
+
+def sparseColumn(name: str, default: object) -> property:
+    #An attribute of Hex that only a few hexes have, stored in a dictionary of the grid by the index of the hex
+    def get(hex: Hex) -> object:
+        return getattr(hex.grid, name).get(hex.index, default)
+    def set(hex: Hex, value: object) -> None:
+        getattr(hex.grid, name)[hex.index] = value
+    return property(get, set)
+
+def sidesColumn(name: str) -> property:
+    #An attribute of Hex that is a list of one bool for each side, stored in the grid as a bit mask where bit i is side i. The list is a copy, so changes to it need to be assigned back to the attribute.
+    def get(hex: Hex) -> list[bool]:
+        mask = int(getattr(hex.grid, name)[hex.index])
+        return [mask >> side & 1 == 1 for side in range(6)]
+    def set(hex: Hex, value: list[bool]) -> None:
+        getattr(hex.grid, name)[hex.index] = sum(1 << side for side in range(6) if value[side])
+    return property(get, set)
 
 class Hex:
-    x: int
-    y: int
-    isLand: bool = False
-    isSea: bool = True
-    terrain: str = "Clear"
-    weatherZone: str = "Fair"
-    isIcecap: bool = False
-    canUseRail: bool = False
-    country: str | None = None
-    isColony: bool = False
-    isResourceHex: bool = False
-    isCapital: bool = False
-    isEnclaveCity: bool = False
-    isMajorPort: bool = False
-    isIndia: bool = False
-    secondaryController: str | None = None
-    city: str | None = None
-    cityAlignment: str = "right"
-    cityOffset: tuple[float, float] = (0, 0)
-    adjacentLandHexes: list[bool]
-    adjacentSeaHexes: list[bool]
-    vertices: list[complex]
-    center: complex
-
-    def __init__(this, x: int, y: int):
-        this.x = x
-        this.y = y
-        #0=top, 1=top left, 2=bottom left, 3=bottom, 4=bottom right, 5=top right
-        this.adjacentLandHexes = [False] * 6
-        this.adjacentSeaHexes = [True] * 6
-        #0=top left, 1=left, 2=bottom left, 3=bottom right, 4=right, 5=top right
-        yOffset = (this.x % 2) * 0.5
-        this.vertices = [
-            complex(minX + (this.x + 1/3) * hexWidth, minY + (this.y + yOffset) * hexHeight),
-            complex(minX + this.x * hexWidth, minY + (this.y + yOffset + 0.5) * hexHeight),
-            complex(minX + (this.x + 1/3) * hexWidth, minY + (this.y + yOffset + 1) * hexHeight),
-            complex(minX + (this.x + 1) * hexWidth, minY + (this.y + yOffset + 1) * hexHeight),
-            complex(minX + (this.x + 4/3) * hexWidth, minY + (this.y + yOffset + 0.5) * hexHeight),
-            complex(minX + (this.x + 1) * hexWidth, minY + (this.y + yOffset) * hexHeight)
-        ]
-        this.center = complex(minX + (this.x + 2/3) * hexWidth, minY + (this.y + 1) * hexHeight)
+    #A view of the hex at the given index of the grid, which stores the hexes in NumPy columns. It's only two references so it can be created whenever it's needed.
+    __slots__ = ("grid", "index")
+    grid: Grid
+    index: int
+
+    isLand = booleanColumn("isLand")
+    isSea = booleanColumn("isSea")
+    terrain = codedColumn("terrain", "terrainTypes")
+    weatherZone = codedColumn("weatherZone", "weatherZones")
+    canUseRail = booleanColumn("canUseRail")
+    country = codedColumn("country", "countries")
+    isColony = booleanColumn("isColony")
+    isResourceHex = booleanColumn("isResourceHex")
+    isCapital = booleanColumn("isCapital")
+    isEnclaveCity = booleanColumn("isEnclaveCity")
+    isMajorPort = booleanColumn("isMajorPort")
+    isIndia = booleanColumn("isIndia")
+    secondaryController = codedColumn("secondaryController", "countries")
+    city = sparseColumn("city", None)
+    cityAlignment = sparseColumn("cityAlignment", "right")
+    cityOffset = sparseColumn("cityOffset", (0, 0))
+    adjacentLandHexes = sidesColumn("adjacentLandHexes")
+    adjacentSeaHexes = sidesColumn("adjacentSeaHexes")
+
+    def __init__(this, grid: Grid, index: int):
+        this.grid = grid
+        this.index = index
+
+    @property
+    def x(this) -> int:
+        return this.index // this.grid.height
+
+    @property
+    def y(this) -> int:
+        return this.index % this.grid.height
+
+    @property
+    def vertices(this) -> np.ndarray:
+        return this.grid.vertices[this.index]
+
+    @property
+    def center(this) -> complex:
+        return complex(this.grid.centers[this.index])
 
     def completeTerrain(this) -> str:
         if this.terrain == "Icecap":
@@ -161,58 +348,813 @@ class Hex:
     def canBeInSameLoop(this, otherHexes: list[Hex]) -> bool:
         return len(otherHexes) == 0 or (this.x == otherHexes[0].x and this.toJavascriptConstructorParams() == otherHexes[0].toJavascriptConstructorParams())
 
-    def polygonPassesThrough(this, polygon: list[complex]) -> bool:
-        for point in polygon:
-            if abs(point - this.center) < hexHeight and pointInsidePolygon(point, this.vertices):    #Theoretically the second condition is enough, but the second condition won't be true if the first one isn't and the first condition is a lot faster
-                return True
-        return False
+    def polygonPassesThrough(this, path: Path) -> bool:
+        #Only the points at about the same height as the hex need to be checked, they're found with a binary search in the points sorted by y
+        center = this.center
+        hexHeight = path.grid.hexHeight
+        first, last = np.searchsorted(path.pointYs, [center.imag - hexHeight, center.imag + hexHeight], side="right")
+        nearbyPoints = path.pointsByY[first:last]
+        nearbyPoints = nearbyPoints[np.abs(nearbyPoints - center) < hexHeight]    #Theoretically checking if the points are inside the hex is enough, but they won't be if they're not this close and this check is a lot faster
+        return len(nearbyPoints) > 0 and bool(pointsInsidePolygon(nearbyPoints, this.vertices).any())
 
-    def isInsidePolygon(this, polygon: list[complex]) -> tuple[bool, bool]:
-        passesThrough = this.polygonPassesThrough(polygon)
-        centerInside = pointInsidePolygon(this.center, polygon)
+    def isInsidePolygon(this, path: Path, centerInside: bool) -> tuple[bool, bool]:
+        #centerInside is whether the center of the hex is inside the path, which is faster to find for all the hexes at once
+        passesThrough = this.polygonPassesThrough(path)
         partlyInside = centerInside or passesThrough
         completelyInside = centerInside and not passesThrough
         return (partlyInside, completelyInside)
 
-    def checkWeatherZone(this, weatherZoneName: str, weatherZonePolygons: list[list[complex]]) -> bool:
-        for polygon in weatherZonePolygons:
-            if pointInsidePolygon(this.center, polygon):
-                this.weatherZone = weatherZoneName
-                return True
-        return False
-
     def __repr__(this):
         return "Hex({},{})".format(this.x, this.y)
 
+class HexList(Sequence):
+    #The hexes of a grid, the Hex views are created when they're accessed
+    grid: Grid
+
+    def __init__(this, grid: Grid):
+        this.grid = grid
+
+    def __len__(this) -> int:
+        return this.grid.width * this.grid.height
+
+    def __getitem__(this, index: int) -> Hex:
+        if not 0 <= index < len(this):
+            raise IndexError("Hex index out of range")
+        return Hex(this.grid, index)
+
+    def __iter__(this) -> Iterator[Hex]:
+        return (Hex(this.grid, index) for index in range(len(this)))
+
+class Grid:
+    #The position and size of the hex grid and its hexes, which are stored as one NumPy array (or dictionary for the attributes that only a few hexes have) per attribute of Hex. The hexes are in x-major order, the hex at x, y has the index x * height + y.
+    minX: float
+    minY: float
+    hexWidth: float    #The distance between the far left of one hex and the far left of the next hex. The total width of the hex is this times 4/3 (proof: each angle in a hex is 120°, use this to divide the hex into six equilateral triangles).
+    hexHeight: float    #The total height of a hex
+    resolution: float    #The distance between the points along the paths that are used to find the hexes that the paths pass through
+    width: int
+    height: int
+    hexes: HexList
+    vertices: np.ndarray    #Six complex numbers per hex: 0=top left, 1=left, 2=bottom left, 3=bottom right, 4=right, 5=top right
+    centers: np.ndarray
+    isLand: np.ndarray
+    isSea: np.ndarray
+    terrain: np.ndarray    #Indices in terrainTypes
+    weatherZone: np.ndarray    #Indices in weatherZones
+    canUseRail: np.ndarray
+    country: np.ndarray    #Indices in countries, like secondaryController
+    isColony: np.ndarray
+    isResourceHex: np.ndarray
+    isCapital: np.ndarray
+    isEnclaveCity: np.ndarray
+    isMajorPort: np.ndarray
+    isIndia: np.ndarray
+    secondaryController: np.ndarray
+    city: dict[int, str | None]
+    cityAlignment: dict[int, str]
+    cityOffset: dict[int, tuple[float, float]]
+    adjacentLandHexes: np.ndarray    #Bit i is whether the hex is adjacent across side i: 0=top, 1=top left, 2=bottom left, 3=bottom, 4=bottom right, 5=top right
+    adjacentSeaHexes: np.ndarray
+    latticeVertices: np.ndarray    #Each vertex of the hex grid once, the hexes that share a vertex also share it here
+    hexVertexIds: np.ndarray    #The indices in latticeVertices of the six vertices of each hex
+    hexSideIds: np.ndarray    #The indices of the six hexsides of each hex, the same hexside has the same index in the hexes on both sides of it
+    sideVertexIds: np.ndarray    #The indices in latticeVertices of the two ends of each hexside
+    sideMidpoints: np.ndarray
+    sideHexes: np.ndarray    #The indices of the hexes on both sides of each hexside, or -1 at the edges of the map
+    sideNumbers: np.ndarray    #Which side of those hexes the hexside is
+    terrainTypes: list[str]
+    weatherZones: list[str]
+    countries: list[str | None]
+
+    def __init__(this, minX: float, minY: float, hexWidth: float, hexHeight: float, width: int, height: int):
+        this.minX = minX
+        this.minY = minY
+        this.hexWidth = hexWidth
+        this.hexHeight = hexHeight
+        this.resolution = hexHeight / 5
+        this.width = width
+        this.height = height
+        this.hexes = HexList(this)
+
+        indices = np.arange(width * height)
+        xs = indices // height
+        ys = indices % height
+        yOffsets = (xs % 2) * 0.5
+        this.vertices = np.empty((width * height, 6), dtype=complex)
+        this.vertices.real = minX + np.stack([xs + 1/3, xs, xs + 1/3, xs + 1, xs + 4/3, xs + 1], axis=1) * hexWidth
+        this.vertices.imag = minY + np.stack([ys + yOffsets, ys + yOffsets + 0.5, ys + yOffsets + 1, ys + yOffsets + 1, ys + yOffsets + 0.5, ys + yOffsets], axis=1) * hexHeight
+        this.centers = np.empty(width * height, dtype=complex)
+        this.centers.real = minX + (xs + 2/3) * hexWidth
+        this.centers.imag = minY + (ys + 1) * hexHeight
+
+        #The same defaults as the attributes of Hex used to have
+        for name in ["isLand", "canUseRail", "isColony", "isResourceHex", "isCapital", "isEnclaveCity", "isMajorPort", "isIndia"]:
+            setattr(this, name, np.zeros(width * height, dtype=bool))
+        this.isSea = np.ones(width * height, dtype=bool)
+        this.terrainTypes = ["Clear", "Desert", "Forest", "Mountain", "TallMountain", "Icecap"]
+        this.weatherZones = ["Fair", "Polar", "Industrialized", "NorthTemperate", "Tropical", "SouthTemperate"]
+        this.countries = [None]
+        for name in ["terrain", "weatherZone", "country", "secondaryController"]:
+            setattr(this, name, np.zeros(width * height, dtype=np.uint8))
+        this.city = {}
+        this.cityAlignment = {}
+        this.cityOffset = {}
+        this.adjacentLandHexes = np.zeros(width * height, dtype=np.uint8)
+        this.adjacentSeaHexes = np.full(width * height, 0b111111, dtype=np.uint8)
+
+        #The vertices of neighbouring hexes are at the same multiples of a third of hexWidth horizontally and half of hexHeight vertically, so those identify them
+        vertexColumns = 3 * xs[:, np.newaxis] + np.array([1, 0, 1, 3, 4, 3])
+        vertexRows = 2 * ys[:, np.newaxis] + xs[:, np.newaxis] % 2 + np.array([0, 1, 2, 2, 1, 0])
+        _, firstVertices, vertexIds = np.unique((vertexColumns * (2 * height + 3) + vertexRows).reshape(-1), return_index=True, return_inverse=True)
+        this.latticeVertices = this.vertices.reshape(-1)[firstVertices]
+        this.hexVertexIds = vertexIds.reshape(-1, 6)
+        #Side i is between vertex i - 1 and vertex i, a hexside is identified by its ends
+        sideEnds = np.sort(np.stack((np.roll(this.hexVertexIds, 1, axis=1), this.hexVertexIds), axis=2), axis=2).reshape(-1, 2)
+        _, firstSides, sideIds = np.unique(sideEnds[:, 0] * len(this.latticeVertices) + sideEnds[:, 1], return_index=True, return_inverse=True)
+        this.hexSideIds = sideIds.reshape(-1, 6)
+        this.sideVertexIds = sideEnds[firstSides]
+        this.sideMidpoints = (this.latticeVertices[this.sideVertexIds[:, 0]] + this.latticeVertices[this.sideVertexIds[:, 1]]) / 2
+        hexSides = np.argsort(sideIds, kind="stable")    #hex index * 6 + side number, grouped by hexside
+        firstHexSides = np.cumsum(np.bincount(sideIds)) - np.bincount(sideIds)
+        isShared = np.bincount(sideIds) == 2
+        this.sideHexes = np.full((len(firstSides), 2), -1)
+        this.sideNumbers = np.full((len(firstSides), 2), -1)
+        this.sideHexes[:, 0], this.sideNumbers[:, 0] = np.divmod(hexSides[firstHexSides], 6)
+        this.sideHexes[isShared, 1], this.sideNumbers[isShared, 1] = np.divmod(hexSides[firstHexSides[isShared] + 1], 6)
+
+    @staticmethod
+    def fromOceanPath(d: str) -> Grid:
+        #The path in the Ocean layer goes around the edge of the hex grid, so the size of the hexes and the grid can be measured from its corners
+        background = parse_path(d)
+        x = [point.end.real for point in background]
+        y = [point.end.imag for point in background]
+        minX = min(x)
+        minY = min(y)
+        hexWidth = abs(x[y.index(minY) - 1] - x[y.index(minY) + 1])
+        hexHeight = abs(y[x.index(max(x)) + 1] - y[x.index(max(x))]) * 2
+        width = round((x[x.index(max(x)) + 1] - minX) / hexWidth)
+        height = round((min(y[y.index(max(y)) + 1], y[y.index(max(y)) - 1]) - minY) / hexHeight)
+        return Grid(minX, minY, hexWidth, hexHeight, width, height)
+
+    def hexCoordinates(this, point: complex) -> tuple[int, int]:
+        #The x and y of the hex that the point is in, the hex may be outside the map. Every other column is offset by half a hex, and neighbouring columns overlap where their slanted sides meet, so in the first third of a column the point can be in the hex to the left.
+        u = (point.real - this.minX) / this.hexWidth
+        v = (point.imag - this.minY) / this.hexHeight
+        x = floor(u)
+        yOffset = (x % 2) * 0.5
+        y = floor(v - yOffset)
+        if u - x < 1/3 * abs(1 - 2 * (v - yOffset - y)):
+            x -= 1
+            y = floor(v - (x % 2) * 0.5)
+        return x, y
+
+    def hexsidesInsidePolygon(this, polygon: PreparedPolygon, hexIndices: list[int], countMidpoints: bool) -> tuple[np.ndarray, np.ndarray]:
+        #The hexsides of the given hexes that have points inside the polygon, and how many: the two ends of the hexside, and its midpoint if countMidpoints is true. Each vertex and hexside is only tested once, even if it's shared by two of the hexes.
+        sideIds = np.unique(this.hexSideIds[hexIndices])
+        vertexIds, sideEnds = np.unique(this.sideVertexIds[sideIds].reshape(-1), return_inverse=True)
+        points = this.latticeVertices[vertexIds]
+        if countMidpoints:
+            points = np.concatenate((points, this.sideMidpoints[sideIds]))
+        inside = polygon.containsPoints(points).astype(int)
+        counts = inside[sideEnds.reshape(-1, 2)].sum(axis=1)
+        if countMidpoints:
+            counts += inside[len(vertexIds):]
+        return sideIds[counts > 0], counts[counts > 0]
+
+    def setHexsideBits(this, column: np.ndarray, sideIds: np.ndarray, value: bool) -> None:
+        #Sets or clears the bits of the given hexsides in a column of side masks (adjacentLandHexes or adjacentSeaHexes) for the hexes on both sides, so that they always agree
+        hexes = this.sideHexes[sideIds].reshape(-1)
+        sides = this.sideNumbers[sideIds].reshape(-1)
+        bits = (1 << sides[hexes >= 0]).astype(np.uint8)
+        if value:
+            np.bitwise_or.at(column, hexes[hexes >= 0], bits)
+        else:
+            np.bitwise_and.at(column, hexes[hexes >= 0], bits ^ np.uint8(0b111111))
+
+    def hexVertices(this, x: int, y: int) -> list[complex]:
+        #The same as vertices[x * height + y], but also works for hexes outside the map
+        yOffset = (x % 2) * 0.5
+        return [
+            complex(this.minX + (x + 1/3) * this.hexWidth, this.minY + (y + yOffset) * this.hexHeight),
+            complex(this.minX + x * this.hexWidth, this.minY + (y + yOffset + 0.5) * this.hexHeight),
+            complex(this.minX + (x + 1/3) * this.hexWidth, this.minY + (y + yOffset + 1) * this.hexHeight),
+            complex(this.minX + (x + 1) * this.hexWidth, this.minY + (y + yOffset + 1) * this.hexHeight),
+            complex(this.minX + (x + 4/3) * this.hexWidth, this.minY + (y + yOffset + 0.5) * this.hexHeight),
+            complex(this.minX + (x + 1) * this.hexWidth, this.minY + (y + yOffset) * this.hexHeight)
+        ]
+
+    def hexesAlongPolyline(this, points: np.ndarray) -> Iterator[tuple[int, int]]:
+        """
+        Walks the polyline through the hex grid like a DDA line drawing algorithm and yields the x and y of each hex that it crosses, which may be outside the map. A hex can be yielded more than once if the polyline comes back to it.
+        Starting from the hex that contains the first point, each segment leaves the current hex through the side whose half-plane it leaves first (like in Cyrus-Beck clipping), and the walk continues in the hex across that side until the segment ends inside the current hex. So the cost is proportional to the number of hexes crossed and doesn't depend on the size of the map.
+        """
+        x, y = this.hexCoordinates(complex(points[0]))
+        yield x, y
+        vertices = this.hexVertices(x, y)
+        for start, end in zip(points[:-1].tolist(), points[1:].tolist()):
+            direction = end - start
+            entrySide = None
+            maxSteps = 12 * ceil(abs(direction) / min(this.hexWidth, this.hexHeight)) + 12    #Far more hexsides than a segment of this length can cross, only there to guarantee that rounding errors can't make the walk go around in circles
+            for step in range(maxSteps):
+                exitSide = None
+                exitT = 1.0
+                for side in range(6):
+                    if side == entrySide:    #Never go straight back, a segment along a hexside could otherwise alternate between the two hexes because of rounding errors
+                        continue
+                    #The vertices go counterclockwise on the screen, so rotating each side by 90° gives the outward normal
+                    normal = (vertices[side] - vertices[side - 1]) * 1j
+                    speed = (normal.conjugate() * direction).real
+                    if speed > 0:
+                        t = (normal.conjugate() * (vertices[side] - start)).real / speed
+                        if t < exitT:
+                            exitSide, exitT = side, t
+                if exitSide is None:
+                    break    #The segment ends in the current hex
+                offsetX, offsetY = sideOffsets[x % 2][exitSide]
+                x += offsetX
+                y += offsetY
+                entrySide = (exitSide + 3) % 6
+                yield x, y
+                vertices = this.hexVertices(x, y)
+
+    def hexCentersInsidePolygon(this, polygon: np.ndarray) -> np.ndarray:
+        #Scanline fill of the polygon onto the hex grid, returns a width × height array that's true for the hexes whose centers are inside. The centers in a row of hexes all have the same y, so the edges that cross each row are found once and the centers between each pair of crossings are inside. The crossings are computed like in pointInsidePolygon so that the results are exactly the same.
+        polygon = np.asarray(polygon, dtype=complex)
+        xi = polygon.real
+        yi = polygon.imag
+        xj = np.roll(xi, 1)
+        yj = np.roll(yi, 1)
+        centerXs = this.minX + (np.arange(this.width) + 2/3) * this.hexWidth
+        inside = np.zeros((this.width, this.height), dtype=bool)
+        firstY = max(0, floor((yi.min() - this.minY) / this.hexHeight) - 1)
+        lastY = min(this.height - 1, floor((yi.max() - this.minY) / this.hexHeight))
+        for y in range(firstY, lastY + 1):
+            centerY = this.minY + (y + 1) * this.hexHeight
+            crosses = (yi > centerY) != (yj > centerY)
+            crossingXs = np.sort((xj[crosses] - xi[crosses]) * (centerY - yi[crosses]) / (yj[crosses] - yi[crosses]) + xi[crosses])
+            inside[:, y] = (len(crossingXs) - np.searchsorted(crossingXs, centerXs, side="right")) % 2 == 1    #The number of crossings to the right of each center
+        return inside
+
+    def surroundingHexIndices(this) -> np.ndarray:
+        #The index of the hex across each side of each hex (0=top, 1=top left, 2=bottom left, 3=bottom, 4=bottom right, 5=top right), or -1 at the edges of the map
+        offsets = np.array(sideOffsets)
+        indices = np.arange(this.width * this.height)
+        xs = indices // this.height
+        ys = indices % this.height
+        neighborXs = xs[:, np.newaxis] + offsets[xs % 2, :, 0]
+        neighborYs = ys[:, np.newaxis] + offsets[xs % 2, :, 1]
+        return np.where((neighborXs >= 0) & (neighborXs < this.width) & (neighborYs >= 0) & (neighborYs < this.height), neighborXs * this.height + neighborYs, -1)
+
+    def neighborTable(this, adjacency: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        #Compressed sparse rows: the indices of the neighbors of the hex at index i are neighbors[offsets[i]:offsets[i + 1]], in the order of the sides. Bit i of adjacency is whether the hexes are adjacent across side i.
+        surroundingHexes = this.surroundingHexIndices()
+        isNeighbor = ((adjacency[:, np.newaxis] >> np.arange(6)) & 1).astype(bool) & (surroundingHexes >= 0)
+        offsets = np.concatenate(([0], np.cumsum(np.count_nonzero(isNeighbor, axis=1))))
+        return offsets.astype("<u4"), surroundingHexes[isNeighbor].astype("<u4")
+
+def flattenSegments(segments: list, tolerance: float) -> np.ndarray:
+    #Returns points along the segments of one subpath such that the polygon through them is at most tolerance from the segments, see flattenSubpaths for paths with several subpaths
+    #Convert all the segments to cubic Bézier curves so that they can all be flattened at once. Lines are converted to cubic curves with evenly spaced control points, so they're never subdivided.
+    firstPoint = segments[0].start
+    currentPoint = firstPoint
+    controlPoints = []
+    for segment in segments:
+        if isinstance(segment, CubicBezier):
+            controlPoints.append((currentPoint, segment.control1, segment.control2, segment.end))
+        elif isinstance(segment, QuadraticBezier):
+            controlPoints.append((currentPoint, currentPoint + 2/3 * (segment.control - currentPoint), segment.end + 2/3 * (segment.control - segment.end), segment.end))
+        elif isinstance(segment, Arc):
+            #Arcs are rare, so flatten them one point at a time and add them as lines. The distance between a circular arc of angle θ and its chord is about rθ²/8.
+            subdivisions = max(1, int(np.ceil(np.radians(abs(segment.delta)) * np.sqrt(max(abs(segment.radius.real), abs(segment.radius.imag)) / (8 * tolerance)))))
+            for i in range(1, subdivisions + 1):
+                point = segment.point(i / subdivisions)
+                controlPoints.append((currentPoint, currentPoint + (point - currentPoint) / 3, point + (currentPoint - point) / 3, point))
+                currentPoint = point
+            continue
+        elif isinstance(segment, Move):    #Only at the start of the subpath
+            continue
+        else:    #Line or Close
+            controlPoints.append((currentPoint, currentPoint + (segment.end - currentPoint) / 3, segment.end + (currentPoint - segment.end) / 3, segment.end))
+        currentPoint = segment.end
+    controlPoints = np.array(controlPoints, dtype=complex).reshape(-1, 4)
+
+    #The distance between a cubic curve and the chords when splitting it into n parts is at most max|B''| / (8n²), where max|B''| = 6 max(|p0 - 2p1 + p2|, |p1 - 2p2 + p3|)
+    p0, p1, p2, p3 = controlPoints.T
+    maxSecondDerivative = 6 * np.maximum(np.abs(p0 - 2 * p1 + p2), np.abs(p1 - 2 * p2 + p3))
+    subdivisions = np.maximum(1, np.ceil(np.sqrt(maxSecondDerivative / (8 * tolerance)))).astype(int)
+
+    #Evaluate all the curves at all their subdivision points at once (t = 1/n, 2/n, ..., 1 for each curve since t = 0 is the end of the previous curve)
+    segmentIndices = np.repeat(np.arange(len(controlPoints)), subdivisions)
+    t = (np.arange(len(segmentIndices)) - np.repeat(np.cumsum(subdivisions) - subdivisions, subdivisions) + 1) / subdivisions[segmentIndices]
+    s = 1 - t
+    p0, p1, p2, p3 = controlPoints[segmentIndices].T
+    return np.concatenate(([firstPoint], s**3 * p0 + 3 * s**2 * t * p1 + 3 * s * t**2 * p2 + t**3 * p3))
+
+def simplifyPolyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    #Ramer-Douglas-Peucker: keeps the point farthest from the line between the first and last point if it's more than tolerance from it, and repeats on both sides of it. For a closed polyline, the first and last points are the same and the distances are from that point.
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while len(stack) > 0:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        chord = points[last] - points[first]
+        offsets = points[first + 1:last] - points[first]
+        distances = np.abs(offsets) if chord == 0 else np.abs((offsets * chord.conjugate()).imag) / abs(chord)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            keep[first + 1 + farthest] = True
+            stack.append((first, first + 1 + farthest))
+            stack.append((first + 1 + farthest, last))
+    return points[keep]
+
+def flattenSubpaths(d: str, tolerance: float) -> list[tuple[np.ndarray, bool]]:
+    #Flattens each subpath of the path separately, and returns whether each one is closed
+    subpaths = []
+    for segment in parse_path(d):
+        if isinstance(segment, Move) or len(subpaths) == 0:
+            subpaths.append([])
+        subpaths[-1].append(segment)
+    return [(flattenSegments(subpath, tolerance), any(isinstance(segment, Close) for segment in subpath)) for subpath in subpaths]
+
+def coordinateDigits(tolerance: float) -> int:
+    return max(0, int(np.ceil(np.log10(4 / tolerance))))    #Rounding to this many decimals moves the points at most a fourth of the tolerance
+
+def formatRoundedCoordinate(n: int, digits: int) -> str:
+    #A coordinate that was multiplied by 10**digits and rounded, written as short as possible
+    text = "{:.{}f}".format(abs(n) / 10**digits, digits)
+    if digits > 0:
+        text = text.rstrip("0").rstrip(".")
+    if text.startswith("0."):
+        text = text[1:]
+    return ("-" if n < 0 else "") + text
+
+def pathData(subpaths: list[tuple[np.ndarray, bool]], digits: int) -> str:
+    #Writes the flattened subpaths with the coordinates rounded and as relative lines. Subpaths that become too small after rounding are left out.
+    def formatCoordinate(n: int) -> str:
+        return formatRoundedCoordinate(n, digits)
+    result = ""
+    currentPoint = 0
+    for points, isClosed in subpaths:
+        if len(points) == 0:
+            continue
+        points = np.round(points * 10**digits)
+        points = points[np.concatenate(([True], points[1:] != points[:-1]))]    #Rounding can make neighbouring points equal
+        if isClosed and len(points) > 1 and points[-1] == points[0]:
+            points = points[:-1]
+        if len(points) < (3 if isClosed else 2):
+            continue
+        offsets = np.diff(np.concatenate(([currentPoint], points)))
+        result += "m{},{}l".format(formatCoordinate(int(offsets[0].real)), formatCoordinate(int(offsets[0].imag)))
+        result += " ".join("{},{}".format(formatCoordinate(int(offset.real)), formatCoordinate(int(offset.imag))) for offset in offsets[1:])
+        if isClosed:
+            result += "z"
+            currentPoint = points[0]
+        else:
+            currentPoint = points[-1]
+    return result
+
+def simplifiedPaths(d: str, hexWidth: float) -> list[str]:
+    #The path simplified for each level of detail of a grid with the given hex width. Tiny subpaths that would be less than a pixel in size disappear.
+    tolerances = [hexWidth / (2 * hexPixels) for hexPixels in levelsOfDetail]
+    flattenedSubpaths = flattenSubpaths(d, min(tolerances) / 4)
+    results = []
+    for tolerance in tolerances:
+        result = pathData([(simplifyPolyline(points, tolerance / 2), isClosed) for points, isClosed in flattenedSubpaths], coordinateDigits(tolerance))
+        results.append(result if len(result) < len(d) else d)    #Paths with lots of curves can be shorter as they are at high levels of detail
+    return results
+
+def clipRing(points: np.ndarray, left: float, top: float, right: float, bottom: float) -> np.ndarray:
+    #Sutherland-Hodgman: clips the polygon against each side of the rectangle in turn. A concave polygon can get edges along the sides of the rectangle, which don't change what's filled.
+    for isX, bound, keepGreater in [(True, left, True), (True, right, False), (False, top, True), (False, bottom, False)]:
+        if len(points) == 0:
+            break
+        values = points.real if isX else points.imag
+        inside = values >= bound if keepGreater else values <= bound
+        if inside.all():
+            continue
+        previous = np.roll(points, 1)
+        previousValues = np.roll(values, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):    #Only used where the edge crosses the side, and then the values are different
+            intersections = previous + (bound - previousValues) / (values - previousValues) * (points - previous)
+            intersections = bound + 1j * intersections.imag if isX else intersections.real + 1j * bound
+        #For each edge, add the point where it crosses the side if it does, then its end if it's inside
+        result = np.empty(2 * len(points), dtype=complex)
+        keep = np.empty(2 * len(points), dtype=bool)
+        result[0::2] = intersections
+        keep[0::2] = inside != np.roll(inside, 1)
+        result[1::2] = points
+        keep[1::2] = inside
+        points = result[keep]
+    return points
+
+def clipPolyline(points: np.ndarray, left: float, top: float, right: float, bottom: float) -> list[np.ndarray]:
+    #Liang-Barsky for all the edges at once, returns the parts of the polyline that are inside the rectangle
+    starts = points[:-1]
+    deltas = points[1:] - starts
+    tStart = np.zeros(len(starts))
+    tEnd = np.ones(len(starts))
+    for p, q in [(-deltas.real, starts.real - left), (deltas.real, right - starts.real), (-deltas.imag, starts.imag - top), (deltas.imag, bottom - starts.imag)]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = q / p
+        tStart = np.where(p < 0, np.maximum(tStart, t), tStart)
+        tEnd = np.where(p > 0, np.minimum(tEnd, t), tEnd)
+        tStart = np.where((p == 0) & (q < 0), np.inf, tStart)    #Parallel to the side and outside it
+    parts = []
+    previousIndex = None
+    for i in np.nonzero(tStart <= tEnd)[0]:
+        start = starts[i] + tStart[i] * deltas[i]
+        end = starts[i] + tEnd[i] * deltas[i]
+        if previousIndex == i - 1 and tEnd[i - 1] == 1 and tStart[i] == 0:
+            parts[-1].append(end)
+        else:
+            parts.append([start, end])
+        previousIndex = i
+    return [np.array(part) for part in parts]
+
+def tileWorldMap(grid: Grid, worldSvg: str, finestPaths: list[str | None], tileSize: int) -> tuple[str, dict[str, str], dict]:
+    """
+    Splits the world map into tiles of tileSize × tileSize hexes that the view can download when they become visible. Returns world.xml with a <g id="tiles"> to put the tiles in, the SVG of each tile that isn't empty, and the manifest for the view.
+    The paths are clipped a bit outside each tile so that strokes along the clipped edges aren't visible, and each tile is clipped exactly to its rectangle with a clip path.
+    finestPaths is the most detailed version of each path in world.xml, or None to use the path in world.xml.
+    """
+    root = XML.fromstring(worldSvg)
+    tolerance = grid.hexWidth / (2 * levelsOfDetail[-1])
+    digits = coordinateDigits(tolerance)
+    flattenedPaths: dict[XML.Element, tuple[list[tuple[np.ndarray, bool]], float, float, float, float]] = {}
+    for i, path in enumerate(root.iter("path")):
+        d = finestPaths[i] if i < len(finestPaths) and finestPaths[i] != None else path.attrib["d"]
+        subpaths = [(simplifyPolyline(points, tolerance / 2), isClosed) for points, isClosed in flattenSubpaths(d, tolerance / 4)] if d != "" else []
+        points = np.concatenate([points for points, _ in subpaths]) if len(subpaths) > 0 else np.array([np.nan], dtype=complex)
+        flattenedPaths[path] = (subpaths, np.nanmin(points.real), np.nanmin(points.imag), np.nanmax(points.real), np.nanmax(points.imag))
+
+    def tileElement(element: XML.Element, left: float, top: float, right: float, bottom: float) -> XML.Element | None:
+        if element.tag == "path":
+            subpaths, pathLeft, pathTop, pathRight, pathBottom = flattenedPaths[element]
+            if not (pathLeft <= right and pathRight >= left and pathTop <= bottom and pathBottom >= top):
+                return None
+            clippedSubpaths = []
+            for points, isClosed in subpaths:
+                if isClosed:
+                    clippedSubpaths.append((clipRing(points, left, top, right, bottom), True))
+                else:
+                    clippedSubpaths.extend((part, False) for part in clipPolyline(points, left, top, right, bottom))
+            d = pathData(clippedSubpaths, digits)
+            if d == "":
+                return None
+            result = XML.Element("path", element.attrib)
+            result.set("d", d)
+            return result
+        children = [tileElement(child, left, top, right, bottom) for child in element]
+        if all(child is None for child in children):
+            return None
+        result = XML.Element(element.tag, element.attrib)
+        for child, tiledChild in zip(element, children):
+            if tiledChild is not None:
+                result.append(tiledChild)
+            elif len(element.attrib) == 0:    #Groups without attributes are canals, where CSS tells the paths apart by their order, so keep the paths that are outside the tile but empty
+                result.append(XML.Element(child.tag, {**child.attrib, "d": ""}))
+        return result
+
+    #Top level elements without paths (the country names that the view writes) stay in world.xml
+    tiledElements = [element for element in root if next(element.iter("path"), None) is not None]
+    tileWidth = tileSize * grid.hexWidth
+    tileHeight = tileSize * grid.hexHeight
+    margin = grid.hexWidth / 2
+    tiles = {}
+    for tileX in range(int(np.ceil((grid.width + 1/3) / tileSize))):
+        for tileY in range(int(np.ceil((grid.height + 1/2) / tileSize))):
+            left = grid.minX + tileX * tileWidth
+            top = grid.minY + tileY * tileHeight
+            tiledChildren = [tileElement(element, left - margin, top - margin, left + tileWidth + margin, top + tileHeight + margin) for element in tiledElements]
+            if all(child is None for child in tiledChildren):
+                continue
+            name = "{}-{}".format(tileX, tileY)
+            tile = XML.Element("g", {"clip-path": "url(#tile-{})".format(name)})
+            tile.extend(child for child in tiledChildren if child is not None)
+            tiles[name] = "<clipPath id=\"tile-{}\"><rect x=\"{}\" y=\"{}\" width=\"{}\" height=\"{}\"/></clipPath>".format(name, left, top, tileWidth, tileHeight) + XML.tostring(tile, encoding="unicode", short_empty_elements = True)
+
+    #Replace the tiled elements with the group that the view puts the tiles in
+    placeholderIndex = list(root).index(tiledElements[0]) if len(tiledElements) > 0 else 0
+    for element in tiledElements:
+        root.remove(element)
+    root.insert(placeholderIndex, XML.Element("g", {"id": "tiles"}))
+    root.attrib.pop("data-levels-of-detail", None)    #The tiles already have the most detailed level
+    manifest = {"tileWidth": tileWidth * zoom, "tileHeight": tileHeight * zoom, "tiles": sorted(tiles)}
+    return XML.tostring(root, encoding="unicode"), tiles, manifest
+
 class Path:
-    polygon: list[complex]
+    grid: Grid
+    subpaths: list[np.ndarray]    #The vertices of each flattened subpath, there are more of them where the path curves more
+    preparedPolygon: PreparedPolygon    #The subpaths as the rings of a polygon, for testing whether points are inside it
+    points: np.ndarray     #Points along the flattened path at most resolution apart, used to find the hexes that the path passes through
+    pointsByY: np.ndarray    #The same points sorted by y, and their y coordinates
+    pointYs: np.ndarray
     minX: float
     maxX: float
     minY: float
     maxY: float
 
-    def __init__(this, xmlElement: XML.Element):
-        this.polygon = []
-        this.minX = np.inf
-        this.maxX = -np.inf
-        this.minY = np.inf
-        this.maxY = -np.inf
-        path = parse_path(xmlElement.attrib["d"])
-        for i in np.arange(0.0, 1.0, resolution / path.length(resolution / 2)):
-            point = path.point(i, resolution / 2)
-            if(point.real < this.minX):
-                this.minX = point.real
-            if(point.real > this.maxX):
-                this.maxX = point.real
-            if(point.imag < this.minY):
-                this.minY = point.imag
-            if(point.imag > this.maxY):
-                this.maxY = point.imag
-            this.polygon.append(point)
-
-    def hexIsNearby(this, hex: Hex) -> bool:
-        vertices = hex.vertices
-        return this.minX <= vertices[4].real and this.maxX >= vertices[1].real and this.minY <= vertices[3].imag and this.maxY >= vertices[0].imag
+    def __init__(this, grid: Grid, d: str):
+        this.grid = grid
+        resolution = grid.resolution
+        this.subpaths = [points for points, isClosed in flattenSubpaths(d, resolution / 5)]    #At most resolution / 5 from the real path
+        polygon = np.concatenate(this.subpaths)
+        this.preparedPolygon = PreparedPolygon(polygon, np.cumsum([0] + [len(points) for points in this.subpaths[:-1]]))
+
+        #Add points along the edges so that any hex that the path passes through contains at least one of the points. The edges are only within each subpath, there's nothing between the end of one subpath and the start of the next one.
+        starts = np.concatenate([points[:-1] for points in this.subpaths])
+        ends = np.concatenate([points[1:] for points in this.subpaths])
+        pointCounts = np.maximum(1, np.ceil(np.abs(ends - starts) / resolution)).astype(int)
+        edgeIndices = np.repeat(np.arange(len(starts)), pointCounts)
+        fractions = (np.arange(len(edgeIndices)) - np.repeat(np.cumsum(pointCounts) - pointCounts, pointCounts)) / pointCounts[edgeIndices]
+        this.points = np.concatenate([starts[edgeIndices] + fractions * (ends[edgeIndices] - starts[edgeIndices])] + [points[-1:] for points in this.subpaths])
+        this.pointsByY = this.points[np.argsort(this.points.imag, kind="stable")]
+        this.pointYs = this.pointsByY.imag
+
+        this.minX = float(polygon.real.min())
+        this.maxX = float(polygon.real.max())
+        this.minY = float(polygon.imag.min())
+        this.maxY = float(polygon.imag.max())
+
+    def nearbyHexes(this) -> list[Hex]:
+        #The hexes whose bounding boxes overlap the bounding box of the path. The hex grid is regular, so the columns and rows that can contain nearby hexes can be calculated directly from the bounding box instead of checking every hex (one extra column and row on each side to be safe with rounding, the exact check is done with the vertices of the hexes).
+        grid = this.grid
+        firstX = max(0, int(np.floor((this.minX - grid.minX) / grid.hexWidth - 4/3)) - 1)
+        lastX = min(grid.width - 1, int(np.ceil((this.maxX - grid.minX) / grid.hexWidth)) + 1)
+        firstY = max(0, int(np.floor((this.minY - grid.minY) / grid.hexHeight)) - 2)
+        lastY = min(grid.height - 1, int(np.ceil((this.maxY - grid.minY) / grid.hexHeight)) + 1)
+        indices = (np.arange(firstX, lastX + 1)[:, np.newaxis] * grid.height + np.arange(firstY, lastY + 1)).reshape(-1)    #Same order as in the hexes list
+        vertices = grid.vertices[indices]
+        isNearby = (this.minX <= vertices[:, 4].real) & (this.maxX >= vertices[:, 1].real) & (this.minY <= vertices[:, 3].imag) & (this.maxY >= vertices[:, 0].imag)
+        return [Hex(grid, int(index)) for index in indices[isNearby]]
+
+    def crossedHexes(this) -> list[Hex]:
+        #The hexes that the flattened path crosses, in the same order as in the hexes list. Each subpath is walked on its own, a Move doesn't cross anything. Unlike nearbyHexes, this only visits the hexes along the path, so it's much faster for long thin paths like railways.
+        grid = this.grid
+        indices = {x * grid.height + y for points in this.subpaths for x, y in grid.hexesAlongPolyline(points) if 0 <= x < grid.width and 0 <= y < grid.height}
+        return [Hex(grid, index) for index in sorted(indices)]
+
+def breadthFirstDistances(surroundingHexes: np.ndarray, isNeighbor: np.ndarray, origin: int) -> np.ndarray:
+    #The number of steps from the origin to each hex, or 0xFFFF if it can't be reached
+    distances = np.full(len(surroundingHexes), 0xFFFF, dtype="<u2")
+    distances[origin] = 0
+    frontier = np.array([origin])
+    distance = 0
+    while len(frontier) > 0:
+        distance += 1
+        frontier = np.unique(surroundingHexes[frontier][isNeighbor[frontier]])
+        frontier = frontier[distances[frontier] == 0xFFFF]
+        distances[frontier] = distance
+    return distances
+
+def landmarkDistances(grid: Grid, isNeighbor: np.ndarray, candidates: list[int]) -> list[np.ndarray]:
+    #Chooses up to landmarkCount of the candidates, each one as far as possible from the ones chosen before it (or not connected to them at all), and gets the distances from them to all hexes
+    surroundingHexes = grid.surroundingHexIndices()
+    #Hexes are adjacent in both directions if they're adjacent in one direction, which can only make the distances shorter so they're still lower bounds
+    isNeighbor = isNeighbor & (surroundingHexes >= 0)
+    reverseSides = (np.arange(6) + 3) % 6
+    reverseHexes, reverseSideIndices = surroundingHexes[isNeighbor], np.broadcast_to(reverseSides, isNeighbor.shape)[isNeighbor]
+    isNeighbor[reverseHexes, reverseSideIndices] = True
+    result = []
+    nearestLandmark = np.full(len(candidates), np.inf)
+    candidates = np.array(candidates, dtype=int)
+    while len(result) < landmarkCount and len(candidates) > 0 and nearestLandmark.max() > 0:
+        distances = breadthFirstDistances(surroundingHexes, isNeighbor, candidates[np.argmax(nearestLandmark)])
+        result.append(distances)
+        nearestLandmark = np.minimum(nearestLandmark, np.where(distances[candidates] == 0xFFFF, np.inf, distances[candidates]))
+    return result
+
+def landmarkTableBytes(grid: Grid) -> bytes:
+    """
+    The distances from a few landmark hexes to all hexes that src/model/mapsheet/landmark-table.ts loads to get lower bounds for path lengths, all numbers are little endian:
+        "LMRK", then version, width, height, the number of land landmarks and the number of sea landmarks as uint32
+        for each land landmark, the number of land hexsides that need to be crossed to get from it to each hex (uint16 per hex, 0xFFFF if it isn't possible)
+        for each sea landmark, the same thing for sea hexsides
+    The hexes are in the same order as in the hexes list. Adjacency that can appear during the game (frozen icecap hexes in severe winter and canals) is included so that the distances are never longer than they can be in the game.
+    """
+    width, height = grid.width, grid.height
+    surroundingHexes = grid.surroundingHexIndices()
+    isLandNeighbor = (grid.adjacentLandHexes[:, np.newaxis] >> np.arange(6) & 1).astype(bool)
+    isSeaNeighbor = (grid.adjacentSeaHexes[:, np.newaxis] >> np.arange(6) & 1).astype(bool)
+    isIcecapLand = (grid.terrain == grid.terrainTypes.index("Icecap")) & grid.isLand    #LandIce and CoastalIce, like isIcecap() && isLand() in hex.ts
+    isLandNeighbor |= isIcecapLand[:, np.newaxis] & isIcecapLand[surroundingHexes] & (surroundingHexes >= 0)
+    for (x1, y1), (x2, y2) in canals:
+        if x1 < width and y1 < height and x2 < width and y2 < height:
+            side = list(surroundingHexes[x1 * height + y1]).index(x2 * height + y2)
+            isSeaNeighbor[x1 * height + y1, side] = True
+
+    #Capitals, major ports and the hexes furthest in each direction are spread out, and landmarks near the edges of the graph give the best lower bounds
+    def extremes(indices: np.ndarray) -> list[int]:
+        if len(indices) == 0:
+            return []
+        xs, ys = indices // height, indices % height
+        return [int(indices[np.argmin(xs)]), int(indices[np.argmax(xs)]), int(indices[np.argmin(ys)]), int(indices[np.argmax(ys)])]
+    landHexes = np.flatnonzero(grid.isLand)
+    seaHexes = np.flatnonzero(grid.isSea)
+    landCandidates = extremes(landHexes) + landHexes[grid.isCapital[landHexes]].tolist()
+    seaCandidates = extremes(seaHexes) + seaHexes[grid.isMajorPort[seaHexes]].tolist()
+    landDistances = landmarkDistances(grid, isLandNeighbor, landCandidates)
+    seaDistances = landmarkDistances(grid, isSeaNeighbor, seaCandidates)
+    header = b"LMRK" + np.array([1, width, height, len(landDistances), len(seaDistances)], dtype="<u4").tobytes()
+    return header + b"".join(distances.tobytes() for distances in landDistances + seaDistances)
+
+def hexTableBytes(grid: Grid) -> bytes:
+    """
+    The hexes as the binary table that src/model/mapsheet/hex-table.ts loads, all numbers are little endian:
+        "HEXT", then version, width, height, the number of land neighbors, the number of sea neighbors and the length of the string table as uint32
+        adjacency (uint16 per hex): bit i is adjacentLandHexes[i] and bit 6 + i is adjacentSeaHexes[i]
+        terrain, weatherZone, country, secondaryController (uint8 per hex): indices in the string table, for countries 0 means null and i + 1 means the country at index i
+        flags (uint8 per hex): 1=canUseRail, 2=isResourceHex, 4=isColony, 8=isIndia, 16=isMajorPort, 32=isCapital, 64=isEnclaveCity
+        padding to a multiple of 4 bytes
+        the land neighbor table and the sea neighbor table from neighborTable (uint32), each as the offsets followed by the neighbors
+        the string table, JSON with the terrain types, weather zones and countries that the columns refer to and the cities as [hex index, name, alignment, offset x, offset y]
+    The hexes are in the same order as in the hexes list.
+    """
+    #The columns of the grid are already indices, they only need to be mapped to the sorted lists of the values that are actually used
+    completeTerrains = [hex.completeTerrain() for hex in grid.hexes]
+    terrainTypes = sorted(set(completeTerrains))
+    terrain = np.array([terrainTypes.index(completeTerrain) for completeTerrain in completeTerrains], dtype=np.uint8)
+    weatherZones = sorted({grid.weatherZones[code] for code in np.unique(grid.weatherZone)})
+    weatherZone = np.array([weatherZones.index(name) if name in weatherZones else 0 for name in grid.weatherZones], dtype=np.uint8)[grid.weatherZone]
+    countryCodes = np.unique(np.concatenate((grid.country[grid.isLand], grid.secondaryController[grid.isLand])))
+    countries = sorted(grid.countries[code] for code in countryCodes if grid.countries[code] != None)
+    countryIndices = np.array([countries.index(name) + 1 if name in countries else 0 for name in grid.countries], dtype=np.uint8)
+    if (grid.isLand & (grid.country == 0)).any():
+        raise ValueError("Land hex without a country")
+    country = np.where(grid.isLand, countryIndices[grid.country], 0).astype(np.uint8)
+    secondaryController = np.where(grid.isLand, countryIndices[grid.secondaryController], 0).astype(np.uint8)
+    adjacency = grid.adjacentLandHexes.astype("<u2") | grid.adjacentSeaHexes.astype("<u2") << 6
+    flags = np.zeros(grid.width * grid.height, dtype=np.uint8)
+    for bit, column in enumerate([grid.canUseRail, grid.isResourceHex, grid.isColony, grid.isIndia, grid.isMajorPort, grid.isCapital, grid.isEnclaveCity]):
+        flags |= column.astype(np.uint8) << bit
+    cities = []
+    for i in sorted(grid.city.keys() | grid.cityAlignment.keys() | grid.cityOffset.keys()):
+        hex = grid.hexes[i]
+        if hex.city != None or hex.cityAlignment != "right" or hex.cityOffset != (0, 0):
+            cities.append([i, hex.city, hex.cityAlignment[0], hex.cityOffset[0], hex.cityOffset[1]])
+    stringTable = json.dumps({"terrainTypes": terrainTypes, "weatherZones": weatherZones, "countries": countries, "cities": cities}, ensure_ascii = False, separators = (",", ":")).encode("utf-8")
+    landOffsets, landNeighbors = grid.neighborTable(adjacency & 63)
+    seaOffsets, seaNeighbors = grid.neighborTable(adjacency >> 6)
+    header = b"HEXT" + np.array([2, grid.width, grid.height, len(landNeighbors), len(seaNeighbors), len(stringTable)], dtype="<u4").tobytes()
+    columns = adjacency.tobytes() + terrain.tobytes() + weatherZone.tobytes() + country.tobytes() + secondaryController.tobytes() + flags.tobytes()
+    columns += bytes(-(len(header) + len(columns)) % 4)
+    return header + columns + landOffsets.tobytes() + landNeighbors.tobytes() + seaOffsets.tobytes() + seaNeighbors.tobytes() + stringTable
+
+workerGrid: Grid | None = None    #The grid of the compilation that a worker process is working for
+
+def initializeWorker(minX: float, minY: float, hexWidth: float, hexHeight: float, width: int, height: int) -> None:
+    #Worker processes only get the paths, so they need their own copy of the grid from the main process to classify them with
+    global workerGrid
+    workerGrid = Grid(minX, minY, hexWidth, hexHeight, width, height)
+
+def classifyPathInWorker(task: tuple[str, str]) -> tuple[list[tuple], dict[str, float]]:
+    layerName, d = task
+    return classifyPath(workerGrid, layerName, d)
+
+def classifyPath(grid: Grid, layerName: str, d: str) -> tuple[list[tuple], dict[str, float]]:
+    #Finds which hexes the given path affects. This only depends on the geometry and not on what previous paths have done to the hexes so that it can be done in parallel. The results are then applied to the hexes in the main process in the same order as the paths are in the SVG file.
+    #Also returns counters for the profiler, since it only runs in the main process
+    cpuTimeBefore = time.process_time()
+    pointsTestedBefore = pointsTested
+    path = Path(grid, d)
+    if layerName == "Railways":
+        #Railways only need the hexes that they cross, which can be found by walking along them instead of checking every nearby hex
+        crossedHexes = path.crossedHexes()
+        return [(hex.x, hex.y) for hex in crossedHexes], {"hexesVisited": len(crossedHexes), "hexesRejected": 0, "pointsTested": 0, "cpuTime": time.process_time() - cpuTimeBefore}
+    nearbyHexes = path.nearbyHexes()
+    centersInside = path.preparedPolygon.containsPoints(grid.centers[[hex.index for hex in nearbyHexes]]).tolist()
+    result = []
+    for hex, centerInside in zip(nearbyHexes, centersInside):
+        if layerName == "Islands and Continents" or layerName == "Lakes":
+            (partlyInside, completelyInside) = hex.isInsidePolygon(path, centerInside)
+            if partlyInside:
+                result.append((hex.x, hex.y, completelyInside))
+        else:
+            if hex.isInsidePolygon(path, centerInside)[0]:
+                result.append((hex.x, hex.y))
+    counters = {"hexesVisited": len(nearbyHexes), "hexesRejected": len(nearbyHexes) - len(result)}
+    if layerName == "Islands and Continents" or layerName == "Lakes":
+        #The adjacency across the hexsides of the coastal hexes depends on how many points of each hexside are inside the path, each hexside is classified once for the hexes on both sides of it. The hexsides of the hexes that are completely inside are completely inside too.
+        coastalHexes = [x * grid.height + y for x, y, completelyInside in result if not completelyInside]
+        insideHexes = [x * grid.height + y for x, y, completelyInside in result if completelyInside]
+        sideIds, sideCounts = grid.hexsidesInsidePolygon(path.preparedPolygon, coastalHexes, layerName == "Islands and Continents")
+        insideSideIds = np.unique(grid.hexSideIds[insideHexes])
+        result = (result, np.concatenate((sideIds, insideSideIds)), np.concatenate((sideCounts, np.full(len(insideSideIds), 3 if layerName == "Islands and Continents" else 2))))
+    return result, counters | {"pointsTested": pointsTested - pointsTestedBefore, "cpuTime": time.process_time() - cpuTimeBefore}
+
+def classifyPaths(grid: Grid, layerName: str, elements: list[XML.Element], pool: multiprocessing.pool.Pool | None, jobs: int, profiler: Profiler, memoryCache: MemoryCache | None = None) -> Iterator[list[tuple]]:
+    #Gets the results of classifyPath for each element in the same order as the elements, using the process pool (whose workers have been initialized with the grid by initializeWorker) if there is one. Only the paths that aren't in the memory cache are classified.
+    paths = [element.attrib["d"] for element in elements]
+    cachedResults = [memoryCache.get(("classifyPath", layerName, d)) if memoryCache is not None else None for d in paths]
+    tasks = [(layerName, d) for d, cachedResult in zip(paths, cachedResults) if cachedResult is None]
+    if pool is None:
+        results = (classifyPath(grid, layerName, d) for layerName, d in tasks)
+    else:
+        results = pool.imap(classifyPathInWorker, tasks, chunksize = max(1, len(tasks) // (jobs * 4)))
+    for d, result in zip(paths, cachedResults):
+        if result is None:
+            result, counters = next(results)
+            cpuTime = counters.pop("cpuTime")
+            if pool is not None:    #Otherwise it's already included in the CPU time of the stage
+                counters["workerCpuTime"] = cpuTime
+            profiler.count(**counters)
+            if memoryCache is not None:
+                memoryCache.put(("classifyPath", layerName, d), result)
+        else:
+            profiler.count(cachedPaths = 1)
+        yield result
+
+def svgLayers(source: str | IO) -> Iterator[XML.Element]:
+    #Parses the SVG file (a file name or a file object) one top-level element at a time and frees each element once it has been processed, so that the whole SVG file never needs to be in memory at once
+    depth = 0
+    root = None
+    for event, element in XML.iterparse(source, events = ("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 1:
+                yield element
+                element.clear()
+                root.remove(element)
+
+def printProgress(message: str, done: int, total: int) -> None:
+    print("\r{}: {}%".format(message, done * 100 // total), end = "" if done < total else "\n")
+
+class Profiler:
+    #Records the wall time, CPU time and counters (such as the number of paths and how many of the hexes near them were actually affected) of each stage of the compilation, and reports the progress of the slow stages
+    stages: dict[str, dict[str, float]]
+    currentStage: str | None = None
+    stageStart: tuple[float, float]
+    profiles: dict[str, cProfile.Profile]
+    profileFolder: str | None
+    onProgress: Callable[[str, int, int], None]
+    progressInterval: float
+    lastProgress: float = 0
+
+    def __init__(this, profileFolder: str | None = None, onProgress: Callable[[str, int, int], None] = printProgress, progressInterval: float = 0.2):
+        #If profileFolder isn't None, each stage is also profiled with cProfile and the results are saved there
+        this.stages = {}
+        this.profiles = {}
+        this.profileFolder = profileFolder
+        this.onProgress = onProgress
+        this.progressInterval = progressInterval
+        if profileFolder is not None:
+            os.makedirs(profileFolder, exist_ok = True)
+
+    def startStage(this, name: str) -> None:
+        #Ends the current stage and starts the next one. Stages with the same name are added together.
+        this.endStage()
+        this.currentStage = name
+        this.stages.setdefault(name, {"wallTime": 0, "cpuTime": 0})
+        if this.profileFolder is not None:
+            this.profiles.setdefault(name, cProfile.Profile()).enable()
+        this.stageStart = (time.perf_counter(), time.process_time())
+
+    def endStage(this) -> None:
+        if this.currentStage is None:
+            return
+        this.count(wallTime = time.perf_counter() - this.stageStart[0], cpuTime = time.process_time() - this.stageStart[1])
+        if this.profileFolder is not None:
+            profile = this.profiles[this.currentStage]
+            profile.disable()
+            profile.dump_stats(os.path.join(this.profileFolder, re.sub(r"[^\w-]+", "-", this.currentStage) + ".prof"))
+        this.currentStage = None
+
+    def count(this, **counters: float) -> None:
+        stage = this.stages[this.currentStage]
+        for name, value in counters.items():
+            stage[name] = stage.get(name, 0) + value
+
+    def iterate(this, iterable: Iterable, stageName: str) -> Iterator:
+        #Counts the time it takes to get each element of the iterable (such as parsing the next layer of the SVG file) as the given stage
+        iterator = iter(iterable)
+        while True:
+            this.startStage(stageName)
+            try:
+                element = next(iterator)
+            except StopIteration:
+                return
+            yield element
+
+    def progress(this, message: str, done: int, total: int) -> None:
+        #Only passes the progress on a few times per second and when everything is done, so that this can be called often without slowing down the compilation
+        now = time.perf_counter()
+        if done == total or now - this.lastProgress >= this.progressInterval:
+            this.lastProgress = now
+            this.onProgress(message, done, total)
+
+    def report(this) -> dict:
+        this.endStage()
+        return {
+            "wallTime": sum(stage["wallTime"] for stage in this.stages.values()),
+            "cpuTime": sum(stage["cpuTime"] + stage.get("workerCpuTime", 0) for stage in this.stages.values()),
+            "stages": this.stages
+        }
 
 class CountryName:
     tokens: list[str]
@@ -230,493 +1172,839 @@ class CountryName:
         this.textAnchor = textAnchor
         this.transform = transform
 
-svgTag = XML.parse("azimuthal_projection.svg").getroot()
-includableSvg = open("world.xml", "w", encoding="utf-8")
-countryNames = []
+class MemoryCache:
+    #Keeps the results of the layers and paths of one compilation in memory for the next one (such as with --watch), so that only the layers and paths that changed need to be compiled again. The results only stay valid as long as the grid stays the same, and the ones that the last compilation didn't use are dropped so that the cache doesn't grow with every edit.
+    gridHash: str | None = None
+    entries: dict[tuple, object]
+    usedEntries: dict[tuple, object]
 
-for layer in svgTag:
-    if layer.tag != "{http://www.w3.org/2000/svg}g":
-        continue
-    layerName = layer.attrib["{http://www.inkscape.org/namespaces/inkscape}label"]
+    def __init__(this):
+        this.entries = {}
+        this.usedEntries = {}
 
-    if layerName != "Country Names":
-        for element in layer:
-            if "transform" in element.attrib:
-                raise ValueError("Element in layer {} has transform=\"{}\" attribute, might not be parsed correctly.".format(layerName, element.attrib["transform"]))
+    def startCompilation(this, gridHash: str) -> None:
+        if gridHash != this.gridHash:
+            this.entries = {}
+            this.gridHash = gridHash
+        this.usedEntries = {}
 
-    if layerName == "Ocean":
-        #Initialize some variables
-        background = parse_path(layer[0].attrib["d"])
-        x = [point.end.real for point in background]
-        y = [point.end.imag for point in background]
-        minX = min(x)
-        minY = min(y)
-        hexWidth = abs(x[y.index(minY) - 1] - x[y.index(minY) + 1])    #The distance between the far left of one hex and the far left of the next hex. The total width of the hex is this times 4/3 (proof: each angle in a hex is 120°, use this to divide the hex into six equilateral triangles).
-        hexHeight = abs(y[x.index(max(x)) + 1] - y[x.index(max(x))]) * 2    #The total height of a hex
-        resolution = hexHeight / 5
-        width = round((x[x.index(max(x)) + 1] - minX) / hexWidth)
-        height = round((min(y[y.index(max(y)) + 1], y[y.index(max(y)) - 1]) - minY) / hexHeight)
-        print("Map dimensions parsed")
-
-        #Create the hex grid
-        hexes = [Hex(x, y) for x in range(width) for y in range(height)]
-        print("Hex grid created")
-
-        #Translate the map so that it starts at zero
-        includableSvg.write("<g transform=\"scale({}) translate({},{})\">".format(zoom, -minX, -minY))
-
-        #Draw the sea
-        includableSvg.write("<path class=\"sea\" d=\"{}\"/>".format(layer[0].attrib["d"]))
-
-    elif layerName == "Islands and Continents":
-        includableSvg.write("<g class=\"land\">")
-        numberOfContinents = len(list(filter(lambda path: len(Path(path).polygon) >= 1000, layer)))
-        numberOfIslands = len(layer) - numberOfContinents
-        islandProgress = 0
-        continentProgress = 0
-        for island in sorted(layer, key = lambda path: len(path.attrib["d"])):    #Take the shortest paths first so that the if(not hex.isSea) optimization works as effictively as possible
-            includableSvg.write("<path d=\"{}\"/>".format(island.attrib["d"]))
-            path = Path(island)
-            isContinent = len(path.polygon) >= 1000
-            for hex in hexes:
-                if isContinent:
-                    percentage = ((continentProgress := continentProgress + 1) / (numberOfContinents * len(hexes)) * 100)
-                    if continentProgress % 1000 == 0 or percentage == 100:
-                        print("\rParsing continents: {:0.0f}%".format(percentage), end = None if percentage == 100 else "")
-                if not hex.isSea:    #If we already know this is an all land hex, we don't need to check again. We do need to check again for coastal hexes though, because there might be more adjacent land hexes.
-                    continue
-                if not path.hexIsNearby(hex):
-                    continue
-                (partlyInside, completelyInside) = hex.isInsidePolygon(path.polygon)
-                if partlyInside:
-                    hex.isLand = True
-                    if completelyInside:
-                        hex.isSea = False
-                        hex.adjacentLandHexes = [True, True, True, True, True, True]
-                        hex.adjacentSeaHexes = [False, False, False, False, False, False]
-                    else:
-                        vertexIsLand = []
-                        for vertex in hex.vertices:
-                            vertexIsLand.append(pointInsidePolygon(vertex, path.polygon))
-                        for i in range(6):
-                            landVertexCount = vertexIsLand[i] + vertexIsLand[i - 1] + pointInsidePolygon((hex.vertices[i] + hex.vertices[i - 1]) / 2, path.polygon)
-                            if landVertexCount >= 1:
-                                hex.adjacentLandHexes[i] = True
-                                if landVertexCount >= 3:
-                                    hex.adjacentSeaHexes[i] = False
-            if not isContinent:
-                percentage = (islandProgress := islandProgress + 1) * 100 // numberOfIslands
-                print("\rParsing islands: {}%".format(percentage), end = None if percentage == 100 else "")
-        includableSvg.write("</g>")
-
-    elif layerName == "Lakes":
-        includableSvg.write("<g id=\"lakes\" class=\"sea\">")
-        progress = 0
-        for lake in layer:
-            includableSvg.write("<path d=\"{}\"/>".format(lake.attrib["d"]))
-            path = Path(lake)
-            for hex in hexes:
-                if not path.hexIsNearby(hex):
-                    continue
-                (partlyInside, completelyInside) = hex.isInsidePolygon(path.polygon)
-                if partlyInside:
-                    hex.isSea = True
-                    if completelyInside:
-                        hex.isLand = False
-                        hex.adjacentSeaHexes = [True, True, True, True, True, True]
-                        hex.adjacentLandHexes = [False, False, False, False, False, False]
-                    else:
-                        vertexIsSea = []
-                        for vertex in hex.vertices:
-                            vertexIsSea.append(pointInsidePolygon(vertex, path.polygon))
-                        for i in range(6):
-                            seaVertexCount = vertexIsSea[i] + vertexIsSea[(i - 1) % 6]
-                            if seaVertexCount >= 1:
-                                hex.adjacentSeaHexes[i] = True
-                                if seaVertexCount >= 2:
-                                    hex.adjacentLandHexes[i] = False
-            percentage = (progress := progress + 1) * 100 // len(layer)
-            print("\rParsing lakes: {}%".format(percentage), end="")
-        print()    #To start a new line when each terrain type is done
-        includableSvg.write("</g>")
-
-    elif layerName == "Desert" or layerName == "Forest" or layerName == "Mountain" or layerName == "TallMountain" or layerName == "Icecap":
-        includableSvg.write("<g class=\"{}\">".format(layerName[0].lower() + layerName[1:]))
-        progress = 0
-        for terrain in layer:
-            includableSvg.write("<path d=\"{}\"/>".format(terrain.attrib["d"]))
-            path = Path(terrain)
-            for hex in hexes:
-                if not hex.isLand and layerName != "Icecap":    #Terrain can only exist in land hexes
-                    continue
-                if layerName == "TallMountain":
-                    if hex.terrain != "Mountain":    #All tall mountains are above regular mountains, if this hex isn't then we already know it isn't a tall mountain
-                        continue
-                else:
-                    if hex.terrain != "Clear":    #If we already know the terrain, we don't need to check again
-                        continue
-                if not path.hexIsNearby(hex):
-                    continue
-                if hex.isInsidePolygon(path.polygon)[0]:
-                    hex.terrain = layerName
-            percentage = (progress := progress + 1) * 100 // len(layer)
-            print("\rParsing {}s: {}%".format(layerName, percentage), end="")
-        print()    #To start a new line when each terrain type is done
-        includableSvg.write("</g>")
-
-    elif layerName == "Canals":
-        includableSvg.write("<g class=\"canal\">")
-        for g in layer:
-            includableSvg.write("<g>")
-            for path in g:
-                includableSvg.write("<path d=\"{}\"/>".format(path.attrib["d"]))
-            includableSvg.write("</g>")
-        includableSvg.write("</g>")
-        print("Canals parsed")
-
-    elif layerName == "Railways":
-        includableSvg.write("<g class=\"railway\">")
-        progress = 0
-        for railway in layer:
-            includableSvg.write("<path d=\"{}\"/>".format(railway.attrib["d"]))
-            path = Path(railway)
-            for hex in hexes:
-                if not hex.isLand:
-                    continue
-                if not path.hexIsNearby(hex):
+    def endCompilation(this) -> None:
+        #Only called when the compilation succeeds, so that a broken SVG file doesn't throw away the results of the last one that worked
+        this.entries = this.usedEntries
+        this.usedEntries = {}
+
+    def get(this, key: tuple) -> object | None:
+        value = this.entries.get(key)
+        if value is not None:
+            this.usedEntries[key] = value
+        return value
+
+    def put(this, key: tuple, value: object) -> None:
+        this.usedEntries[key] = value
+
+class CompiledMapsheet:
+    #The hex grid and the world map that compileLayers compiles from the layers of the mapsheet, which the output files are made from
+    grid: Grid
+    worldSvg: str    #world.xml, with the coarsest level of detail of each path
+    worldLevelPaths: list[list[str | None]]    #The more detailed levels of each path in world.xml, None for paths that are the same in all levels
+    countryNames: list[CountryName]
+    rebuiltLayers: list[str]
+    cachedLayers: list[str]
+
+    def __init__(this, grid: Grid, worldSvg: str, worldLevelPaths: list[list[str | None]], countryNames: list[CountryName], rebuiltLayers: list[str], cachedLayers: list[str]):
+        this.grid = grid
+        this.worldSvg = worldSvg
+        this.worldLevelPaths = worldLevelPaths
+        this.countryNames = countryNames
+        this.rebuiltLayers = rebuiltLayers
+        this.cachedLayers = cachedLayers
+
+def loadSvg(source: str | IO) -> list[XML.Element]:
+    #Parses the whole SVG file (a file name or a file object) at once. Unlike the layers from svgLayers, these layers can be compiled several times, such as with different options.
+    return list(XML.parse(source).getroot())
+
+def compileLayers(layers: Iterable[XML.Element], jobs: int = 1, cacheFolder: str | None = None, fullDetail: bool = False, profiler: Profiler | None = None, memoryCache: MemoryCache | None = None) -> CompiledMapsheet:
+    """
+    Creates the hex grid from the Ocean layer and then finds out everything about the hexes from the other layers, in the order of the layers. The Ocean layer needs to come before the layers that depend on the hex grid.
+    jobs: The number of processes to use for finding which hexes each path affects.
+    cacheFolder: The folder to save the results of each layer in, so that only layers that changed (and layers depending on them) need to be rebuilt next time. None to rebuild all layers without reading or writing the cache.
+    fullDetail: Copy the paths to world.xml as they are instead of simplifying them to several levels of detail.
+    memoryCache: The results of the previous compilation to reuse for the layers and paths that haven't changed, and to save the results of this compilation in. Unlike the cache folder, it also works for the paths of layers that changed.
+    """
+    profiler = profiler if profiler is not None else Profiler()
+    grid: Grid | None = None
+    pool: multiprocessing.pool.Pool | None = None
+    worldSvg = io.StringIO()
+    countryNames = []
+    worldLevelPaths: list[list[str | None]] = []
+
+    def writePath(d: str, attributes: str = "", simplify: bool = True) -> None:
+        #Writes the coarsest level of detail of the path to world.xml and saves the others for world-1.json, world-2.json, ...
+        profiler.count(paths = 1)
+        if fullDetail:
+            layerSvg.write("<path{} d=\"{}\"/>".format(attributes, d))
+        elif simplify:
+            levels = memoryCache.get(("simplifiedPaths", d)) if memoryCache is not None else None
+            if levels is None:
+                levels = simplifiedPaths(d, grid.hexWidth)
+                if memoryCache is not None:
+                    memoryCache.put(("simplifiedPaths", d), levels)
+            layerSvg.write("<path{} d=\"{}\"/>".format(attributes, levels[0]))
+            layerLevelPaths.append(levels[1:])
+        else:
+            layerSvg.write("<path{} d=\"{}\"/>".format(attributes, d))
+            layerLevelPaths.append([None] * (len(levelsOfDetail) - 1))
+
+    #The hex attributes that the slow layers read and write (in that order). The cache key of a layer depends on the cache keys of the layers that last wrote the attributes it reads, so that for example terrain is rebuilt when isLand changes.
+    landAttributes = ["isLand", "isSea", "adjacentLandHexes", "adjacentSeaHexes"]
+    cachedLayerAttributes: dict[str, tuple[list[str], list[str]]] = {
+        "Islands and Continents": ([], landAttributes),
+        "Lakes": (landAttributes, landAttributes),
+        "Desert": (["isLand", "terrain"], ["terrain"]),
+        "Forest": (["isLand", "terrain"], ["terrain"]),
+        "Mountain": (["isLand", "terrain"], ["terrain"]),
+        "TallMountain": (["isLand", "terrain"], ["terrain"]),
+        "Icecap": (["isLand", "terrain"], ["terrain"]),
+        "Railways": (["isLand"], ["canUseRail"]),
+        "Weather Zones": ([], ["weatherZone"])
+    }
+    attributeHashes: dict[str, str] = {}    #The cache key of the layer that last wrote each attribute
+    rebuiltLayers = []
+    cachedLayers = []
+
+    try:
+        for layer in profiler.iterate(layers, "Parsing the SVG file"):
+            if layer.tag != "{http://www.w3.org/2000/svg}g":
+                continue
+            layerName = layer.attrib["{http://www.inkscape.org/namespaces/inkscape}label"]
+            profiler.startStage(layerName)
+
+            if layerName != "Country Names":
+                for element in layer:
+                    if "transform" in element.attrib:
+                        raise ValueError("Element in layer {} has transform=\"{}\" attribute, might not be parsed correctly.".format(layerName, element.attrib["transform"]))
+
+            #Everything that the layer draws is written here first so that it can be cached
+            layerSvg = io.StringIO()
+            layerLevelPaths: list[list[str | None]] = []
+
+            #Load the layer from the cache if neither it nor anything it depends on has changed
+            layerHash = None
+            cacheFile = None
+            if (cacheFolder is not None or memoryCache is not None) and layerName in cachedLayerAttributes:
+                readAttributes, writtenAttributes = cachedLayerAttributes[layerName]
+                layerHash = hashlib.sha256(gridHash.encode())
+                layerHash.update(XML.tostring(layer))
+                for attribute in readAttributes + writtenAttributes:
+                    layerHash.update(attributeHashes.get(attribute, gridHash).encode())
+                layerHash = layerHash.hexdigest()
+                for attribute in writtenAttributes:
+                    attributeHashes[attribute] = layerHash
+                cachedLayer = memoryCache.get(("layer", layerHash)) if memoryCache is not None else None
+                if cacheFolder is not None:
+                    cacheFile = os.path.join(cacheFolder, layerHash + ".pickle")
+                    if cachedLayer is None and os.path.exists(cacheFile):
+                        with open(cacheFile, "rb") as file:
+                            cachedLayer = pickle.load(file)
+                        if memoryCache is not None:
+                            memoryCache.put(("layer", layerHash), cachedLayer)
+                if cachedLayer is not None:
+                    cachedSvg, cachedLevelPaths, changedColumns = cachedLayer
+                    for attribute, (indices, values) in changedColumns.items():
+                        getattr(grid, attribute)[indices] = values
+                    worldSvg.write(cachedSvg)
+                    worldLevelPaths.extend(cachedLevelPaths)
+                    cachedLayers.append(layerName)
+                    profiler.count(cacheHits = 1)
+                    print("{} loaded from cache".format(layerName))
                     continue
-                if hex.polygonPassesThrough(path.polygon):
-                    hex.canUseRail = True
-        includableSvg.write("</g>")
-
-    elif layerName == "Borders":
-        includableSvg.write("<g class=\"border\">")
-        for border in layer:
-            originalCss = border.attrib["style"].replace(" ", "")
-            isTemporary = originalCss.find("stroke-dasharray") != originalCss.find("stroke-dasharray:none")
-            includableSvg.write(("<path class=\"temporary\" d=\"{}\"/>" if isTemporary else "<path d=\"{}\"/>").format(border.attrib["d"]))
-        includableSvg.write("</g>")
-        print("Borders drawn")
-
-    elif layerName == "Weather Zones":
-        #Get the weather zone data
-        polarPolygons = []
-        industrializedPolygons = []
-        northernTemperatePolygons = []
-        tropicalPolygons = []
-        southernTemperatePolygons = []
-        polarPaths = []
-        industrializedPaths = []
-        northernTemperatePaths = []
-        tropicalPaths = []
-        southernTemperatePaths = []
-        for weatherZone in layer:
-            path = parse_path(weatherZone.attrib["d"])[1:]
-            polygon = []
-            for line in path:
-                if len(polygon) == 0:
-                    polygon.append(line.start)
-                polygon.append(line.end)
-            r, g, b = re.search(r"stroke:#([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})", weatherZone.attrib["style"]).groups()
-            r, g, b = int(r, 16), int(g, 16), int(b, 16)
-            if r - g - b > 0:
-                tropicalPaths.append(path)
-                tropicalPolygons.append(polygon)
-            elif g - r - b > 0:
-                northernTemperatePaths.append(path)
-                northernTemperatePolygons.append(polygon)
-            elif b - r - g > 0:
-                polarPaths.append(path)
-                polarPolygons.append(polygon)
-            elif r + g - 4 * b > 0:
-                southernTemperatePaths.append(path)
-                southernTemperatePolygons.append(polygon)
-            else:
-                industrializedPaths.append(path)
-                industrializedPolygons.append(polygon)
-
-        #Get the boundaries between the fair weather zone and the tropical and northen temperate weather zones
-        fairPaths = []
-        northernTemperateLines, tropicalLines = [
-            [Line(line.start, line.end) for path in paths for line in path]    #Use Line(line.start, line.end) instead of just line so that we don't insert Close object into the fair polygon at random
-            for paths in [northernTemperatePaths, tropicalPaths]
-        ]
-        epsilon = hexWidth / 100
-        def linesAreEqual(l1: Line, l2: Line) -> bool:
-            return (abs(l1.start - l2.start) < epsilon and abs(l1.end - l2.end) < epsilon) or (abs(l1.start - l2.end) < epsilon and abs(l1.end - l2.start) < epsilon)
-        def lineInArray(line: Line, array: list[Line]) -> int | None:
-            for i in range(len(array)):
-                l = array[i]
-                if linesAreEqual(line, l):
-                    return i
-            return None
-        while startLine := next(filter(lambda l: lineInArray(l, tropicalLines) == None and lineInArray(l, [line for path in fairPaths for line in path]) == None, northernTemperateLines), None):
-            currentLines, otherLines = northernTemperateLines, tropicalLines
-            path = []
-            i = northernTemperateLines.index(startLine)
-            direction = 1
-            while True:
-                line = currentLines[i]
-                if len(path) > 0 and line is path[0]:
-                    break
-                elif (otherIndex := lineInArray(line, otherLines)) != None:
-                    direction = 1 if linesAreEqual(otherLines[otherIndex - 1], currentLines[(i + direction) % len(currentLines)]) else -1
-                    i = otherIndex + direction
-                    currentLines, otherLines = otherLines, currentLines
+                columnsBefore = [getattr(grid, attribute).copy() for attribute in writtenAttributes]
+
+            if layerName == "Ocean":
+                grid = Grid.fromOceanPath(layer[0].attrib["d"])
+                print("Hex grid created")
+
+                #Everything that the cached layers depend on, including this file so that changes to how the mapsheet is compiled invalidate the cache
+                with open(__file__, "rb") as file:
+                    gridHash = hashlib.sha256(file.read())
+                gridHash.update(repr((grid.minX, grid.minY, grid.hexWidth, grid.hexHeight, grid.resolution, grid.width, grid.height, zoom, levelsOfDetail, fullDetail)).encode())
+                gridHash = gridHash.hexdigest()
+                if memoryCache is not None:
+                    memoryCache.startCompilation(gridHash)
+
+                #Start the worker processes now that they can get the hex grid
+                if jobs > 1:
+                    pool = multiprocessing.Pool(jobs, initializer = initializeWorker, initargs = (grid.minX, grid.minY, grid.hexWidth, grid.hexHeight, grid.width, grid.height))
+
+                #Translate the map so that it starts at zero
+                if fullDetail:
+                    layerSvg.write("<g transform=\"scale({}) translate({},{})\">".format(zoom, -grid.minX, -grid.minY))
                 else:
-                    path.append(line)
-                    i += direction
-                    i %= len(currentLines)
-            fairPaths.append(path)
-        for path in fairPaths:
-            path[-1] = Close(path[-1].start, path[-1].end)
-
-
-        #Draw the weather zones on the map
-        includableSvg.write("<g class=\"weather\">")
-        for paths, innerCssClass, outerCssClass in [
-            (polarPaths, "polar", "temperate"),
-            (industrializedPaths, "industrialized", "temperate"),
-            (northernTemperatePaths, "temperate", "none"),
-            (tropicalPaths, "tropical", "none"),
-            (fairPaths, "fair", "fair"),
-            (southernTemperatePaths, "temperate", "fair")
-        ]:
-            for path in paths:
-                polygons = ([], [])
-                hexSide = hexWidth * 2/3
-                r = hexSide / 3
-                for i in range(len(path)):
-                    for j in range(2):
-                        #Copy the lines so that changes to them won't affect the original path
-                        currentLine = copy(path[i])
-                        previousLine = copy(path[i - 1])
-
-                        #Find the x and y coordinates at which the line should be moved
-                        currentSlope = lineEquation(currentLine)[0]
-                        currentDy = (-1)**(i+j) * r / np.sqrt(currentSlope**2 + 1)
-                        currentDx = currentSlope * currentDy
-
-                        #Move the line
-                        currentLine.start += complex(currentDx, currentDy)
-                        currentLine.end += complex(currentDx, currentDy)
-
-                        #If this is the beginning of a non-closed line, simply append the start of it
-                        if i == 0 and not isinstance(previousLine, Close):
-                            polygons[j].append(currentLine.start)
+                    layerSvg.write("<g transform=\"scale({}) translate({},{})\" data-levels-of-detail=\"{}\">".format(zoom, -grid.minX, -grid.minY, ",".join(map(str, levelsOfDetail))))    #So that the view knows when to switch to the next level
+
+                #Draw the sea
+                writePath(layer[0].attrib["d"], " class=\"sea\"")
+
+            elif layerName == "Islands and Continents":
+                layerSvg.write("<g class=\"land\">")
+                islands = sorted(layer, key = lambda path: len(path.attrib["d"]))    #Take the shortest paths first so that the if(not hex.isSea) optimization works as effictively as possible
+                progress = 0
+                for island, (hexResults, sideIds, landPointCounts) in zip(islands, classifyPaths(grid, layerName, islands, pool, jobs, profiler, memoryCache)):
+                    writePath(island.attrib["d"])
+                    for x, y, completelyInside in hexResults:
+                        hex = grid.hexes[x * grid.height + y]
+                        if not hex.isSea:    #If we already know this is an all land hex, there's nothing left to change. The adjacency of coastal hexes is updated below, because there might be more adjacent land hexes.
                             continue
+                        hex.isLand = True
+                        if completelyInside:
+                            hex.isSea = False
+                    #Hexsides with any land are crossable by land, and hexsides that are completely land (both ends and the midpoint) aren't crossable by sea. The adjacency is only ever changed for both hexes at once, so it's always symmetric.
+                    grid.setHexsideBits(grid.adjacentLandHexes, sideIds, True)
+                    grid.setHexsideBits(grid.adjacentSeaHexes, sideIds[landPointCounts >= 3], False)
+                    profiler.progress("Parsing islands and continents", progress := progress + 1, len(islands))
+                layerSvg.write("</g>")
 
-                        #Do the same thing as above but for the previous line
-                        previousSlope = lineEquation(previousLine)[0]
-                        previousDy = (-1)**(i+j+1) * r / np.sqrt(previousSlope**2 + 1)
-                        previousDx = previousSlope * previousDy
-                        previousLine.start += complex(previousDx, previousDy)
-                        previousLine.end += complex(previousDx, previousDy)
-
-                        #Append the intersection of this line and the previous one
-                        polygons[j].append(lineIntersection(previousLine, currentLine))
-                        #If this is the end of a non-closed line, append the end of it
-                        if i == len(path) - 1 and not isinstance(currentLine, Close):
-                            polygons[j].append(currentLine.end)
-
-                if pointInsidePolygon(polygons[0][1], polygons[1]):
-                    innerPolygon, outerPolygon = polygons
-                else:
-                    outerPolygon, innerPolygon = polygons
-                if paths is fairPaths:
-                    if pointInsidePolygon(polarPolygons[0][0], outerPolygon):
-                        innerCssClass = "none"
-                        outerCssClass = "fair"
+            elif layerName == "Lakes":
+                layerSvg.write("<g id=\"lakes\" class=\"sea\">")
+                progress = 0
+                for lake, (hexResults, sideIds, seaPointCounts) in zip(layer, classifyPaths(grid, layerName, layer, pool, jobs, profiler, memoryCache)):
+                    writePath(lake.attrib["d"])
+                    for x, y, completelyInside in hexResults:
+                        hex = grid.hexes[x * grid.height + y]
+                        hex.isSea = True
+                        if completelyInside:
+                            hex.isLand = False
+                    #Hexsides with either end in the lake are crossable by sea, and hexsides with both ends in it aren't crossable by land
+                    grid.setHexsideBits(grid.adjacentSeaHexes, sideIds, True)
+                    grid.setHexsideBits(grid.adjacentLandHexes, sideIds[seaPointCounts >= 2], False)
+                    profiler.progress("Parsing lakes", progress := progress + 1, len(layer))
+                layerSvg.write("</g>")
+
+            elif layerName == "Desert" or layerName == "Forest" or layerName == "Mountain" or layerName == "TallMountain" or layerName == "Icecap":
+                layerSvg.write("<g class=\"{}\">".format(layerName[0].lower() + layerName[1:]))
+                progress = 0
+                for terrain, hexResults in zip(layer, classifyPaths(grid, layerName, layer, pool, jobs, profiler, memoryCache)):
+                    writePath(terrain.attrib["d"])
+                    for x, y in hexResults:
+                        hex = grid.hexes[x * grid.height + y]
+                        if not hex.isLand and layerName != "Icecap":    #Terrain can only exist in land hexes
+                            continue
+                        if layerName == "TallMountain":
+                            if hex.terrain != "Mountain":    #All tall mountains are above regular mountains, if this hex isn't then we already know it isn't a tall mountain
+                                continue
+                        else:
+                            if hex.terrain != "Clear":    #If we already know the terrain, it shouldn't be overwritten
+                                continue
+                        hex.terrain = layerName
+                    profiler.progress("Parsing {}s".format(layerName), progress := progress + 1, len(layer))
+                layerSvg.write("</g>")
+
+            elif layerName == "Canals":
+                layerSvg.write("<g class=\"canal\">")
+                for g in layer:
+                    layerSvg.write("<g>")
+                    for path in g:
+                        writePath(path.attrib["d"])
+                    layerSvg.write("</g>")
+                layerSvg.write("</g>")
+                print("Canals parsed")
+
+            elif layerName == "Railways":
+                layerSvg.write("<g class=\"railway\">")
+                progress = 0
+                for railway, hexResults in zip(layer, classifyPaths(grid, layerName, layer, pool, jobs, profiler, memoryCache)):
+                    writePath(railway.attrib["d"])
+                    for x, y in hexResults:
+                        hex = grid.hexes[x * grid.height + y]
+                        if hex.isLand:
+                            hex.canUseRail = True
+                layerSvg.write("</g>")
+                print("Railways parsed")
+
+            elif layerName == "Borders":
+                layerSvg.write("<g class=\"border\">")
+                for border in layer:
+                    originalCss = border.attrib["style"].replace(" ", "")
+                    isTemporary = originalCss.find("stroke-dasharray") != originalCss.find("stroke-dasharray:none")
+                    writePath(border.attrib["d"], " class=\"temporary\"" if isTemporary else "")
+                layerSvg.write("</g>")
+                print("Borders drawn")
+
+            elif layerName == "Weather Zones":
+                #Get the weather zone data
+                polarPolygons = []
+                industrializedPolygons = []
+                northernTemperatePolygons = []
+                tropicalPolygons = []
+                southernTemperatePolygons = []
+                polarPaths = []
+                industrializedPaths = []
+                northernTemperatePaths = []
+                tropicalPaths = []
+                southernTemperatePaths = []
+                for weatherZone in layer:
+                    path = parse_path(weatherZone.attrib["d"])[1:]
+                    polygon = []
+                    for line in path:
+                        if len(polygon) == 0:
+                            polygon.append(line.start)
+                        polygon.append(line.end)
+                    polygon = np.array(polygon, dtype=complex)
+                    r, g, b = re.search(r"stroke:#([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})", weatherZone.attrib["style"]).groups()
+                    r, g, b = int(r, 16), int(g, 16), int(b, 16)
+                    if r - g - b > 0:
+                        tropicalPaths.append(path)
+                        tropicalPolygons.append(polygon)
+                    elif g - r - b > 0:
+                        northernTemperatePaths.append(path)
+                        northernTemperatePolygons.append(polygon)
+                    elif b - r - g > 0:
+                        polarPaths.append(path)
+                        polarPolygons.append(polygon)
+                    elif r + g - 4 * b > 0:
+                        southernTemperatePaths.append(path)
+                        southernTemperatePolygons.append(polygon)
                     else:
-                        outerCssClass = "none"
-                        innerCssClass = "fair"
-                for polygon, cssClass in [(innerPolygon, innerCssClass), (outerPolygon, outerCssClass)]:
-                    if cssClass == "none":
+                        industrializedPaths.append(path)
+                        industrializedPolygons.append(polygon)
+
+                #Get the boundaries between the fair weather zone and the tropical and northen temperate weather zones
+                fairPaths = []
+                northernTemperateLines, tropicalLines = [
+                    [Line(line.start, line.end) for path in paths for line in path]    #Use Line(line.start, line.end) instead of just line so that we don't insert Close object into the fair polygon at random
+                    for paths in [northernTemperatePaths, tropicalPaths]
+                ]
+                epsilon = grid.hexWidth / 100
+                northernTemperateIndex, tropicalIndex, fairIndex = LineIndex(epsilon, northernTemperateLines), LineIndex(epsilon, tropicalLines), LineIndex(epsilon)
+                #A line that can't start a path can't start one later either, so the start lines can be found in one pass
+                for startIndex, startLine in enumerate(northernTemperateLines):
+                    if tropicalIndex.find(startLine) != None or fairIndex.find(startLine) != None:
                         continue
-                    d = ""
-                    for point in polygon:
-                        d += "L{} {}".format(point.real, point.imag)
-                    d = "M" + d[1:]
-                    if isinstance(path[-1], Close):
-                        d += "Z"
-                    includableSvg.write("<path class=\"{}\" d=\"{}\"/>".format(cssClass, d))
-
-        includableSvg.write("</g>")
-
-        #Set the weather zones for each hex
-        percentage = 100 / len(hexes)
-        for hex in hexes:
-            (hex.checkWeatherZone("Polar", polarPolygons) or
-            hex.checkWeatherZone("Industrialized", industrializedPolygons) or
-            hex.checkWeatherZone("NorthTemperate", northernTemperatePolygons) or
-            hex.checkWeatherZone("Tropical", tropicalPolygons) or
-            hex.checkWeatherZone("SouthTemperate", southernTemperatePolygons))
-            if int(percentage) != int(percentage := percentage + 100 / len(hexes)):
-                print("\rParsing weather zones: {:0.0f}%".format(percentage), end="")
-        print()    #To start a new line since this isn't done automatically above
-
-    elif layerName == "Hex grid":
-        pass    #Don't do anything with the hex grid, it will be created dynamically in Javascript
-
-    elif layerName == "Country Names":
-        includableSvg.write("<g class=\"countryNames\">")
-        for textElement in layer:
-            text = '\n'.join(list(textElement.itertext()))
-            tokens = re.findall(r"(?:^|\s)(?:[a-zA-Z]+|tr\(\"[^\"]+\"\)|\"[^\"]+\")(?=$|\s)", text)
-            css = textElement.attrib["style"]
-            fontSize = re.search(r"font-size\s*:\s*([0-9\.]+)px", css)[1]
-            textAnchor = (re.search(r"text-anchor\s*:\s*([^;]+)(?:;|$)", css) or [None, "right"])[1]
-            transform = None
-            if "transform" in textElement.attrib:
-                transform = textElement.attrib["transform"]
-            countryNames.append(CountryName(tokens, textElement.attrib["x"], textElement.attrib["y"], fontSize, textAnchor, transform))
-        includableSvg.write("</g>")
-        print("Country names drawn")
-
-    elif layerName == "Hex info":
-        labels = sorted(layer, key = lambda t: (float(t.attrib["x"]) - minX) // hexWidth + (float(t.attrib["y"]) - minY) / (hexHeight * height))
-        country: str | None = None
-        info = ""
-        for hex in hexes:
-            if len(labels) > 0 and pointInsidePolygon(complex(float(labels[0].attrib["x"]), float(labels[0].attrib["y"])), hex.vertices):
-                lines = list(labels[0].itertext())    # Contains one element for each line (tspan) in the hex info
-                for line in lines:
-                    # Lines starting with an upper case letter are for city hexes (the word starting with the uppercase letter is the name of the city).
-                    # Lines starting with "null" are non-city resource hexes.
-                    if line[0].isupper() or line.startswith("null"):
-                        # Format of city labels: name, [alignment], [offset x, offset y], [hex-specific info]
-                        cityLabel = line.split(",")
-                        hex.city = cityLabel[0] if cityLabel[0] != "null" else None
-                        cityLabel = cityLabel[1:]
-                        if len(cityLabel) > 0 and cityLabel[0] in ["top", "bottom", "left", "right"]:
-                            hex.cityAlignment = cityLabel[0]
-                            cityLabel = cityLabel[1:]
-                        try:
-                            hex.cityOffset = (float(cityLabel[0]), float(cityLabel[1]))
-                            cityLabel = cityLabel[2:]
-                        except(IndexError, ValueError):
-                            pass
-                        cityInfo = cityLabel[0] if len(cityLabel) > 0 else ""
-                        """
-                        Valid city info letters (different from regular info below because they only apply to one hex, not to all hexes after):
-                            e = enclave city (displays the country name in parentheses after the city name)
-                            h = capital (as in huvudstad, since c already means colony)
-                            m = resource hex (as in money, since r already means rail)
-                            p = major port
-                        """
-                        if 'e' in cityInfo:
-                            assert hex.city != None, "An enclave city must be a city"
-                            hex.isEnclaveCity = True
-                        if 'h' in cityInfo:
-                            hex.isCapital = True
-                        if 'm' in cityInfo:
-                            hex.isResourceHex = True
-                        if 'p' in cityInfo:
-                            hex.isMajorPort = True
-                    # Lines starting with a lowercase letter (other than "null") indicate country info about the hex (the word starting with the lowercase letter is the Javascript name of the corresponding Country object).
-                    elif line[0].islower():
-                        label = line.split(",")
-                        country = label[0]
-                        info = label[1] if len(label) > 1 else ""
-                    else:
-                        raise AssertionError(f"Label line '{line}' starts with non-letter")
-                labels = labels[1:]    # Go to the next label
-                assert len(labels) == 0 or not pointInsidePolygon(complex(float(labels[0].attrib["x"]), float(labels[0].attrib["y"])), hex.vertices), "Multiple hex info labels in the hex {}".format(hex.center)    # The next label should not be in the same hex as this one
-            if not hex.isLand:
-                continue
+                    currentLines, otherLines = northernTemperateLines, tropicalLines
+                    currentIndex, otherIndex = northernTemperateIndex, tropicalIndex
+                    path = []
+                    i = startIndex
+                    direction = 1
+                    while True:
+                        line = currentLines[i]
+                        if len(path) > 0 and line is path[0]:
+                            break
+                        elif (j := otherIndex.find(line)) != None:
+                            direction = 1 if otherIndex.linesAreEqual(otherLines[j - 1], currentLines[(i + direction) % len(currentLines)]) else -1
+                            i = (j + direction) % len(otherLines)
+                            currentLines, otherLines = otherLines, currentLines
+                            currentIndex, otherIndex = otherIndex, currentIndex
+                        else:
+                            path.append(line)
+                            i += direction
+                            i %= len(currentLines)
+                    fairPaths.append(path)
+                    for line in path:
+                        fairIndex.add(line)
+                for path in fairPaths:
+                    path[-1] = Close(path[-1].start, path[-1].end)
 
-            assert country != None, "Found land hex before first hex info label"
-            hex.country = country
-
-            """
-            Valid info letters:
-                c = colony
-                f = free France (controlled by UK if Vichy France is created)
-                g = Greenland (controlled by US if Denmark is conquered)
-                i = India (rail movement allowed, special rules for Indian units)
-                j = controlled by Japan in 1939 (for Chinese hexes) or when Vichy France is created (for French hexes)
-                o = occupied France (controlled by Germany if Vichy France is created)
-                r = can use rail (implicit for some countries)
-                s = controlled by Soviet Union if Germany attacks Poland (for all hexes except northernmost Finnish ones) or when Finland surrenders (for all Finnish hexes), implicit for Estonia, Latvia and Lithuania
-                v = Vichy France
-            """
-            if 'c' in info:
-                hex.isColony = True
-            if 'e' in info:
-                hex.isEnclaveCity = True
-            if 'f' in info:
-                hex.secondaryController = "unitedKingdom"
-            if 'g' in info:
-                hex.secondaryController = "unitedStates"
-            if 'h' in info:
-                hex.isResourceHex = True
-            if 'i' in info:
-                hex.isIndia = True
-                if hex.terrain != "TallMountain":
-                    hex.canUseRail = True
-            if 'j' in info:
-                hex.secondaryController = "japan"
-            if 'o' in info:
-                hex.secondaryController = "germany"
-            if 'p' in info:
-                hex.isMajorPort = True
-            if 'r' in info or country == "japan" or (country == "china" and hex.terrain != "TallMountain") or (country == "argentina" and hex.weatherZone != "SouthTemperate") or (not hex.isColony and hex.terrain != "Icecap" and country in ["portugal", "spain", "france", "unitedKingdom", "ireland", "belgium", "netherlands", "luxemburg", "germany", "switzerland", "italy", "denmark", "sweden", "norway", "finland", "estonia", "latvia", "lithuania", "poland", "hungary", "romania", "bulgaria", "yugoslavia", "greece", "newZealand", "unitedStates"]):
-                hex.canUseRail = True
-            if 's' in info or country in ["estonia", "latvia", "lithuania"]:
-                hex.secondaryController = "sovietUnion"
-            if 'v' in info:
-                hex.secondaryController = "france"
-        print("Hex info parsed")
 
+                #Draw the weather zones on the map
+                layerSvg.write("<g class=\"weather\">")
+                for paths, innerCssClass, outerCssClass in [
+                    (polarPaths, "polar", "temperate"),
+                    (industrializedPaths, "industrialized", "temperate"),
+                    (northernTemperatePaths, "temperate", "none"),
+                    (tropicalPaths, "tropical", "none"),
+                    (fairPaths, "fair", "fair"),
+                    (southernTemperatePaths, "temperate", "fair")
+                ]:
+                    for path in paths:
+                        hexSide = grid.hexWidth * 2/3
+                        polygons = offsetLines(np.array([line.start for line in path]), np.array([line.end for line in path]), hexSide / 3, isinstance(path[-1], Close))
+                        if pointsInsidePolygon(polygons[0][1:2], polygons[1])[0]:
+                            innerPolygon, outerPolygon = polygons
+                        else:
+                            outerPolygon, innerPolygon = polygons
+                        if paths is fairPaths:
+                            if pointsInsidePolygon(polarPolygons[0][:1], outerPolygon)[0]:
+                                innerCssClass = "none"
+                                outerCssClass = "fair"
+                            else:
+                                outerCssClass = "none"
+                                innerCssClass = "fair"
+                        for polygon, cssClass in [(innerPolygon, innerCssClass), (outerPolygon, outerCssClass)]:
+                            if cssClass == "none":
+                                continue
+                            d = "M" + "L".join("{} {}".format(point.real, point.imag) for point in polygon.tolist())
+                            if isinstance(path[-1], Close):
+                                d += "Z"
+                            writePath(d, " class=\"{}\"".format(cssClass), simplify = False)
+
+                layerSvg.write("</g>")
+
+                #Set the weather zones for each hex, the first weather zone that a hex is in takes priority. The zones are painted from the last to the first so that the first one ends up on top.
+                weatherZones = [
+                    ("Polar", polarPolygons),
+                    ("Industrialized", industrializedPolygons),
+                    ("NorthTemperate", northernTemperatePolygons),
+                    ("Tropical", tropicalPolygons),
+                    ("SouthTemperate", southernTemperatePolygons)
+                ]
+                weatherZoneIds = np.full((grid.width, grid.height), -1)
+                for weatherZoneId in reversed(range(len(weatherZones))):
+                    for polygon in weatherZones[weatherZoneId][1]:
+                        weatherZoneIds[grid.hexCentersInsidePolygon(polygon)] = weatherZoneId
+                weatherZoneIds = weatherZoneIds.reshape(-1)    #In the same x-major order as the grid columns
+                weatherZoneCodes = np.array([grid.weatherZones.index(name) for name, polygons in weatherZones], dtype=np.uint8)
+                grid.weatherZone[weatherZoneIds >= 0] = weatherZoneCodes[weatherZoneIds[weatherZoneIds >= 0]]
+                print("Weather zones parsed")
+
+            elif layerName == "Hex grid":
+                pass    #Don't do anything with the hex grid layer, the outline of the hexes is written to hex-grid.js from the grid by hexGridScript
+
+            elif layerName == "Country Names":
+                layerSvg.write("<g class=\"countryNames\">")
+                for textElement in layer:
+                    text = '\n'.join(list(textElement.itertext()))
+                    tokens = re.findall(r"(?:^|\s)(?:[a-zA-Z]+|tr\(\"[^\"]+\"\)|\"[^\"]+\")(?=$|\s)", text)
+                    css = textElement.attrib["style"]
+                    fontSize = re.search(r"font-size\s*:\s*([0-9\.]+)px", css)[1]
+                    textAnchor = (re.search(r"text-anchor\s*:\s*([^;]+)(?:;|$)", css) or [None, "right"])[1]
+                    transform = None
+                    if "transform" in textElement.attrib:
+                        transform = textElement.attrib["transform"]
+                    countryNames.append(CountryName(tokens, textElement.attrib["x"], textElement.attrib["y"], fontSize, textAnchor, transform))
+                layerSvg.write("</g>")
+                print("Country names drawn")
+
+            elif layerName == "Hex info":
+                labelsByHex: dict[int, XML.Element] = {}
+                for label in layer:
+                    x, y = grid.hexCoordinates(complex(float(label.attrib["x"]), float(label.attrib["y"])))
+                    if not (0 <= x < grid.width and 0 <= y < grid.height):
+                        print("Warning: Ignoring hex info label outside the map at ({}, {})".format(label.attrib["x"], label.attrib["y"]))
+                        continue
+                    assert x * grid.height + y not in labelsByHex, "Multiple hex info labels in the hex {}".format(grid.hexes[x * grid.height + y].center)
+                    labelsByHex[x * grid.height + y] = label
+                country: str | None = None
+                info = ""
+                for i, hex in enumerate(grid.hexes):
+                    if i in labelsByHex:
+                        lines = list(labelsByHex[i].itertext())    # Contains one element for each line (tspan) in the hex info
+                        for line in lines:
+                            # Lines starting with an upper case letter are for city hexes (the word starting with the uppercase letter is the name of the city).
+                            # Lines starting with "null" are non-city resource hexes.
+                            if line[0].isupper() or line.startswith("null"):
+                                # Format of city labels: name, [alignment], [offset x, offset y], [hex-specific info]
+                                cityLabel = line.split(",")
+                                hex.city = cityLabel[0] if cityLabel[0] != "null" else None
+                                cityLabel = cityLabel[1:]
+                                if len(cityLabel) > 0 and cityLabel[0] in ["top", "bottom", "left", "right"]:
+                                    hex.cityAlignment = cityLabel[0]
+                                    cityLabel = cityLabel[1:]
+                                try:
+                                    hex.cityOffset = (float(cityLabel[0]), float(cityLabel[1]))
+                                    cityLabel = cityLabel[2:]
+                                except(IndexError, ValueError):
+                                    pass
+                                cityInfo = cityLabel[0] if len(cityLabel) > 0 else ""
+                                """
+                                Valid city info letters (different from regular info below because they only apply to one hex, not to all hexes after):
+                                    e = enclave city (displays the country name in parentheses after the city name)
+                                    h = capital (as in huvudstad, since c already means colony)
+                                    m = resource hex (as in money, since r already means rail)
+                                    p = major port
+                                """
+                                if 'e' in cityInfo:
+                                    assert hex.city != None, "An enclave city must be a city"
+                                    hex.isEnclaveCity = True
+                                if 'h' in cityInfo:
+                                    hex.isCapital = True
+                                if 'm' in cityInfo:
+                                    hex.isResourceHex = True
+                                if 'p' in cityInfo:
+                                    hex.isMajorPort = True
+                            # Lines starting with a lowercase letter (other than "null") indicate country info about the hex (the word starting with the lowercase letter is the Javascript name of the corresponding Country object).
+                            elif line[0].islower():
+                                label = line.split(",")
+                                country = label[0]
+                                info = label[1] if len(label) > 1 else ""
+                            else:
+                                raise AssertionError(f"Label line '{line}' starts with non-letter")
+                    if not hex.isLand:
+                        continue
+
+                    assert country != None, "Found land hex before first hex info label"
+                    hex.country = country
+
+                    """
+                    Valid info letters:
+                        c = colony
+                        f = free France (controlled by UK if Vichy France is created)
+                        g = Greenland (controlled by US if Denmark is conquered)
+                        i = India (rail movement allowed, special rules for Indian units)
+                        j = controlled by Japan in 1939 (for Chinese hexes) or when Vichy France is created (for French hexes)
+                        o = occupied France (controlled by Germany if Vichy France is created)
+                        r = can use rail (implicit for some countries)
+                        s = controlled by Soviet Union if Germany attacks Poland (for all hexes except northernmost Finnish ones) or when Finland surrenders (for all Finnish hexes), implicit for Estonia, Latvia and Lithuania
+                        v = Vichy France
+                    """
+                    if 'c' in info:
+                        hex.isColony = True
+                    if 'e' in info:
+                        hex.isEnclaveCity = True
+                    if 'f' in info:
+                        hex.secondaryController = "unitedKingdom"
+                    if 'g' in info:
+                        hex.secondaryController = "unitedStates"
+                    if 'h' in info:
+                        hex.isResourceHex = True
+                    if 'i' in info:
+                        hex.isIndia = True
+                        if hex.terrain != "TallMountain":
+                            hex.canUseRail = True
+                    if 'j' in info:
+                        hex.secondaryController = "japan"
+                    if 'o' in info:
+                        hex.secondaryController = "germany"
+                    if 'p' in info:
+                        hex.isMajorPort = True
+                    if 'r' in info or country == "japan" or (country == "china" and hex.terrain != "TallMountain") or (country == "argentina" and hex.weatherZone != "SouthTemperate") or (not hex.isColony and hex.terrain != "Icecap" and country in ["portugal", "spain", "france", "unitedKingdom", "ireland", "belgium", "netherlands", "luxemburg", "germany", "switzerland", "italy", "denmark", "sweden", "norway", "finland", "estonia", "latvia", "lithuania", "poland", "hungary", "romania", "bulgaria", "yugoslavia", "greece", "newZealand", "unitedStates"]):
+                        hex.canUseRail = True
+                    if 's' in info or country in ["estonia", "latvia", "lithuania"]:
+                        hex.secondaryController = "sovietUnion"
+                    if 'v' in info:
+                        hex.secondaryController = "france"
+                print("Hex info parsed")
+
+            else:
+                print("Warning: Ignoring unknown layer {}".format(layerName))
+
+            worldSvg.write(layerSvg.getvalue())
+            worldLevelPaths.extend(layerLevelPaths)
+
+            #Save the layer in the cache, only the values that the layer changed need to be saved
+            if layerHash is not None:
+                changedColumns = {}
+                for attribute, columnBefore in zip(writtenAttributes, columnsBefore):
+                    column = getattr(grid, attribute)
+                    indices = np.flatnonzero(column != columnBefore)
+                    changedColumns[attribute] = (indices, column[indices])
+                if memoryCache is not None:
+                    memoryCache.put(("layer", layerHash), (layerSvg.getvalue(), layerLevelPaths, changedColumns))
+                if cacheFile is not None:
+                    os.makedirs(cacheFolder, exist_ok = True)
+                    with open(cacheFile + ".tmp", "wb") as file:
+                        pickle.dump((layerSvg.getvalue(), layerLevelPaths, changedColumns), file)
+                    os.replace(cacheFile + ".tmp", cacheFile)    #Only make the file visible once it's complete so that an interrupted compilation can't leave a broken cache file
+                rebuiltLayers.append(layerName)
+        if memoryCache is not None:
+            memoryCache.endCompilation()
+    finally:
+        if pool is not None:
+            pool.terminate()    #All the results have been received by now, unless the compilation failed
+    worldSvg.write("</g>")
+    return CompiledMapsheet(grid, worldSvg.getvalue(), worldLevelPaths, countryNames, rebuiltLayers, cachedLayers)
+
+def createHexesScript(grid: Grid, hexTable: bool = False, landmarkTableFile: str = "landmarks.bin", hexTableFile: str = "hexes.bin") -> str:
+    #create-hexes.js, which creates the Hex objects either with constructor calls or from hexes.bin (hexTableBytes) if hexTable is true. The file names are different with --hashed-names.
+    script: list[str] = []    #Assembled in memory and joined at once, which is a lot faster than lots of small writes
+    #The landmark table only makes pathfinding faster, so the game still works without it when it can't be downloaded (such as in the unit tests)
+    landmarkTableScript = f"const landmarkTable=await fetch(new URL(\"{landmarkTableFile}\",import.meta.url)).then(it=>it.ok?it.arrayBuffer():null,()=>null);"
+    dimensionsScript = f"export const mapWidth={grid.width},mapHeight={grid.height},hexWidth={grid.hexWidth * zoom},hexHeight={grid.hexHeight * zoom},svgWidth={grid.hexWidth * zoom * (grid.width + 1/3)},svgHeight={grid.hexHeight * zoom * (grid.height + 1/2)},canals={json.dumps(canals, separators = (',', ':'))};"
+    if hexTable:
+        script.append("import {loadHexTable} from \"./hex-table.js\";")
+        script.append("import {loadLandmarkTable} from \"./landmark-table.js\";")
+        script.append(dimensionsScript)
+        script.append(f"const hexTable=await(await fetch(new URL(\"{hexTableFile}\",import.meta.url))).arrayBuffer();")
+        script.append(landmarkTableScript)
+        script.append("export function createHexes(){loadHexTable(hexTable);loadLandmarkTable(landmarkTable);}")
     else:
-        print("Warning: Ignoring unknown layer {}".format(layerName))
-
-includableSvg.write("</g>")
-includableSvg.close()
-
-createHexesScript = open("../build/model/mapsheet/create-hexes.js", "w", encoding="utf-8")
-createHexesScript.write("import {Hex,TerrainType as t,WeatherZone as w} from \"../mapsheet.js\";")
-createHexesScript.write("import {Countries as c} from \"../countries.js\";")
-createHexesScript.write(f"export const mapWidth={width},mapHeight={height},hexWidth={hexWidth * zoom},hexHeight={hexHeight * zoom},svgWidth={hexWidth * zoom * (width + 1/3)},svgHeight={hexHeight * zoom * (height + 1/2)};")
-createHexesScript.write("export function createHexes(){")
-createHexesScript.write("let i=0;")
-createHexesScript.write("const h=(...p)=>{new Hex(...p);i++;},l=(...p)=>{new LandHex(...p);i++;}")
-createHexesScript.write(",a=[!0,!0,!0,!0,!0,!0],f=[!1,!1,!1,!1,!1,!1];")    #Defining a and f as these arrays will make several Hex object share references to the same arrays, but that doesn't matter because these are read-only (it's even a good thing because it saves memory)
-previousHexes: list[Hex] = []
-def emptyPreviousHexes() -> None:
-    if len(previousHexes) <= 1:
-        for previousHex in previousHexes:
-            createHexesScript.write(f"h({previousHex.x},{previousHex.y},{previousHex.toJavascriptConstructorParams()});")
-    else:
-        createHexesScript.write(f"for(let y={previousHexes[0].y};y<{previousHexes[-1].y + 1};y++)h({previousHexes[0].x},y,{previousHexes[0].toJavascriptConstructorParams()});")
-    previousHexes.clear()
-for hex in hexes:
-    #if hex.y == 0:
-    #    script.write("await refreshUI();")
-    if not hex.canBeInSameLoop(previousHexes):
+        script.append("import {Hex,TerrainType as t,WeatherZone as w} from \"../mapsheet.js\";")
+        script.append("import {Countries as c} from \"../countries.js\";")
+        script.append("import {loadLandmarkTable} from \"./landmark-table.js\";")
+        script.append(dimensionsScript)
+        script.append(landmarkTableScript)
+        script.append("export function createHexes(){")
+        script.append("loadLandmarkTable(landmarkTable);")
+        script.append("let i=0;")
+        script.append("const h=(...p)=>{new Hex(...p);i++;},l=(...p)=>{new LandHex(...p);i++;}")
+        script.append(",a=[!0,!0,!0,!0,!0,!0],f=[!1,!1,!1,!1,!1,!1];")    #Defining a and f as these arrays will make several Hex object share references to the same arrays, but that doesn't matter because these are read-only (it's even a good thing because it saves memory)
+        previousHexes: list[Hex] = []
+        def emptyPreviousHexes() -> None:
+            if len(previousHexes) <= 1:
+                for previousHex in previousHexes:
+                    script.append(f"h({previousHex.x},{previousHex.y},{previousHex.toJavascriptConstructorParams()});")
+            else:
+                script.append(f"for(let y={previousHexes[0].y};y<{previousHexes[-1].y + 1};y++)h({previousHexes[0].x},y,{previousHexes[0].toJavascriptConstructorParams()});")
+            previousHexes.clear()
+        for hex in grid.hexes:
+            #if hex.y == 0:
+            #    script.write("await refreshUI();")
+            if not hex.canBeInSameLoop(previousHexes):
+                emptyPreviousHexes()
+            previousHexes.append(hex)
         emptyPreviousHexes()
-    previousHexes.append(hex)
-emptyPreviousHexes()
-createHexesScript.write("}")
-createHexesScript.close()
-writeCountryNamesScript = open("../build/view/init/write-all-country-names.js", "w", encoding="utf-8")
-writeCountryNamesScript.write("import {writeCountryName as n} from \"./write-country-name.js\";")
-writeCountryNamesScript.write("import {Countries as c} from \"../../model/countries.js\";")
-writeCountryNamesScript.write("export function writeAllCountryNames(){")
-for countryName in countryNames:
-    lines = ["["]
-    for token in countryName.tokens:
-        if token[0] == '\n':
-            lines.append("[")
-        if '"' not in token:
-            if len(lines) > 1 or len(countryName.tokens) > 1:
-                lines[-1] += "'(',"
-            lines[-1] += "c."
-        lines[-1] += token.strip() + ","
-        if '"' not in token and (len(lines) > 1 or len(countryName.tokens) > 1):
-            lines[-1]+= "')',"
-    lines = [line[:-1] + "]" for line in lines]
-    for i in range(len(lines)):
-        writeCountryNamesScript.write("n({},{},{},{},{},{});".format(lines[i], countryName.x, countryName.y + i * countryName.fontSize, countryName.fontSize, "\"{}\"".format(countryName.textAnchor), "null" if countryName.transform == None else "\"{}\"".format(countryName.transform)))
-writeCountryNamesScript.write("}")
-writeCountryNamesScript.close()
+        script.append("}")
+    return "".join(script)
+
+def writeAllCountryNamesScript(countryNames: list[CountryName]) -> str:
+    script: list[str] = []
+    script.append("import {writeCountryName as n} from \"./write-country-name.js\";")
+    script.append("import {Countries as c} from \"../../model/countries.js\";")
+    script.append("export function writeAllCountryNames(){")
+    for countryName in countryNames:
+        lines = ["["]
+        for token in countryName.tokens:
+            if token[0] == '\n':
+                lines.append("[")
+            if '"' not in token:
+                if len(lines) > 1 or len(countryName.tokens) > 1:
+                    lines[-1] += "'(',"
+                lines[-1] += "c."
+            lines[-1] += token.strip() + ","
+            if '"' not in token and (len(lines) > 1 or len(countryName.tokens) > 1):
+                lines[-1]+= "')',"
+        lines = [line[:-1] + "]" for line in lines]
+        for i in range(len(lines)):
+            script.append("n({},{},{},{},{},{});".format(lines[i], countryName.x, countryName.y + i * countryName.fontSize, countryName.fontSize, "\"{}\"".format(countryName.textAnchor), "null" if countryName.transform == None else "\"{}\"".format(countryName.transform)))
+    script.append("}")
+    return "".join(script)
+
+def hexGridPath(grid: Grid, digits: int) -> str:
+    #The outline of all hexes as one path in the coordinates of the view (zoomed and without minX and minY). The slanted hexsides of each column are one zigzag line and the horizontal hexsides of each row are short lines, like init-view.ts used to draw them. The points are rounded first and the path goes from rounded point to rounded point, so that the rounding errors don't add up along the lines.
+    hexWidth = grid.hexWidth * zoom
+    hexHeight = grid.hexHeight * zoom
+    def roundedPoints(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        return np.round(np.stack((xs * hexWidth, ys * hexHeight), axis=1) * 10**digits).astype(np.int64)
+    def offsets(points: np.ndarray) -> list[str]:
+        #There are only a few different offsets between the points, so each is only formatted once
+        uniqueOffsets, offsetIds = np.unique(np.diff(points, axis=0), axis=0, return_inverse=True)
+        texts = ["{},{}".format(formatRoundedCoordinate(dx, digits), formatRoundedCoordinate(dy, digits)) for dx, dy in uniqueOffsets.tolist()]
+        return [texts[i] for i in offsetIds.reshape(-1).tolist()]
+    result: list[str] = []
+    for x in range(grid.width + 1):
+        #The line right of the last column has no top left hexside to draw, so it starts one point lower
+        steps = np.arange(1 if x == grid.width else 0, 2 * grid.height + (1 if x == 0 else 2))
+        points = roundedPoints(x + ((x + steps + 1) % 2) / 3, steps / 2)
+        result.append("M{},{}l".format(formatRoundedCoordinate(points[0, 0], digits), formatRoundedCoordinate(points[0, 1], digits)) + " ".join(offsets(points)))
+    xs = np.arange(grid.width)
+    for y in range(grid.height + 1):
+        #The start and end of the top hexside of each hex in the row, the hexsides of the odd columns are half a hex lower
+        points = roundedPoints(np.stack((xs + 1/3, xs + 1), axis=1).reshape(-1), np.repeat(y + (xs % 2) / 2, 2))
+        lines = offsets(points)
+        result.append("M{},{}".format(formatRoundedCoordinate(points[0, 0], digits), formatRoundedCoordinate(points[0, 1], digits)) + "".join(("h" + line.split(",")[0]) if i % 2 == 0 else ("m" + line) for i, line in enumerate(lines)))
+    return "".join(result)
+
+def hexLookupTable(grid: Grid) -> list[int]:
+    #The table that hexAtPoint in hex-marker.ts finds the hex at a point with. The hexes repeat every two columns and every row, and every hexside is either on the edges or on a diagonal of the cells that are a third of hexWidth wide and half of hexHeight high, so each of the 6 x 2 cells of two columns and a row is either in one hex or split between two hexes by one of its diagonals.
+    #Each cell has 5 numbers: 0 if it's in one hex, 1 if it's split from the top left to the bottom right corner or 2 if from the bottom left to the top right corner, then the column and row of the hex left of the diagonal (or the only hex) and of the hex right of it, relative to the first hex of the two columns. The hexes are found with hexCoordinates so that the game always agrees with the compiler about which hex a point is in.
+    baseX, baseY = 2, 1    #Any two columns and row would do, these are away from the edges of the map
+    table: list[int] = []
+    for cellY in range(2):
+        for cellX in range(6):
+            #One point in each of the four triangles that the diagonals split the cell into: bottom left of both diagonals, top right of both, top left of the first and bottom right of the second, and the other way around
+            hexes = [grid.hexCoordinates(complex(grid.minX + (baseX + (cellX + u) / 3) * grid.hexWidth, grid.minY + (baseY + (cellY + v) / 2) * grid.hexHeight)) for u, v in [(0.2, 0.7), (0.8, 0.3), (0.3, 0.2), (0.7, 0.8)]]
+            left, right = hexes[0], hexes[1]
+            if hexes.count(left) == 4:
+                diagonal = 0
+            elif hexes[3] == left and hexes[2] == right:
+                diagonal = 1
+            elif hexes[2] == left and hexes[3] == right:
+                diagonal = 2
+            else:
+                raise ValueError("The cell {}, {} of the hex lookup table isn't split by a diagonal".format(cellX, cellY))
+            table += [diagonal, left[0] - baseX, left[1] - baseY, right[0] - baseX, right[1] - baseY]
+    return table
+
+def hexGridScript(grid: Grid) -> str:
+    #hex-grid.js, the outline of the hex grid, the positions of the city markers and labels, and the lookup table of hexAtPoint, so that the game doesn't need to calculate them when it starts
+    digits = coordinateDigits(grid.hexWidth * zoom / (2 * levelsOfDetail[-1]))    #As exact as the most detailed level of the world map
+    hexWidth = grid.hexWidth * zoom
+    hexHeight = grid.hexHeight * zoom
+    def formatCoordinate(value: float) -> str:
+        return formatRoundedCoordinate(round(value * 10**digits), digits)
+    #The same labelOffsetX and labelOffsetY as drawAllCities in hex-marker.ts used, the label is also moved down by 0.6 to center it vertically
+    labelOffsets = {"left": (-1, 0), "right": (1, 0), "top": (0, -2), "bottom": (0, 2)}
+    cityAnchors: list[str] = []
+    for i, city in sorted(grid.city.items()):
+        if city is None:
+            continue
+        x, y = divmod(i, grid.height)
+        offsetX, offsetY = grid.cityOffset.get(i, (0, 0))
+        labelOffsetX, labelOffsetY = labelOffsets[grid.cityAlignment.get(i, "right")]
+        centerX = (x + 2/3) * hexWidth
+        centerY = (y + (1 if x % 2 else 1/2)) * hexHeight
+        anchors = [centerX + offsetX * hexHeight / 4, centerY + offsetY * hexHeight / 4, centerX + (offsetX + labelOffsetX) * hexHeight / 4, centerY + (offsetY + labelOffsetY + 0.6) * hexHeight / 4]
+        cityAnchors.append("[{},[{}]]".format(i, ",".join(map(formatCoordinate, anchors))))
+    script: list[str] = []
+    script.append("export const hexGridPath=\"{}\";".format(hexGridPath(grid, digits)))
+    script.append("export const cityAnchors=new Map([{}]);".format(",".join(cityAnchors)))
+    script.append("export const hexLookupTable=[{}];".format(",".join(map(str, hexLookupTable(grid)))))
+    return "".join(script)
+
+def contentHashedPath(path: str, contents: str | bytes) -> str:
+    #The path with a hash of the contents before the extension. A file that changes gets a new name, so browsers can cache the files forever.
+    digest = hashlib.sha256(contents.encode("utf-8") if isinstance(contents, str) else contents).hexdigest()[:fileHashLength]
+    root, extension = os.path.splitext(path)
+    return "{}.{}{}".format(root, digest, extension)
+
+def mapsheetFilesScript(fileNames: dict[str, str]) -> str:
+    #mapsheet-files.js, which gives the view the URLs of the files in the mapsheet folder that it downloads. fileNames only has the files that were written to another name than their own, with --hashed-names.
+    return "const f={};export function mapsheetUrl(n){{return \"mapsheet/\"+(f[n]??n);}}".format(json.dumps(fileNames, separators = (",", ":")))
+
+def compressedOutputs(outputs: dict[str, str | bytes]) -> dict[str, bytes]:
+    #The .gz and .br variants of the output files at the highest compression level, for servers that can send precompressed files. Variants that wouldn't be smaller are left out.
+    import brotli    #If this doesn't work, do pip install brotli, it's only needed for --compress
+    result: dict[str, bytes] = {}
+    for path, contents in outputs.items():
+        data = contents.encode("utf-8") if isinstance(contents, str) else contents
+        for extension, compressed in [(".gz", gzip.compress(data, compresslevel = 9, mtime = 0)), (".br", brotli.compress(data, quality = 11))]:    #mtime = 0 so that the same file always compresses to the same bytes
+            if len(compressed) < len(data):
+                result[path + extension] = compressed
+    return result
+
+def compileMapsheet(svg: str | IO | Iterable[XML.Element], jobs: int = 1, cacheFolder: str | None = None, fullDetail: bool = False, tiles: bool = False, tileSize: int = 32, hexTable: bool = False, profiler: Profiler | None = None, memoryCache: MemoryCache | None = None, hashedNames: bool = False, compress: bool = False) -> dict[str, str | bytes]:
+    """
+    Compiles the mapsheet and returns the contents of the output files by their paths relative to the mapsheet folder, nothing is written other than the cache:
+        world.xml, and world-1.json, world-2.json, ... unless fullDetail or tiles is true, or tiles/x-y.xml and tiles/manifest.json if tiles is true
+        ../build/model/mapsheet/create-hexes.js, ../build/model/mapsheet/landmarks.bin, and ../build/model/mapsheet/hexes.bin if hexTable is true
+        ../build/view/init/write-all-country-names.js, ../build/view/init/hex-grid.js and ../build/view/init/mapsheet-files.js
+    If hashedNames is true, the files that are downloaded rather than imported (world.xml, world-1.json, ..., the tiles, landmarks.bin and hexes.bin) get a hash of their contents in their names, such as world.0123456789ab.xml, and mapsheet-files.js and create-hexes.js refer to them by those names.
+    If compress is true, there's also a .gz and .br variant of each file.
+    svg: The SVG file name or file object, or its layers from loadSvg.
+    The other arguments are the same as the command line options, see compileLayers.
+    """
+    profiler = profiler if profiler is not None else Profiler()
+    layers = svgLayers(svg) if isinstance(svg, str) or hasattr(svg, "read") else svg
+    compiled = compileLayers(layers, jobs, cacheFolder, fullDetail, profiler, memoryCache)
+    outputs: dict[str, str | bytes] = {}
+    if tiles:
+        profiler.startStage("Tiles")
+        #The tiles are small enough to always use the most detailed level, so the levels of detail are only used without tiles
+        outputs["world.xml"], tileSvgs, manifest = tileWorldMap(compiled.grid, compiled.worldSvg, [levels[-1] for levels in compiled.worldLevelPaths], tileSize)
+        for name, tileSvg in tileSvgs.items():
+            outputs["tiles/{}.xml".format(name)] = tileSvg
+        outputs["tiles/manifest.json"] = json.dumps(manifest, separators = (",", ":"))
+        print("World map split into {} tiles".format(len(tileSvgs)))
+    else:
+        outputs["world.xml"] = compiled.worldSvg
+        if not fullDetail:
+            profiler.startStage("Levels of detail")
+            for level in range(1, len(levelsOfDetail)):
+                outputs["world-{}.json".format(level)] = json.dumps([levels[level - 1] for levels in compiled.worldLevelPaths], separators = (",", ":"))
+
+    if cacheFolder is not None or memoryCache is not None:
+        print("Rebuilt layers: {}".format(", ".join(compiled.rebuiltLayers) if len(compiled.rebuiltLayers) > 0 else "none"))
+        print("Layers loaded from cache: {}".format(", ".join(compiled.cachedLayers) if len(compiled.cachedLayers) > 0 else "none"))
+
+    profiler.startStage("Landmark distances")
+    outputs["../build/model/mapsheet/landmarks.bin"] = landmarkTableBytes(compiled.grid)
+    print("Landmark distances calculated")
+    profiler.startStage("create-hexes.js")
+    if hexTable:
+        outputs["../build/model/mapsheet/hexes.bin"] = hexTableBytes(compiled.grid)
+    #The Javascript modules are imported by the other modules by their names, so only the files that are downloaded get hashed names
+    fileNames = {path: contentHashedPath(path, contents) for path, contents in outputs.items()} if hashedNames else {}
+    outputs = {fileNames.get(path, path): contents for path, contents in outputs.items()}
+    landmarkTableFile, hexTableFile = (os.path.basename(fileNames.get("../build/model/mapsheet/" + name, name)) for name in ["landmarks.bin", "hexes.bin"])
+    outputs["../build/model/mapsheet/create-hexes.js"] = createHexesScript(compiled.grid, hexTable, landmarkTableFile, hexTableFile)
+    profiler.startStage("write-all-country-names.js")
+    outputs["../build/view/init/write-all-country-names.js"] = writeAllCountryNamesScript(compiled.countryNames)
+    profiler.startStage("hex-grid.js")
+    outputs["../build/view/init/hex-grid.js"] = hexGridScript(compiled.grid)
+    outputs["../build/view/init/mapsheet-files.js"] = mapsheetFilesScript({path: fileName for path, fileName in fileNames.items() if not path.startswith("../")})
+    if compress:
+        profiler.startStage("Compression")
+        outputs |= compressedOutputs(outputs)
+        print("Output files compressed")
+    profiler.endStage()
+    return outputs
+
+def writeOutputs(outputs: dict[str, str | bytes], folder: str) -> None:
+    #Writes the output files from compileMapsheet, folder is the mapsheet folder that their paths are relative to. Each file is replaced at once so that a page that is reloaded during the compilation never gets a partly written file.
+    for path, contents in outputs.items():
+        path = os.path.join(folder, path)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        if isinstance(contents, bytes):
+            with open(path + ".tmp", "wb") as file:
+                file.write(contents)
+        else:
+            with open(path + ".tmp", "w", encoding="utf-8") as file:
+                file.write(contents)
+        os.replace(path + ".tmp", path)
+
+def removeStaleFiles(outputs: dict[str, str | bytes], folder: str) -> None:
+    #Removes the files from previous compilations that a server could send instead of the new output files: compressed variants from --compress that weren't written again, and files from --hashed-names that have the same name as an output file but another hash
+    for path in outputs:
+        for extension in [".gz", ".br"]:
+            if path + extension not in outputs and os.path.isfile(os.path.join(folder, path + extension)):
+                os.remove(os.path.join(folder, path + extension))
+        match = re.fullmatch(r"(.*)\.[0-9a-f]{{{}}}(\.[^./]+)".format(fileHashLength), path)
+        if match is None:
+            continue
+        directory = os.path.dirname(os.path.join(folder, path))
+        hashedName = re.compile(re.escape(os.path.basename(match[1])) + r"\.[0-9a-f]{{{}}}".format(fileHashLength) + re.escape(match[2]) + r"(?:\.gz|\.br)?")
+        for fileName in os.listdir(directory):
+            if hashedName.fullmatch(fileName) and os.path.relpath(os.path.join(directory, fileName), folder).replace(os.sep, "/") not in outputs:
+                os.remove(os.path.join(directory, fileName))
+
+def modificationTime(fileName: str) -> int | None:
+    #None while the file doesn't exist, which can happen for a moment while an editor saves it
+    try:
+        return os.stat(fileName).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Compiles azimuthal_projection.svg to world.xml, create-hexes.js, write-all-country-names.js, hex-grid.js and mapsheet-files.js.")
+    parser.add_argument("-j", "--jobs", type = int, default = 1, help = "number of processes to use for finding which hexes each path affects (default: 1)")
+    parser.add_argument("--cache-dir", metavar = "FOLDER", help = "save the results of each layer in this folder, so that only layers that changed (and layers depending on them) need to be rebuilt next time, relative to the mapsheet folder (such as .cache, which git ignores). Without this, all layers are rebuilt")
+    parser.add_argument("--full-detail", action = "store_true", help = "copy the paths to world.xml as they are instead of simplifying them to several levels of detail (world.xml and world-1.json, world-2.json, ...)")
+    parser.add_argument("--tiles", action = "store_true", help = "split the world map into tiles (tiles/x-y.xml and tiles/manifest.json) that are downloaded when they become visible, world.xml then only has what isn't tiled")
+    parser.add_argument("--tile-size", type = int, default = 32, help = "the width and height of the tiles in hexes (default: 32)")
+    parser.add_argument("--hex-table", action = "store_true", help = "write the hexes to a binary table (hexes.bin) that create-hexes.js loads, instead of constructor calls in create-hexes.js")
+    parser.add_argument("--hashed-names", action = "store_true", help = "put a hash of the contents in the names of the files that the game downloads (such as world.0123456789ab.xml) so that they can be served with immutable caching, mapsheet-files.js maps the usual names to them")
+    parser.add_argument("--compress", action = "store_true", help = "also write a gzip (.gz) and brotli (.br) variant of each output file at the highest compression level, for servers that can send precompressed files (needs pip install brotli)")
+    parser.add_argument("--profile", metavar = "REPORT", help = "write the wall time, CPU time, number of paths, number of hexes near the paths that were affected or not and number of points tested against polygons of each layer and stage to this JSON file, relative to the mapsheet folder")
+    parser.add_argument("--profile-stages", metavar = "FOLDER", help = "also profile each stage with cProfile and save the results to this folder (one .prof file per stage, see the pstats module), relative to the mapsheet folder")
+    parser.add_argument("--watch", action = "store_true", help = "keep running and compile the mapsheet again whenever azimuthal_projection.svg changes, the results of the layers and paths that didn't change are kept in memory so that only the changes need to be compiled")
+    args = parser.parse_args()
+    folder = os.path.dirname(os.path.abspath(__file__))    #The paths are relative to the mapsheet folder
+    svgFile = os.path.join(folder, "azimuthal_projection.svg")
+    memoryCache = MemoryCache() if args.watch else None
+
+    while True:
+        lastModified = modificationTime(svgFile)    #Before compiling so that changes saved during the compilation aren't missed
+        start = time.perf_counter()
+        profiler = Profiler(None if args.profile_stages is None else os.path.join(folder, args.profile_stages))
+        try:
+            outputs = compileMapsheet(svgFile, args.jobs, None if args.cache_dir is None else os.path.join(folder, args.cache_dir), args.full_detail, args.tiles, args.tile_size, args.hex_table, profiler, memoryCache, args.hashed_names, args.compress)
+        except Exception:
+            if not args.watch:
+                raise
+            traceback.print_exc()    #Keep watching if the SVG file is broken, it's probably being edited
+        else:
+            profiler.startStage("Writing the output files")
+            if args.tiles:
+                tilesFolder = os.path.join(folder, "tiles")
+                os.makedirs(tilesFolder, exist_ok = True)
+                for fileName in os.listdir(tilesFolder):    #Remove tiles from previous compilations that are now empty
+                    if "tiles/" + fileName not in outputs:
+                        os.remove(os.path.join(tilesFolder, fileName))
+            writeOutputs(outputs, folder)
+            removeStaleFiles(outputs, folder)
+
+            if args.profile is not None:
+                with open(os.path.join(folder, args.profile), "w", encoding="utf-8") as file:
+                    json.dump(profiler.report(), file, indent = 4)
+            print("Compiled in {:.1f} s".format(time.perf_counter() - start))
+        if not args.watch:
+            break
+
+        print("Watching azimuthal_projection.svg for changes (press Ctrl+C to stop)")
+        try:
+            while modificationTime(svgFile) in [lastModified, None]:
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            break
+
+if __name__ == "__main__":    #Worker processes import this file, so only compile the mapsheet in the main process
+    main()
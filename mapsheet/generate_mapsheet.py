@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import argparse
+import math
+import random
+
+#Generates a synthetic mapsheet SVG with the same layers as azimuthal_projection.svg, so that compile_mapsheet.py can be run and benchmarked without the real mapsheet. The map isn't meant to look like anything, only to exercise the same code paths with a configurable amount of work.
+
+hexWidth = 9.0    #The distance between the far left of one hex and the far left of the next hex, like in compile_mapsheet.py
+hexHeight = 10.0
+minX = 5.0
+minY = 7.0
+countries = ["germany", "france", "italy", "japan", "china", "argentina", "sweden", "sovietUnion"]
+cities = ["Paris", "Lille", "Berlin", "Rome", "Madrid", "Oslo", "Kiev", "Cairo", "Tokyo", "Lima"]
+
+def formatPoint(point: complex) -> str:
+    return "{:.3f},{:.3f}".format(point.real, point.imag)
+
+def polygonPath(points: list[complex], closed: bool = True) -> str:
+    return "M " + " L ".join(map(formatPoint, points)) + (" Z" if closed else "")
+
+def blobPath(center: complex, radius: float, vertices: int, curved: bool = True) -> str:
+    #A closed wiggly shape around the center, made of cubic Bézier curves (like the paths drawn in Inkscape) or of straight lines
+    phase = random.uniform(0, 2 * math.pi)
+    points = [center + radius * (1 + 0.3 * math.sin(5 * angle + phase) + 0.1 * random.random()) * complex(math.cos(angle), math.sin(angle)) for angle in (2 * math.pi * i / vertices for i in range(vertices))]
+    if not curved:
+        return polygonPath(points)
+    d = "M " + formatPoint(points[0])
+    for i in range(1, vertices + 1):
+        start, end = points[i - 1], points[i % vertices]
+        d += " C {} {} {}".format(formatPoint(start + (end - start) / 3 + complex(2, -2)), formatPoint(start + 2 * (end - start) / 3 + complex(-2, 2)), formatPoint(end))
+    return d + " Z"
+
+def hexCenter(x: int, y: int) -> complex:
+    return complex(minX + (x + 2/3) * hexWidth, minY + (y + (x % 2) * 0.5 + 0.5) * hexHeight)
+
+def layer(name: str, elements: list[str]) -> str:
+    return "<g inkscape:groupmode=\"layer\" inkscape:label=\"{}\">{}</g>".format(name, "".join(elements))
+
+def generateMapsheet(width: int, height: int, paths: int, vertices: int, seed: int = 1) -> str:
+    """
+    Generates the SVG code of a synthetic mapsheet.
+
+    width, height: The size of the hex grid in hexes.
+    paths: The number of islands. The other layers get a number of paths proportional to it.
+    vertices: The number of vertices of each island. The other layers get a number of vertices proportional to it.
+    seed: The seed of the random number generator, the same arguments always give the same mapsheet.
+    """
+    random.seed(seed)
+    mapWidth = width * hexWidth
+    mapHeight = height * hexHeight
+    def randomPoint(margin: float = 0) -> complex:
+        return complex(minX + random.uniform(margin, mapWidth - margin), minY + random.uniform(margin, mapHeight - margin))
+    def mapPoint(u: float, v: float) -> complex:
+        return complex(minX + u * mapWidth, minY + v * mapHeight)
+    continent = mapPoint(0.35, 0.5)
+    continentRadius = min(mapWidth, mapHeight) * 0.3
+    def nearContinent() -> complex:
+        angle = random.uniform(0, 2 * math.pi)
+        return continent + continentRadius * random.uniform(0, 0.8) * complex(math.cos(angle), math.sin(angle))
+    layers = []
+
+    #The ocean path is what compile_mapsheet.py gets the size of the grid from, so it needs to have the same shape as in the real mapsheet
+    layers.append(layer("Ocean", ["<path d=\"{}\"/>".format(polygonPath([
+        complex(minX, minY + hexHeight),
+        complex(minX + hexWidth / 2, minY),
+        complex(minX + hexWidth, minY + hexHeight / 2),
+        complex(minX + mapWidth + hexWidth / 3, minY + mapHeight - hexHeight / 2),
+        complex(minX + mapWidth, minY + mapHeight),
+        complex(minX + mapWidth / 2, minY + mapHeight + hexHeight / 2),
+        complex(minX, minY + mapHeight)
+    ]))]))
+
+    islands = [blobPath(continent, continentRadius, vertices), blobPath(mapPoint(0.8, 0.6), continentRadius / 2, max(3, vertices // 3), False)]
+    islands += [blobPath(randomPoint(), random.uniform(3, 15), max(3, vertices // 16)) for i in range(paths - 2)]
+    layers.append(layer("Islands and Continents", ["<path d=\"{}\"/>".format(d) for d in islands]))
+    layers.append(layer("Lakes", ["<path d=\"{}\"/>".format(blobPath(nearContinent(), random.uniform(6, 20), max(3, vertices // 20))) for i in range(max(1, paths // 4))]))
+    for terrain in ["Desert", "Forest", "Mountain", "TallMountain", "Icecap"]:
+        radius = 20 if terrain == "TallMountain" else 40
+        layers.append(layer(terrain, ["<path d=\"{}\"/>".format(blobPath(nearContinent(), radius + random.uniform(0, 20), max(3, vertices // 16))) for i in range(max(1, paths // 6))]))
+    layers.append(layer("Canals", ["<g><path d=\"{}\"/></g>".format(polygonPath([mapPoint(0.1, 0.1), mapPoint(0.12, 0.11)], False))]))
+
+    railways = []
+    for i in range(max(1, paths // 3)):
+        points = [nearContinent()]
+        for j in range(max(2, vertices // 24)):
+            points.append(points[-1] + complex(random.uniform(-40, 40), random.uniform(-40, 40)))
+        railways.append("<path d=\"{}\"/>".format(polygonPath(points, False)))
+    layers.append(layer("Railways", railways))
+    layers.append(layer("Borders", [
+        "<path style=\"stroke:#000;stroke-dasharray:none\" d=\"{}\"/>".format(polygonPath([mapPoint(0.2, 0.2), mapPoint(0.4, 0.5)], False)),
+        "<path style=\"stroke:#000;stroke-dasharray:4,4\" d=\"{}\"/>".format(polygonPath([mapPoint(0.3, 0.2), mapPoint(0.5, 0.5)], False))
+    ]))
+
+    #Zones with the colors that compile_mapsheet.py recognizes, the temperate and tropical zones share an edge to exercise the tracing of the fair zone
+    def zone(color: str, points: list[tuple[float, float]]) -> str:
+        return "<path style=\"fill:none;stroke:#{}\" d=\"{}\"/>".format(color, polygonPath([mapPoint(u, v) for u, v in points]))
+    layers.append(layer("Weather Zones", [
+        zone("0000ff", [(0.2, 0.2), (0.3, 0.21), (0.29, 0.3), (0.21, 0.31)]),
+        zone("808080", [(0.4, 0.2), (0.5, 0.22), (0.48, 0.3), (0.41, 0.28)]),
+        zone("00ff00", [(0.1, 0.1), (0.6, 0.11), (0.61, 0.45), (0.09, 0.46)]),
+        zone("ff0000", [(0.09, 0.46), (0.61, 0.45), (0.62, 0.8), (0.08, 0.81), (0.05, 0.6)]),
+        zone("ffff00", [(0.7, 0.7), (0.95, 0.72), (0.9, 0.95), (0.72, 0.9)])
+    ]))
+    layers.append(layer("Hex grid", []))
+    layers.append(layer("Country Names", [
+        "<text style=\"font-size:12px;text-anchor:middle\" x=\"{:.3f}\" y=\"{:.3f}\"><tspan>germany</tspan><tspan>\"Foo bar\"</tspan></text>".format(continent.real, continent.imag),
+        "<text style=\"font-size:10px\" x=\"{:.3f}\" y=\"{:.3f}\" transform=\"rotate(10)\">france</text>".format(continent.real + 50, continent.imag + 50)
+    ]))
+
+    #The first label needs to come before all land hexes, and the hexes are compiled in x-major order
+    labels = {(0, 0): ["unitedKingdom"]}
+    for i in range(width * height // 80):
+        x, y = random.randrange(width), random.randrange(height)
+        if (x, y) in labels:
+            continue
+        lines = []
+        if random.random() < 0.5:
+            lines.append(random.choice(countries) + random.choice(["", ",r", ",c", ",i", ",s", ",v", ",o"]))
+        if random.random() < 0.6 or len(lines) == 0:
+            city = random.choice(cities)
+            lines.append(random.choice([city + ",top,1.5,-2,hp", city, city + ",left", "null,m", city + ",e"]))
+        labels[(x, y)] = lines
+    layers.append(layer("Hex info", ["<text x=\"{:.3f}\" y=\"{:.3f}\">{}</text>".format(hexCenter(x, y).real, hexCenter(x, y).imag, "".join("<tspan>{}</tspan>".format(line) for line in lines)) for (x, y), lines in labels.items()]))
+
+    return "<svg xmlns=\"http://www.w3.org/2000/svg\" xmlns:inkscape=\"http://www.inkscape.org/namespaces/inkscape\">" + "".join(layers) + "</svg>"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Generates a synthetic mapsheet with the same layers as azimuthal_projection.svg, for testing and benchmarking compile_mapsheet.py.")
+    parser.add_argument("output", help = "the SVG file to write")
+    parser.add_argument("--width", type = int, default = 80, help = "the number of hexes from the left edge of the mapsheet to the right edge (default: 80)")
+    parser.add_argument("--height", type = int, default = 60, help = "the number of hexes from the top edge of the mapsheet to the bottom edge (default: 60)")
+    parser.add_argument("--paths", type = int, default = 30, help = "the number of islands, the other layers get a proportional number of paths (default: 30)")
+    parser.add_argument("--vertices", type = int, default = 120, help = "the number of vertices of the biggest island, the other paths get a proportional number of vertices (default: 120)")
+    parser.add_argument("--seed", type = int, default = 1, help = "the seed of the random number generator (default: 1)")
+    args = parser.parse_args()
+    with open(args.output, "w", encoding="utf-8") as file:
+        file.write(generateMapsheet(args.width, args.height, args.paths, args.vertices, args.seed))
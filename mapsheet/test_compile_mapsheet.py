@@ -0,0 +1,529 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import pathlib
+import re
+import xml.etree.ElementTree as XML
+
+from collections import Counter
+from math import floor
+
+import numpy as np
+import pytest
+
+from compile_mapsheet import Grid, Path, PreparedPolygon, classifyPath, clipPolyline, clipRing, compileLayers, compileMapsheet, flattenSubpaths, hexGridPath, hexLookupTable, hexTableBytes, landmarkTableBytes, levelsOfDetail, LineIndex, loadSvg, MemoryCache, offsetLines, pointInsidePolygon, pointsInsidePolygon, removeStaleFiles, sideOffsets, simplifiedPaths, simplifyPolyline, tileWorldMap, writeOutputs, zoom
+from svg.path import parse_path, Close, Line, Move
+from generate_mapsheet import generateMapsheet
+
+#Tests of the geometry of compile_mapsheet.py on a small grid with the same hex size as generate_mapsheet.py, run with python -m pytest in the mapsheet folder
+
+@pytest.fixture
+def grid() -> Grid:
+    return Grid(5.0, 7.0, 9.0, 10.0, 30, 15)
+
+def islandHexes(grid: Grid, d: str) -> set[tuple[int, int]]:
+    result, sideIds, sideCounts = classifyPath(grid, "Islands and Continents", d)[0]
+    return {(x, y) for x, y, completelyInside in result}
+
+#An L shape, the corner at 60,60 is concave
+lShape = np.array([10 + 10j, 100 + 10j, 100 + 60j, 60 + 60j, 60 + 100j, 10 + 100j])
+
+def test_points_inside_polygon() -> None:
+    points = np.array([30 + 30j, 80 + 30j, 30 + 80j, 80 + 80j, 5 + 50j, 120 + 30j, 60 + 80j])
+    assert pointsInsidePolygon(points, lShape).tolist() == [True, True, True, False, False, False, False]
+
+def test_points_inside_polygon_matches_point_inside_polygon() -> None:
+    #Also with points on the vertices and edges, where the results depend on the order of the arithmetic
+    rng = np.random.default_rng(1)
+    points = np.concatenate((rng.uniform(0, 110, 500) + 1j * rng.uniform(0, 110, 500), lShape, (lShape + np.roll(lShape, 1)) / 2))
+    assert pointsInsidePolygon(points, lShape).tolist() == [pointInsidePolygon(complex(point), lShape.tolist()) for point in points]
+
+def test_points_inside_polygon_in_chunks() -> None:
+    #A polygon with this many vertices is tested a few points at a time
+    circle = 50 + 50j + 40 * np.exp(2j * np.pi * np.arange(200_000) / 200_000)
+    points = np.array([50 + 50j, 50 + 89j, 50 + 91j, 0j] * 5)
+    assert pointsInsidePolygon(points, circle).tolist() == [True, True, False, False] * 5
+
+def test_prepared_polygon_slabs() -> None:
+    #Two slabs of height 20. The horizontal edges 1, 3, 5 and 7 aren't in any slab, edges 0 and 2 reach into both slabs, and edge 4 ends on the bottom of the polygon, which is in the last slab.
+    polygon = PreparedPolygon(np.array([0, 10, 10 + 20j, 20 + 20j, 20 + 40j, 40j, 30j, 5 + 30j]))
+    assert (polygon.slabCount, polygon.slabHeight) == (2, 20.0)
+    assert polygon.slabOffsets.tolist() == [0, 2, 6]
+    assert polygon.slabEdges.tolist() == [0, 2, 0, 2, 4, 6]
+    assert polygon.containsPoints(np.array([5 + 10j, 15 + 10j, 15 + 30j, 3 + 35j, 2 + 25j, 15 - 5j, 15 + 45j])).tolist() == [True, False, True, True, False, False, False]
+
+def test_prepared_polygon_matches_points_inside_polygon() -> None:
+    #Also with points on the vertices and edges and above and below the polygon
+    rng = np.random.default_rng(4)
+    star = 100 + 100j + rng.uniform(20, 80, 400) * np.exp(2j * np.pi * np.sort(rng.uniform(0, 1, 400)))
+    points = np.concatenate((rng.uniform(0, 200, 3000) + 1j * rng.uniform(-10, 210, 3000), star, (star + np.roll(star, 1)) / 2))
+    assert PreparedPolygon(star).containsPoints(points).tolist() == pointsInsidePolygon(points, star).tolist()
+
+def test_prepared_polygon_rings() -> None:
+    #A point is inside if it's inside an odd number of the rings
+    rng = np.random.default_rng(5)
+    rings = [lShape, lShape + 40 + 30j, lShape * 0.3 + 20 + 20j]
+    points = rng.uniform(0, 150, 2000) + 1j * rng.uniform(0, 150, 2000)
+    expected = np.logical_xor.reduce([pointsInsidePolygon(points, ring) for ring in rings])
+    assert PreparedPolygon(np.concatenate(rings), [0, 6, 12]).containsPoints(points).tolist() == expected.tolist()
+
+def test_hex_coordinates(grid: Grid) -> None:
+    #The center of hex 0, 0, points left of its slanted sides that are in the odd column to the left, a point in hex 1, 0 below the bottom right side of hex 0, 0, and points outside the map
+    points = [10 + 12j, 6 + 8j, 6 + 16j, 16 + 17.5j, 278 + 156j, 0j]
+    assert [grid.hexCoordinates(point) for point in points] == [(0, 0), (-1, -1), (-1, 0), (1, 0), (30, 14), (-1, -2)]
+
+def test_hex_coordinates_matches_hex_vertices(grid: Grid) -> None:
+    #Each point is inside the hexagon of the hex that it's found in, including the centers and the points near the vertices
+    rng = np.random.default_rng(2)
+    centers = grid.vertices.mean(axis=1)    #Not grid.centers, which are on the bottom hexside in the even columns
+    points = np.concatenate((rng.uniform(0, 290, 2000) + 1j * rng.uniform(0, 170, 2000), centers, (0.9 * grid.vertices + 0.1 * centers[:, np.newaxis]).reshape(-1)))
+    for point in points.tolist():
+        assert pointInsidePolygon(point, grid.hexVertices(*grid.hexCoordinates(point)))
+    assert [grid.hexCoordinates(center) for center in centers.tolist()] == [divmod(i, grid.height) for i in range(grid.width * grid.height)]
+
+def test_hex_centers_inside_polygon(grid: Grid) -> None:
+    #The centers are at x = 11, 20, 29, ... and y = 17, 27, 37, ...
+    inside = grid.hexCentersInsidePolygon(np.array([50 + 30j, 100 + 30j, 100 + 80j, 50 + 80j]))
+    assert {(int(x), int(y)) for x, y in np.argwhere(inside)} == {(x, y) for x in range(5, 10) for y in range(2, 7)}
+
+def test_hex_centers_inside_polygon_matches_points_inside_polygon(grid: Grid) -> None:
+    #Also with polygons that go outside the map and with a vertex at the height of a row of centers
+    rng = np.random.default_rng(3)
+    polygons = [lShape, lShape * 3 - 100 - 120j, np.array([0 + 17j, 150 + 0j, 280 + 57j, 140 + 200j, 100 + 37j])]
+    polygons += [140 + 80j + rng.uniform(20, 120, 40) * np.exp(2j * np.pi * np.sort(rng.uniform(0, 1, 40))) for i in range(5)]
+    for polygon in polygons:
+        assert grid.hexCentersInsidePolygon(polygon).reshape(-1).tolist() == pointsInsidePolygon(grid.centers, polygon).tolist()
+
+def test_hexsides_are_shared(grid: Grid) -> None:
+    #Side i of a hex is side i + 3 of the hex across it, and the hexside knows both hexes
+    for x in range(grid.width):
+        for y in range(grid.height):
+            for side, (offsetX, offsetY) in enumerate(sideOffsets[x % 2]):
+                sideId = grid.hexSideIds[x * grid.height + y, side]
+                if 0 <= x + offsetX < grid.width and 0 <= y + offsetY < grid.height:
+                    assert grid.hexSideIds[(x + offsetX) * grid.height + y + offsetY, (side + 3) % 6] == sideId
+                    assert sorted(zip(grid.sideHexes[sideId].tolist(), grid.sideNumbers[sideId].tolist())) == sorted([(x * grid.height + y, side), ((x + offsetX) * grid.height + y + offsetY, (side + 3) % 6)])
+                else:
+                    assert grid.sideHexes[sideId].tolist() == [x * grid.height + y, -1]
+
+def test_hexsides_inside_polygon(grid: Grid) -> None:
+    #The top right vertex of hex 2, 2 is at 32, 27, where the hexsides between 2, 1, 2, 2 and 3, 1 meet. Its top hexside goes from 26, 27 to 32, 27.
+    hex22, hex21, hex31 = 2 * grid.height + 2, 2 * grid.height + 1, 3 * grid.height + 1
+    sideIds, counts = grid.hexsidesInsidePolygon(PreparedPolygon(np.array([31 + 26j, 33 + 26j, 33 + 28j, 31 + 28j])), [hex22], False)
+    assert dict(zip(sideIds.tolist(), counts.tolist())) == {grid.hexSideIds[hex22, 0]: 1, grid.hexSideIds[hex22, 5]: 1}
+    sideIds, counts = grid.hexsidesInsidePolygon(PreparedPolygon(np.array([31 + 26j, 33 + 26j, 33 + 28j, 31 + 28j])), [hex22, hex21, hex31], False)
+    assert dict(zip(sideIds.tolist(), counts.tolist())) == {grid.hexSideIds[hex22, 0]: 1, grid.hexSideIds[hex22, 5]: 1, grid.hexSideIds[hex31, 1]: 1}
+    sideIds, counts = grid.hexsidesInsidePolygon(PreparedPolygon(np.array([25 + 26j, 33 + 26j, 33 + 28j, 25 + 28j])), [hex22], True)
+    assert dict(zip(sideIds.tolist(), counts.tolist())) == {grid.hexSideIds[hex22, 0]: 3, grid.hexSideIds[hex22, 1]: 1, grid.hexSideIds[hex22, 5]: 1}
+
+def test_set_hexside_bits(grid: Grid) -> None:
+    #Both hexes of each hexside get the bit of their own side, and hexsides at the edge of the map only have one hex
+    hex22, hex21, hex31 = 2 * grid.height + 2, 2 * grid.height + 1, 3 * grid.height + 1
+    sideIds = np.array([grid.hexSideIds[hex22, 0], grid.hexSideIds[hex22, 5], grid.hexSideIds[hex31, 1], grid.hexSideIds[0, 1]])
+    column = np.zeros(grid.width * grid.height, dtype=np.uint8)
+    grid.setHexsideBits(column, sideIds, True)
+    assert {i: int(bits) for i, bits in enumerate(column) if bits} == {0: 0b10, hex21: 0b11000, hex22: 0b100001, hex31: 0b110}
+    column = np.full(grid.width * grid.height, 0b111111, dtype=np.uint8)
+    grid.setHexsideBits(column, sideIds, False)
+    assert {i: int(bits) for i, bits in enumerate(column) if bits != 0b111111} == {0: 0b111101, hex21: 0b100111, hex22: 0b011110, hex31: 0b111001}
+
+def test_compound_path_subpaths_are_not_joined(grid: Grid) -> None:
+    #The hexes between the two squares aren't affected, there's no line from the end of one subpath to the start of the next one
+    first = "M 20,20 L 40,20 L 40,40 L 20,40 Z"
+    second = "M 200,100 L 220,100 L 220,120 L 200,120 Z"
+    assert islandHexes(grid, first + " " + second) == islandHexes(grid, first) | islandHexes(grid, second)
+    assert islandHexes(grid, first + " " + second) == {(1, 0), (1, 1), (1, 2), (2, 1), (2, 2), (2, 3), (3, 0), (3, 1), (3, 2), (21, 8), (21, 9), (21, 10), (22, 9), (22, 10), (22, 11), (23, 8), (23, 9), (23, 10)}
+
+def test_compound_path_hole(grid: Grid) -> None:
+    #Each subpath is a ring of its own, so a subpath inside another one is a hole
+    path = Path(grid, "M 50,30 L 150,30 L 150,120 L 50,120 Z M 80,60 L 120,60 L 120,90 L 80,90 Z")
+    inside = path.preparedPolygon.containsPoints(np.array([60 + 40j, 100 + 75j, 140 + 110j, 100 + 200j]))
+    assert inside.tolist() == [True, False, True, False]
+
+def test_railway_subpaths_are_walked_separately(grid: Grid) -> None:
+    #Nothing in the gap between the two subpaths has a railway
+    hexes = classifyPath(grid, "Railways", "M 20,100 L 60,100 M 200,100 L 240,100")[0]
+    assert sorted(hexes) == [(1, 8), (2, 9), (3, 8), (4, 9), (5, 8), (21, 8), (22, 9), (23, 8), (24, 9), (25, 8)]
+
+def test_railway_crosses_every_hex_along_it(grid: Grid) -> None:
+    #Each point along the railway is in one of the crossed hexes
+    hexes = set(classifyPath(grid, "Railways", "M 12,14 L 100,95 L 230,40")[0])
+    points = np.concatenate((np.linspace(12 + 14j, 100 + 95j, 500), np.linspace(100 + 95j, 230 + 40j, 500)))
+    assert {grid.hexCoordinates(complex(point)) for point in points} <= hexes
+
+def test_landmark_distances_cross_frozen_icecap(grid: Grid) -> None:
+    #Land icecap hexes are connected by land in severe winter even if the mapsheet doesn't connect them, so the lower bounds can't count them as unreachable
+    for x, y in [(4, 4), (4, 5), (4, 6)]:
+        i = x * grid.height + y
+        grid.isLand[i] = True
+        grid.terrain[i] = grid.terrainTypes.index("Icecap")
+    grid.isSea[4 * grid.height + 5] = False
+    table = landmarkTableBytes(grid)
+    landLandmarks = int(np.frombuffer(table, dtype="<u4", count=6)[4])
+    distances = np.frombuffer(table, dtype="<u2", offset=24, count=landLandmarks * grid.width * grid.height).reshape(landLandmarks, -1)
+    assert landLandmarks > 0
+    assert sorted(distances[0, [4 * grid.height + 4, 4 * grid.height + 5, 4 * grid.height + 6]].tolist()) == [0, 1, 2]
+
+def lookupHex(table: list[int], grid: Grid, point: complex) -> tuple[int, int]:
+    #The same as hexAtPoint in hex-marker.ts, with the point in the coordinates of the mapsheet instead of the view
+    x = (point.real - grid.minX) / grid.hexWidth
+    y = (point.imag - grid.minY) / grid.hexHeight
+    cellX, cellY = floor(x * 3), floor(y * 2)
+    xPositionInCell, yPositionInCell = x * 3 - cellX, y * 2 - cellY
+    repeatX, repeatY = cellX // 6, cellY // 2
+    i = 5 * (cellX - 6 * repeatX + 6 * (cellY - 2 * repeatY))
+    rightOfDiagonal = xPositionInCell > yPositionInCell if table[i] == 1 else table[i] == 2 and xPositionInCell + yPositionInCell > 1
+    return 2 * repeatX + table[i + (3 if rightOfDiagonal else 1)], repeatY + table[i + (4 if rightOfDiagonal else 2)]
+
+def test_hex_lookup_table_finds_the_hex_at_each_point(grid: Grid) -> None:
+    table = hexLookupTable(grid)
+    random = np.random.default_rng(11)
+    points = grid.minX + random.random(2000) * grid.width * grid.hexWidth + 1j * (grid.minY + random.random(2000) * grid.height * grid.hexHeight)
+    outsidePoints = []
+    for point in points:
+        x, y = lookupHex(table, grid, point)
+        if 0 <= x < grid.width and 0 <= y < grid.height:
+            assert grid.hexCoordinates(point) == (x, y)
+            assert pointsInsidePolygon([point], np.array(grid.hexVertices(x, y)))[0]
+        else:
+            outsidePoints.append(point)
+    #hexAtPoint returns null for these points, which must be outside all the hexes
+    assert 0 < len(outsidePoints) < len(points) / 10
+    for x in range(grid.width):
+        for y in range(grid.height):
+            assert not pointsInsidePolygon(outsidePoints, np.array(grid.hexVertices(x, y))).any()
+
+def test_hex_grid_path_draws_each_hexside_once(grid: Grid) -> None:
+    #The path is in the coordinates of the view, and all the vertices are at whole numbers there with this grid
+    def side(start: complex, end: complex) -> frozenset:
+        return frozenset({(round(start.real, 1), round(start.imag, 1)), (round(end.real, 1), round(end.imag, 1))})
+    lines = Counter(side(segment.start, segment.end) for segment in parse_path(hexGridPath(grid, 2)) if not isinstance(segment, Move))
+    origin = complex(grid.minX, grid.minY)
+    hexsides = {side((vertices[i] - origin) * zoom, (vertices[i - 1] - origin) * zoom) for x in range(grid.width) for y in range(grid.height) for vertices in [grid.hexVertices(x, y)] for i in range(6)}
+    assert set(lines) == hexsides
+    assert max(lines.values()) == 1
+
+def test_offset_lines_with_vertical_and_collinear_lines() -> None:
+    #A rectangle whose left side is two collinear vertical lines and whose bottom is two collinear lines, which are moved to opposite sides so both ends are kept where they meet
+    points = np.array([0, 10, 10 + 6j, 5 + 6j, 6j, 3j])
+    left, right = offsetLines(points, np.roll(points, -1), 1.0, True)
+    assert left.tolist() == pytest.approx([1 + 1j, 9 + 1j, 9 + 7j, 5 + 7j, 5 + 5j, -1 + 5j, -1 + 3j, 1 + 3j])
+    assert right.tolist() == pytest.approx([-1 - 1j, 11 - 1j, 11 + 5j, 5 + 5j, 5 + 7j, 1 + 7j, 1 + 3j, -1 + 3j])
+    #The same lines as an open path start and end at the moved ends of the first and last lines instead of at the closing corner
+    left, right = offsetLines(points, np.append(points[1:], 0), 1.0, False)
+    assert left.tolist() == pytest.approx([1j, 9 + 1j, 9 + 7j, 5 + 7j, 5 + 5j, -1 + 5j, -1 + 3j, 1 + 3j, 1])
+    assert right.tolist() == pytest.approx([-1j, 11 - 1j, 11 + 5j, 5 + 5j, 5 + 7j, 1 + 7j, 1 + 3j, -1 + 3j, -1])
+
+def lineByLineOffset(path: list[Line], distance: float) -> tuple[list[complex], list[complex]]:
+    #How the weather zone borders were offset before offsetLines, one line at a time with slopes and intercepts, which doesn't work for vertical or collinear lines
+    def lineEquation(line: Line) -> tuple[float, float]:
+        slope = (line.start.imag - line.end.imag) / (line.start.real - line.end.real)
+        return slope, line.start.imag - slope * line.start.real
+    def lineIntersection(l1: Line, l2: Line) -> complex:
+        (slope1, intercept1), (slope2, intercept2) = lineEquation(l1), lineEquation(l2)
+        x, y = np.linalg.inv(np.array([[-slope1, 1], [-slope2, 1]])) @ np.array([intercept1, intercept2])
+        return complex(x, y)
+    polygons = ([], [])
+    for i in range(len(path)):
+        for j in range(2):
+            currentSlope = lineEquation(path[i])[0]
+            currentDy = (-1)**(i + j) * distance / np.sqrt(currentSlope**2 + 1)
+            currentLine = Line(path[i].start + complex(currentSlope * currentDy, currentDy), path[i].end + complex(currentSlope * currentDy, currentDy))
+            if i == 0 and not isinstance(path[-1], Close):
+                polygons[j].append(currentLine.start)
+                continue
+            previousSlope = lineEquation(path[i - 1])[0]
+            previousDy = (-1)**(i + j + 1) * distance / np.sqrt(previousSlope**2 + 1)
+            previousLine = Line(path[i - 1].start + complex(previousSlope * previousDy, previousDy), path[i - 1].end + complex(previousSlope * previousDy, previousDy))
+            polygons[j].append(lineIntersection(previousLine, currentLine))
+            if i == len(path) - 1 and not isinstance(path[i], Close):
+                polygons[j].append(currentLine.end)
+    return polygons
+
+@pytest.mark.parametrize("vertices, isClosed", [
+    ([35 + 52j, 32 + 57j, 35 + 62j, 41 + 62j, 44 + 57j, 50 + 57j, 53 + 52j, 50 + 47j, 44 + 47j, 41 + 52j], True),    #Around two hexes next to each other
+    ([32 + 57j, 35 + 62j, 41 + 62j, 44 + 57j, 50 + 57j, 53 + 52j], False)    #Along the bottom of the same hexes
+])
+def test_offset_lines_matches_line_by_line_offset(vertices: list[complex], isClosed: bool) -> None:
+    ends = vertices[1:] + vertices[:1] if isClosed else vertices[1:]
+    path = [Line(start, end) for start, end in zip(vertices, ends)]
+    if isClosed:
+        path[-1] = Close(path[-1].start, path[-1].end)
+    expected = lineByLineOffset(path, 10 / 3)
+    result = offsetLines(np.array(vertices[:len(ends)]), np.array(ends), 10 / 3, isClosed)
+    assert np.isfinite(result[0]).all() and np.isfinite(result[1]).all()
+    assert result[0].tolist() == pytest.approx(expected[0]) and result[1].tolist() == pytest.approx(expected[1])
+
+def test_line_index_matches_across_bucket_boundaries() -> None:
+    #The buckets are 1 wide, the endpoints of the lines are within 0.5 of each other but in different buckets
+    index = LineIndex(0.5, [Line(3 + 7j, 9 + 2j), Line(0.9 + 0.3j, 4.2 + 1.95j)])
+    assert index.find(Line(1.1 + 0.3j, 4.2 + 2.05j)) == 1
+    assert index.find(Line(0.7 - 0.1j, 3.9 + 2.3j)) == 1
+
+def test_line_index_matches_reversed_lines() -> None:
+    index = LineIndex(0.5, [Line(0.9 + 0.3j, 4.2 + 1.95j)])
+    assert index.find(Line(4.2 + 2.05j, 1.1 + 0.3j)) == 0
+    assert index.find(Line(4.2 + 1.95j, 0.9 + 0.3j)) == 0
+
+def test_line_index_does_not_match_lines_farther_than_epsilon() -> None:
+    index = LineIndex(0.5, [Line(0.9 + 0.3j, 4.2 + 1.95j)])
+    assert index.find(Line(1.45 + 0.3j, 4.2 + 1.95j)) is None
+    assert index.find(Line(0.9 + 0.3j, 4.2 + 1.35j)) is None
+    assert index.find(Line(4.2 + 1.95j, 0.9 - 0.25j)) is None
+    #Only one endpoint matches
+    assert index.find(Line(0.9 + 0.3j, 7 + 5j)) is None
+
+def test_line_index_matches_linear_search() -> None:
+    #Short lines on a coarse lattice so that many of them match each other, with jitter smaller than epsilon
+    random = np.random.default_rng(5)
+    points = lambda count: random.integers(0, 4, count) + 1j * random.integers(0, 4, count) + (random.random(count) + 1j * random.random(count)) * 0.2
+    lines = [Line(start, end) for start, end in zip(points(200), points(200))]
+    index = LineIndex(0.3, lines[:100])
+    for line in lines[100:]:
+        assert index.find(line) == next((i for i, other in enumerate(lines[:100]) if index.linesAreEqual(line, other)), None)
+
+def distancesToPolyline(points: np.ndarray, polyline: np.ndarray) -> np.ndarray:
+    #The distance from each point to the nearest segment of the polyline
+    starts, chords = polyline[:-1], np.diff(polyline)
+    t = np.clip(((points[:, np.newaxis] - starts) * chords.conjugate()).real / np.maximum(np.abs(chords)**2, 1e-12), 0, 1)
+    return np.abs(points[:, np.newaxis] - (starts + t * chords)).min(axis=1)
+
+def test_simplify_polyline_keeps_endpoints_and_stays_within_tolerance() -> None:
+    x = np.linspace(0, 50, 400)
+    points = x + 1j * (3 * np.sin(x / 4) + 0.2 * np.sin(3 * x))
+    simplified = simplifyPolyline(points, 0.1)
+    assert simplified[0] == points[0] and simplified[-1] == points[-1]
+    assert 2 < len(simplified) < len(points)
+    assert distancesToPolyline(points, simplified).max() <= 0.1
+
+def test_simplify_polyline_collapses_near_collinear_points() -> None:
+    #Points less than the tolerance off the line between the endpoints are all removed, but a bump bigger than the tolerance is kept
+    points = np.linspace(0, 20, 41) + 0.02j * np.cos(np.arange(41))
+    assert simplifyPolyline(points, 0.05).tolist() == [points[0], points[-1]]
+    points[20] += 0.2j
+    simplified = simplifyPolyline(points, 0.05)
+    assert points[20] in simplified and len(simplified) < len(points) // 2
+    assert distancesToPolyline(points, simplified).max() <= 0.05
+
+def test_simplify_closed_ring() -> None:
+    #The first and last points of a closed ring are the same, the ring keeps its corners and stays closed
+    corners = [0, 10, 10 + 10j, 10j, 0]
+    points = np.concatenate([np.linspace(start, end, 8, endpoint=False) for start, end in zip(corners, corners[1:])] + [[0]])
+    assert simplifyPolyline(points, 0.01).tolist() == corners
+
+def test_coarser_levels_of_detail_have_fewer_points() -> None:
+    #A wavy closed ring and an open curve, each level has at most as many points as the next finer one
+    angles = np.linspace(0, 2 * np.pi, 600, endpoint=False)
+    ring = (100 + 80j) + (20 + 2 * np.sin(7 * angles) + 0.3 * np.sin(40 * angles)) * np.exp(1j * angles)
+    d = "M " + " L ".join("{:.3f},{:.3f}".format(point.real, point.imag) for point in ring) + " Z M 60,40 C 90,0 110,90 140,40 S 170,0 200,60"
+    levels = simplifiedPaths(d, 10.0)
+    assert len(levels) == len(levelsOfDetail) and d not in levels
+    pointCounts = [level.count(",") for level in levels]    #The simplified paths are written as one x,y pair per point
+    assert pointCounts == sorted(pointCounts)
+    assert pointCounts[0] < pointCounts[-1]
+
+def ringArea(points: np.ndarray) -> float:
+    return abs(float((points.conjugate() * np.roll(points, -1)).imag.sum())) / 2
+
+def test_clip_ring_outside_the_rectangle() -> None:
+    assert len(clipRing(np.array([20 + 20j, 30 + 20j, 30 + 30j, 20 + 30j]), 0, 0, 10, 10)) == 0
+    #Around the corner of the rectangle but not overlapping it
+    assert len(clipRing(np.array([12 - 5j, 20 + 5j, 12 + 15j]), 0, 0, 10, 10)) == 0
+
+def test_clip_ring_inside_the_rectangle() -> None:
+    ring = np.array([2 + 2j, 8 + 3j, 6 + 8j, 1 + 6j])
+    assert clipRing(ring, 0, 0, 10, 10).tolist() == ring.tolist()
+
+def test_clip_ring_overlapping_a_corner() -> None:
+    clipped = clipRing(np.array([5 + 5j, 15 + 5j, 15 + 15j, 5 + 15j]), 0, 0, 10, 10)
+    assert set(clipped.tolist()) == {5 + 5j, 10 + 5j, 10 + 10j, 5 + 10j}
+    assert ringArea(clipped) == pytest.approx(25)
+
+def test_clip_polyline_crossing_the_rectangle() -> None:
+    parts = clipPolyline(np.array([-5 + 5j, 5 + 5j, 15 + 5j]), 0, 0, 10, 10)
+    assert [part.tolist() for part in parts] == [[5j, 5 + 5j, 10 + 5j]]
+    #Leaves through the bottom and comes back, which gives two parts
+    parts = clipPolyline(np.array([-5 + 2j, 5 + 2j, 5 + 20j, 7 + 20j, 7 + 2j, 12 + 2j]), 0, 0, 10, 10)
+    assert [part.tolist() for part in parts] == [[2j, 5 + 2j, 5 + 10j], [7 + 10j, 7 + 2j, 10 + 2j]]
+    assert clipPolyline(np.array([-5 + 20j, 20 + 20j]), 0, 0, 10, 10) == []
+
+def closedSubpaths(d: str) -> list[np.ndarray]:
+    return [points for points, isClosed in flattenSubpaths(d, 0.001) if isClosed]
+
+def insideClosedSubpaths(d: str, points: np.ndarray) -> np.ndarray:
+    subpaths = closedSubpaths(d)
+    if len(subpaths) == 0:
+        return np.zeros(len(points), dtype=bool)
+    return PreparedPolygon(np.concatenate(subpaths), np.cumsum([0] + [len(ring) for ring in subpaths[:-1]])).containsPoints(points)
+
+def test_tiles_cover_the_same_area_as_the_world_map(grid: Grid) -> None:
+    #A wavy island across several tiles, a compound path with a hole and a railway, each point of the map must be inside the same paths with and without tiles
+    angles = np.linspace(0, 2 * np.pi, 300, endpoint=False)
+    ring = (140 + 80j) + (60 + 8 * np.sin(5 * angles)) * np.exp(1j * angles)
+    paths = {
+        "island": "M " + " L ".join("{:.3f},{:.3f}".format(point.real, point.imag) for point in ring) + " Z",
+        "holed": "M 30,30 L 120,30 L 120,140 L 30,140 Z M 60,60 L 90,60 L 90,110 L 60,110 Z",
+        "railway": "M 10,20 C 100,200 180,-40 260,140"
+    }
+    worldSvg = "<g><g class=\"land\">{}</g><text>Country name</text></g>".format("".join("<path id=\"{}\" d=\"{}\"/>".format(id, d) for id, d in paths.items()))
+    world, tiles, manifest = tileWorldMap(grid, worldSvg, [], 8)
+    tileWidth, tileHeight = 8 * grid.hexWidth, 8 * grid.hexHeight
+    assert "<path" not in world and "id=\"tiles\"" in world and "Country name" in world
+    assert manifest["tiles"] == sorted(tiles) and manifest["tileWidth"] == tileWidth * 3
+
+    tilePaths = {}
+    for name, tile in tiles.items():
+        for path in XML.fromstring("<tile>" + tile + "</tile>").iter("path"):
+            tilePaths[name, path.attrib["id"]] = path.attrib["d"]
+    def tileName(point: complex) -> str:
+        return "{}-{}".format(int((point.real - grid.minX) // tileWidth), int((point.imag - grid.minY) // tileHeight))
+
+    #Only compare the points that aren't right next to the edges, where the tiles can be simplified differently
+    x, y = np.meshgrid(np.arange(grid.minX + 0.7, 270, 3.1), np.arange(grid.minY + 0.3, 160, 2.9))
+    points = (x + 1j * y).ravel()
+    for id in ["island", "holed"]:
+        distances = np.min([distancesToPolyline(points, subpath) for subpath in closedSubpaths(paths[id])], axis=0)
+        samples = points[distances > 0.05]
+        expected = insideClosedSubpaths(paths[id], samples)
+        assert expected.any() and not expected.all()
+        names = np.array([tileName(point) for point in samples])
+        for name in set(names):
+            inTile = names == name
+            assert (insideClosedSubpaths(tilePaths.get((name, id), ""), samples[inTile]) == expected[inTile]).all()
+
+    #Each point along the railway is on the railway in the tile that it's in
+    railway = flattenSubpaths(paths["railway"], 0.01)[0][0]
+    names = np.array([tileName(point) for point in railway])
+    for name in set(names):
+        parts = [points for points, isClosed in flattenSubpaths(tilePaths[name, "railway"], 0.01)]
+        assert (np.min([distancesToPolyline(railway[names == name], part) for part in parts], axis=0) < 0.05).all()
+
+#Tests of whole compilations of a small synthetic mapsheet from generate_mapsheet.py
+
+@pytest.fixture(scope="module")
+def syntheticSvg() -> str:
+    return generateMapsheet(24, 18, 8, 60)
+
+@pytest.mark.parametrize("options", [{}, {"tiles": True, "tileSize": 8, "hexTable": True}])
+def test_parallel_compilation_is_the_same_as_serial(syntheticSvg: str, options: dict) -> None:
+    #The worker processes can finish the paths in any order, but the results must be merged in the order of the paths
+    assert compileMapsheet(io.StringIO(syntheticSvg), jobs = 3, **options) == compileMapsheet(io.StringIO(syntheticSvg), jobs = 1, **options)
+
+def lakesLayer(layers: list) -> XML.Element:
+    return next(layer for layer in layers if layer.attrib["{http://www.inkscape.org/namespaces/inkscape}label"] == "Lakes")
+
+def editedLake(svg: str) -> list:
+    #The layers of the mapsheet with the outline of the first lake replaced by a larger quadrilateral
+    layers = loadSvg(io.StringIO(svg))
+    lakesLayer(layers)[0].set("d", "M 68,80 L 112,84 L 102,118 L 72,108 Z")
+    return layers
+
+def test_layer_cache_rebuilds_the_edited_layer_and_its_dependents(syntheticSvg: str, tmp_path: pathlib.Path) -> None:
+    cacheFolder = str(tmp_path)
+    compiled = compileLayers(loadSvg(io.StringIO(syntheticSvg)), cacheFolder = cacheFolder)
+    assert {"Islands and Continents", "Lakes", "Desert", "Railways", "Weather Zones"} <= set(compiled.rebuiltLayers)
+    assert compileLayers(loadSvg(io.StringIO(syntheticSvg)), cacheFolder = cacheFolder).rebuiltLayers == []
+    #The lakes change isLand, so the layers that read it are compiled again but the ones before the lakes and the weather zones come from the cache
+    compiled = compileLayers(editedLake(syntheticSvg), cacheFolder = cacheFolder)
+    assert set(compiled.rebuiltLayers) == {"Lakes", "Desert", "Forest", "Mountain", "TallMountain", "Icecap", "Railways"}
+    assert {"Islands and Continents", "Weather Zones"} <= set(compiled.cachedLayers)
+    assert not [fileName for fileName in os.listdir(cacheFolder) if fileName.endswith(".tmp")]
+
+def test_layer_cache_gives_the_same_outputs_as_an_uncached_compilation(syntheticSvg: str, tmp_path: pathlib.Path) -> None:
+    cacheFolder = str(tmp_path)
+    compileMapsheet(io.StringIO(syntheticSvg), cacheFolder = cacheFolder)
+    assert compileMapsheet(editedLake(syntheticSvg), cacheFolder = cacheFolder) == compileMapsheet(editedLake(syntheticSvg))
+    assert compileMapsheet(editedLake(syntheticSvg)) != compileMapsheet(io.StringIO(syntheticSvg))
+
+def test_memory_cache_gives_the_same_outputs_as_an_uncached_compilation(syntheticSvg: str) -> None:
+    cache = MemoryCache()
+    assert compileMapsheet(io.StringIO(syntheticSvg), memoryCache = cache) == compileMapsheet(io.StringIO(syntheticSvg))
+    oldLake = lakesLayer(loadSvg(io.StringIO(syntheticSvg)))[0].attrib["d"]
+    assert ("classifyPath", "Lakes", oldLake) in cache.entries
+    #The results of the replaced lake are dropped, the ones of the new lake are kept for the next compilation
+    assert compileMapsheet(editedLake(syntheticSvg), memoryCache = cache) == compileMapsheet(editedLake(syntheticSvg))
+    newLake = lakesLayer(editedLake(syntheticSvg))[0].attrib["d"]
+    assert ("classifyPath", "Lakes", oldLake) not in cache.entries and ("simplifiedPaths", oldLake) not in cache.entries
+    assert ("classifyPath", "Lakes", newLake) in cache.entries and ("simplifiedPaths", newLake) in cache.entries
+
+def test_memory_cache_keeps_the_entries_when_the_compilation_fails(syntheticSvg: str) -> None:
+    cache = MemoryCache()
+    compileMapsheet(io.StringIO(syntheticSvg), memoryCache = cache)
+    entries = dict(cache.entries)
+    #The second lake can't be parsed, after the first one has been compiled again
+    layers = editedLake(syntheticSvg)
+    lakesLayer(layers)[1].set("d", "M 10,10 Q")
+    with pytest.raises(ValueError):
+        compileMapsheet(layers, memoryCache = cache)
+    assert cache.entries == entries
+    assert compileMapsheet(io.StringIO(syntheticSvg), memoryCache = cache) == compileMapsheet(io.StringIO(syntheticSvg))
+
+def test_hashed_names_replace_the_files_of_the_previous_compilation(syntheticSvg: str, tmp_path: pathlib.Path) -> None:
+    #The mapsheet folder is inside tmp_path so that the files in ../build are too
+    folder = tmp_path / "mapsheet"
+    unrelatedFiles = ["mapsheet.svg", "world.xml", "world.notahash.xml", "worlds.0123456789ab.xml", "tiles/notes.txt"]
+    for fileName in unrelatedFiles:
+        (folder / fileName).parent.mkdir(parents = True, exist_ok = True)
+        (folder / fileName).write_text("unrelated")
+    oldOutputs = compileMapsheet(io.StringIO(syntheticSvg), hashedNames = True, compress = True)
+    writeOutputs(oldOutputs, str(folder))
+    removeStaleFiles(oldOutputs, str(folder))
+    oldWorld = next(path for path in oldOutputs if re.fullmatch(r"world\.[0-9a-f]+\.xml", path))
+    assert (folder / oldWorld).is_file() and (folder / (oldWorld + ".gz")).is_file()
+
+    outputs = compileMapsheet(editedLake(syntheticSvg), hashedNames = True, compress = True)
+    writeOutputs(outputs, str(folder))
+    removeStaleFiles(outputs, str(folder))
+    assert oldWorld not in outputs
+    assert not (folder / oldWorld).exists() and not (folder / (oldWorld + ".gz")).exists()
+    #Only the new output files and the unrelated files are left
+    files = {file.relative_to(tmp_path).as_posix() for file in tmp_path.rglob("*") if file.is_file()}
+    assert files == {os.path.normpath(os.path.join("mapsheet", path)).replace(os.sep, "/") for path in outputs} | {"mapsheet/" + fileName for fileName in unrelatedFiles}
+
+    #The names that mapsheetUrl gives the view and the name of landmarks.bin in create-hexes.js are files that exist
+    fileNames = json.loads(re.match(r"const f=(\{.*?\});", outputs["../build/view/init/mapsheet-files.js"])[1])
+    assert "world.xml" in fileNames and "world-1.json" in fileNames
+    for fileName in fileNames.values():
+        assert (folder / fileName).is_file()
+    landmarks = re.search(r"landmarks\.[0-9a-f]+\.bin", outputs["../build/model/mapsheet/create-hexes.js"])[0]
+    assert (tmp_path / "build" / "model" / "mapsheet" / landmarks).is_file()
+
+#The tables of a tiny mapsheet that the unit tests of hex-table.ts and landmark-table.ts load, run python test_compile_mapsheet.py in the mapsheet folder to write them again after changing the formats
+tablesFolder = os.path.join(os.path.dirname(__file__), "..", "unittest", "tables")
+
+def tinyMapsheet() -> Grid:
+    #4 × 3 hexes, a German and French island of four hexes in the middle and a French island of one hex in the bottom right corner
+    grid = Grid(0.0, 0.0, 9.0, 10.0, 4, 3)
+    grid.countries = [None, "germany", "france"]
+    for (x, y), country in {(1, 0): 1, (1, 1): 1, (2, 0): 2, (2, 1): 2, (3, 2): 2}.items():
+        grid.isLand[x * grid.height + y] = True
+        grid.country[x * grid.height + y] = country
+    grid.weatherZone[2 * grid.height:] = grid.weatherZones.index("NorthTemperate")
+    grid.terrain[2 * grid.height + 1] = grid.terrainTypes.index("Mountain")
+    grid.canUseRail[2 * grid.height + 1] = grid.isResourceHex[2 * grid.height + 1] = True
+    grid.isColony[3 * grid.height + 2] = True
+    grid.secondaryController[3 * grid.height + 2] = 1
+    grid.city[1 * grid.height + 1] = "Berlin"
+    grid.cityAlignment[1 * grid.height + 1] = "left"
+    grid.cityOffset[1 * grid.height + 1] = (0.5, -0.5)
+    grid.isCapital[1 * grid.height + 1] = grid.isMajorPort[1 * grid.height + 1] = True
+    #The hexsides between two land hexes are land, the others are sea
+    landSides = np.all(grid.isLand[grid.sideHexes] & (grid.sideHexes >= 0), axis=1)
+    grid.setHexsideBits(grid.adjacentLandHexes, np.flatnonzero(landSides), True)
+    grid.setHexsideBits(grid.adjacentSeaHexes, np.flatnonzero(landSides), False)
+    return grid
+
+def test_unittest_tables_are_up_to_date() -> None:
+    grid = tinyMapsheet()
+    for fileName, contents in [("hexes.bin", hexTableBytes(grid)), ("landmarks.bin", landmarkTableBytes(grid))]:
+        with open(os.path.join(tablesFolder, fileName), "rb") as file:
+            assert file.read() == contents, "Run python test_compile_mapsheet.py to write " + fileName + " again"
+
+if __name__ == "__main__":
+    grid = tinyMapsheet()
+    os.makedirs(tablesFolder, exist_ok = True)
+    for fileName, contents in [("hexes.bin", hexTableBytes(grid)), ("landmarks.bin", landmarkTableBytes(grid))]:
+        with open(os.path.join(tablesFolder, fileName), "wb") as file:
+            file.write(contents)
@@ -1,4 +1,6 @@
 //The Javascript code for this file is generated by running /mapsheet/compile_mapsheet.py and should be edited by editing /mapsheet/azimuthal_projection.svg with an SVG editor.
+//When compiled with --hex-table, the hexes are instead loaded from the binary file /build/model/mapsheet/hexes.bin by hex-table.ts.
+//Either way, create-hexes.js also loads the landmark distances for pathfinding from /build/model/mapsheet/landmarks.bin with landmark-table.ts.
 
 /**
  * The number of hexes from the left edge of the mapsheet to the right edge.
@@ -30,6 +32,11 @@ export declare const svgWidth: number;
  */
 export declare const svgHeight: number;
 
+/**
+ * The x and y of the two hexes of each canal (Panama Canal, Kiel Canal and Suez Canal), which are adjacent by sea for the partnership that controls both hexes.
+ */
+export declare const canals: ReadonlyArray<readonly [readonly [number, number], readonly [number, number]]>;
+
 /**
  * Creates the Hex objects.
  */
@@ -0,0 +1,83 @@
+import { Hex, TerrainType, WeatherZone } from "../mapsheet.js";
+import { Countries, Country } from "../countries.js";
+
+/**
+ * Creates the Hex objects from the binary hex table that /mapsheet/compile_mapsheet.py writes when run with --hex-table. See hexTableBytes in compile_mapsheet.py for the format.
+ *
+ * @param buffer    The contents of the hexes.bin file.
+ */
+export function loadHexTable(buffer: ArrayBuffer): void {
+    const header = new DataView(buffer);
+    if(new TextDecoder().decode(new Uint8Array(buffer, 0, 4)) !== "HEXT" || header.getUint32(4, true) !== 2){
+        throw new Error("Invalid hex table, recompile the mapsheet");
+    }
+    const width = header.getUint32(8, true);
+    const height = header.getUint32(12, true);
+    const landNeighborCount = header.getUint32(16, true);
+    const seaNeighborCount = header.getUint32(20, true);
+    const stringTableLength = header.getUint32(24, true);
+    const hexCount = width * height;
+
+    //The columns are read directly from the buffer without copying them. Typed arrays use the byte order of the platform, which is little endian on all platforms that browsers run on.
+    let offset = 28;
+    const adjacency = new Uint16Array(buffer, offset, hexCount);
+    offset += 2 * hexCount;
+    const nextColumn = (): Uint8Array => {
+        const column = new Uint8Array(buffer, offset, hexCount);
+        offset += hexCount;
+        return column;
+    };
+    const terrain = nextColumn();
+    const weatherZone = nextColumn();
+    const country = nextColumn();
+    const secondaryController = nextColumn();
+    const flags = nextColumn();
+    offset += -offset & 3;
+    const nextNeighborTable = (neighborCount: number): Hex.NeighborTable => {
+        const offsets = new Uint32Array(buffer, offset, hexCount + 1);
+        const neighbors = new Uint32Array(buffer, offset + 4 * (hexCount + 1), neighborCount);
+        offset += 4 * (hexCount + 1 + neighborCount);
+        return {offsets: offsets, neighbors: neighbors};
+    };
+    const landNeighbors = nextNeighborTable(landNeighborCount);
+    const seaNeighbors = nextNeighborTable(seaNeighborCount);
+    const stringTable: {
+        terrainTypes: Array<keyof typeof TerrainType>,
+        weatherZones: Array<keyof typeof WeatherZone>,
+        countries: Array<keyof typeof Countries>,
+        cities: Array<[number, string | null, "t" | "b" | "l" | "r", number, number]>
+    } = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, offset, stringTableLength)));
+
+    const terrainTypes = stringTable.terrainTypes.map(it => TerrainType[it]);
+    const weatherZones = stringTable.weatherZones.map(it => WeatherZone[it]);
+    const countries = [null, ...stringTable.countries.map(it => Countries[it] as Country)];
+    const cities = new Map(stringTable.cities.map(it => [it[0], it]));
+    //Share the adjacency arrays between hexes like the constructor calls in create-hexes.js do, they're read-only
+    const adjacencyArrays = Array.from(new Array(64), (_, mask) => Array.from(new Array(6), (_, side) => (mask & (1 << side)) !== 0));
+
+    for(let i = 0; i < hexCount; i++){
+        const city = cities.get(i);
+        new Hex(
+            Math.floor(i / height),
+            i % height,
+            terrainTypes[terrain[i]],
+            weatherZones[weatherZone[i]],
+            (flags[i] & 1) !== 0,
+            countries[country[i]],
+            (flags[i] & 2) !== 0,
+            (flags[i] & 4) !== 0,
+            (flags[i] & 8) !== 0,
+            countries[secondaryController[i]],
+            adjacencyArrays[adjacency[i] & 63],
+            adjacencyArrays[adjacency[i] >> 6],
+            city?.[1] ?? null,
+            city?.[2] ?? "r",
+            city?.[3] ?? 0,
+            city?.[4] ?? 0,
+            (flags[i] & 16) !== 0,
+            (flags[i] & 32) !== 0,
+            (flags[i] & 64) !== 0
+        );
+    }
+    Hex.setNeighborTables(landNeighbors, seaNeighbors);
+}
@@ -3,7 +3,7 @@ import { currentMonth, date, Month } from "../date.js";
 import { SupplyLines, TerrainType, WeatherCondition, WeatherZone } from "../mapsheet.js";
 import { Partnership } from "../partnership.js";
 import { AirUnit, AliveUnit, NavalUnit, SupplyUnit, Unit } from "../units.js";
-import { hexHeight, hexWidth, mapHeight, mapWidth, svgHeight, svgWidth } from "./create-hexes.js";
+import { canals, hexHeight, hexWidth, mapHeight, mapWidth, svgHeight, svgWidth } from "./create-hexes.js";
 
 import UnitContainer from "../unit-container.js";
 
@@ -23,6 +23,7 @@ class Hex extends UnitContainer {
 
     readonly #adjacentLandHexes: ReadonlyArray<boolean>;
     readonly #adjacentSeaHexes: ReadonlyArray<boolean>;
+    readonly #index: number;
 
     readonly city: string | null;
     readonly cityAlignment: "t" | "b" | "l" | "r";
@@ -53,6 +54,8 @@ class Hex extends UnitContainer {
     static readonly allCityHexes: Array<Hex> = [];
     static readonly allResourceHexes: Array<Hex> = [];
     static readonly #fromCoordinates: Array<Array<Hex>> = Array.from(new Array(mapWidth), () => new Array(mapHeight));
+    static #landNeighbors: Hex.NeighborTable | null = null;
+    static #seaNeighbors: Hex.NeighborTable | null = null;
 
     /**
      * Constructs a hex. All hexes are constructed at the beginning of the game in Hex.createHexGrid(). To get hexes after that, fetch existing hexes with static methods.
@@ -122,6 +125,7 @@ class Hex extends UnitContainer {
         this.isEnclaveCity = isEnclaveCity;
         this.#isMajorPort = isMajorPort;
 
+        this.#index = Hex.allHexes.length;
         Hex.allHexes.push(this);
         country?.hexes.push(this);
         if(city !== null){
@@ -720,11 +724,19 @@ class Hex extends UnitContainer {
      */
     adjacentLandHexes(): Array<Hex> {
         let result = [];
-        for(let i = 0; i < 6; i++){
-            const hex = this.#orderedAdjacentHexes()[i];
-            if(hex !== undefined && (this.#adjacentLandHexes[i] || (this.weatherCondition() === WeatherCondition.SevereWinter && this.isIcecap() && hex.isIcecap() && this.isLand() && hex.isLand()))){
-                result.push(hex);
+        if(this.weatherCondition() === WeatherCondition.SevereWinter && this.isIcecap() && this.isLand()){
+            //Frozen icecap hexes are connected by land even where the mapsheet doesn't connect them, so the precomputed table can't be used
+            for(let i = 0; i < 6; i++){
+                const hex = this.#orderedAdjacentHexes()[i];
+                if(hex !== undefined && (this.#adjacentLandHexes[i] || (hex.isIcecap() && hex.isLand()))){
+                    result.push(hex);
+                }
             }
+            return result;
+        }
+        const table = Hex.#neighborTable(true);
+        for(let i = table.offsets[this.#index]; i < table.offsets[this.#index + 1]; i++){
+            result.push(Hex.allHexes[table.neighbors[i]]);
         }
         return result;
     }
@@ -741,26 +753,68 @@ class Hex extends UnitContainer {
             return [];
         }
 
-        const canals = [
-            [Hex.fromCoordinates(105, 86), Hex.fromCoordinates(106, 86)],    //Panama Canal
-            [Hex.fromCoordinates(162, 169), Hex.fromCoordinates(163, 169)],  //Kiel Canal
-            [Hex.fromCoordinates(173, 200), Hex.fromCoordinates(173, 201)]   //Suez Canal
-        ];
-        const interestingCanal = canals.find(it => it.includes(this));
+        const interestingCanal = canals.map(it => it.map(([x, y]) => Hex.fromCoordinates(x, y))).find(it => it.includes(this));
 
         let result: Array<Hex> = [];
         if(canalOwner !== null && interestingCanal?.every(it => it.controller()!!.partnership() === canalOwner)){
             result.push(interestingCanal.find(it => it !== this)!!);
         }
-        for(let i = 0; i < 6; i++){
-            const hex = this.#orderedAdjacentHexes()[i];
-            if(hex !== undefined && this.#adjacentSeaHexes[i] && !hex.isIcecap()){
+        const table = Hex.#neighborTable(false);
+        for(let i = table.offsets[this.#index]; i < table.offsets[this.#index + 1]; i++){
+            const hex = Hex.allHexes[table.neighbors[i]];
+            if(!hex.isIcecap()){
                 result.push(hex);
             }
         }
         return result;
     }
 
+    /**
+     * Sets the land and sea neighbour tables precomputed by /mapsheet/compile_mapsheet.py. Must be called after all hexes have been constructed.
+     *
+     * @param landNeighbors The hexes adjacent by land, indexed by the position of the hexes in Hex.allHexes.
+     * @param seaNeighbors  The hexes adjacent by sea, indexed by the position of the hexes in Hex.allHexes.
+     */
+    static setNeighborTables(landNeighbors: Hex.NeighborTable, seaNeighbors: Hex.NeighborTable): void {
+        Hex.#landNeighbors = landNeighbors;
+        Hex.#seaNeighbors = seaNeighbors;
+    }
+
+    /**
+     * Gets the land or sea neighbour table. If the hexes weren't loaded from a hex table, builds it from the adjacency arrays the first time it's needed.
+     *
+     * @param land  True to get the land neighbour table, false to get the sea neighbour table.
+     *
+     * @returns The neighbour table.
+     */
+    static #neighborTable(land: boolean): Hex.NeighborTable {
+        const existing = land ? Hex.#landNeighbors : Hex.#seaNeighbors;
+        if(existing !== null){
+            return existing;
+        }
+
+        const offsets = new Uint32Array(Hex.allHexes.length + 1);
+        let neighbors: Array<number> = [];
+        for(let hex of Hex.allHexes){
+            const adjacent = land ? hex.#adjacentLandHexes : hex.#adjacentSeaHexes;
+            const orderedAdjacentHexes = hex.#orderedAdjacentHexes();
+            for(let i = 0; i < 6; i++){
+                if(adjacent[i] && orderedAdjacentHexes[i] !== undefined){
+                    neighbors.push(orderedAdjacentHexes[i]!!.#index);
+                }
+            }
+            offsets[hex.#index + 1] = neighbors.length;
+        }
+        const table = {offsets: offsets, neighbors: Uint32Array.from(neighbors)};
+        if(land){
+            Hex.#landNeighbors = table;
+        }
+        else{
+            Hex.#seaNeighbors = table;
+        }
+        return table;
+    }
+
     /**
      * Checks if air units are grounded in this hex.
      *
@@ -944,6 +998,14 @@ class Hex extends UnitContainer {
 }
 
 namespace Hex {
+    /**
+     * The neighbours of all hexes in compressed sparse row form. The neighbours of the hex at index i in Hex.allHexes are at neighbors[offsets[i]] up to but not including neighbors[offsets[i + 1]], in side order.
+     */
+    export type NeighborTable = {
+        readonly offsets: Uint32Array,
+        readonly neighbors: Uint32Array
+    };
+
     export type Json = {
         x: number,
         y: number,
@@ -0,0 +1,60 @@
+import { Hex } from "../mapsheet.js";
+
+//The distances from each landmark hex to each hex, indexed by x * mapHeight + y. Empty if no landmark table has been loaded.
+let landDistances: Array<Uint16Array> = [];
+let seaDistances: Array<Uint16Array> = [];
+let mapHeight = 0;
+
+/**
+ * Loads the landmark table that /mapsheet/compile_mapsheet.py writes to landmarks.bin. See landmarkTableBytes in compile_mapsheet.py for the format.
+ *
+ * @param buffer    The contents of the landmarks.bin file, or null if it couldn't be downloaded, in which case landmarkDistanceLowerBound always returns 0.
+ */
+export function loadLandmarkTable(buffer: ArrayBuffer | null): void {
+    if(buffer === null){
+        return;
+    }
+    const header = new DataView(buffer);
+    if(new TextDecoder().decode(new Uint8Array(buffer, 0, 4)) !== "LMRK" || header.getUint32(4, true) !== 1){
+        throw new Error("Invalid landmark table, recompile the mapsheet");
+    }
+    const hexCount = header.getUint32(8, true) * header.getUint32(12, true);
+    let offset = 24;
+    const nextDistances = (): Uint16Array => {
+        const distances = new Uint16Array(buffer, offset, hexCount);
+        offset += 2 * hexCount;
+        return distances;
+    };
+    mapHeight = header.getUint32(12, true);
+    landDistances = Array.from(new Array(header.getUint32(16, true)), nextDistances);
+    seaDistances = Array.from(new Array(header.getUint32(20, true)), nextDistances);
+}
+
+/**
+ * Gets a lower bound for the number of hexsides that a path between two hexes has to cross, using the triangle inequality with the distances from the landmarks.
+ *
+ * @param from  The hex that the path starts at.
+ * @param to    The hex that the path ends at.
+ * @param land  True to only cross land hexsides, false to only cross sea hexsides.
+ *
+ * @returns The lower bound, or Infinity if there's no such path at all.
+ */
+export function landmarkDistanceLowerBound(from: Hex, to: Hex, land: boolean): number {
+    const fromIndex = from.x * mapHeight + from.y;
+    const toIndex = to.x * mapHeight + to.y;
+    let result = 0;
+    for(let distances of land ? landDistances : seaDistances){
+        const fromDistance = distances[fromIndex];
+        const toDistance = distances[toIndex];
+        if(fromDistance === 0xFFFF || toDistance === 0xFFFF){
+            //If only one of the hexes can be reached from the landmark, they can't be reached from each other either
+            if(fromDistance !== toDistance){
+                return Infinity;
+            }
+        }
+        else{
+            result = Math.max(result, Math.abs(fromDistance - toDistance));
+        }
+    }
+    return result;
+}
@@ -5,6 +5,8 @@ import { Partnership } from "../partnership.js";
 import { Countries, Country } from "../countries.js";
 import { SupplyUnit } from "../units.js";
 
+import { landmarkDistanceLowerBound } from "./landmark-table.js";
+
 namespace SupplyLines {
     let cachedSupplyLines = new Map<
         (it: Hex) => boolean,               //isDestination
@@ -24,6 +26,25 @@ namespace SupplyLines {
         cachedSupplyLines = new Map();
     }
 
+    /**
+     * Gets a lower bound for the number of hexes that a path between two hexes has to pass, which is used to steer the search in pathBetweenHexes and to skip destinations that can't be reached. The max distance of pathBetweenHexes is still measured as the crow flies with distanceFromHex.
+     *
+     * @param from              The hex that the path starts at.
+     * @param to                The hex that the path ends at.
+     * @param allowSeaHexsides  Whether the path is allowed to cross all-sea hexsides.
+     * @param allowLandHexsides Whether the path is allowed to cross all-land hexsides.
+     *
+     * @returns The lower bound, or Infinity if there can't be such a path.
+     */
+    function distanceLowerBound(from: Hex, to: Hex, allowSeaHexsides: boolean, allowLandHexsides: boolean): number {
+        const distance = from.distanceFromHex(to);
+        //The landmark distances are only for paths crossing only land hexsides or only sea hexsides
+        if(allowSeaHexsides === allowLandHexsides){
+            return distance;
+        }
+        return Math.max(distance, landmarkDistanceLowerBound(from, to, allowLandHexsides));
+    }
+
     /**
      * Gets a path between a given origin hex and a destination hex that satisfies a certain condition, with the requirement that each passed hex satisfies a certain condition.
      *
@@ -112,7 +133,8 @@ namespace SupplyLines {
             }
             else{
                 //Initialize this here for performance reasons so that it doesn't have to be initialized if the cache is used
-                destinations ??= Hex.allHexes.filter(isDestination);
+                //Destinations that can't be reached from the origin whatever happens in the game are left out, so that if there are only such destinations, the search ends here instead of going through every hex it can reach
+                destinations ??= Hex.allHexes.filter(it => isDestination(it) && distanceLowerBound(origin, it, allowSeaHexsides, allowLandHexsides) !== Infinity);
                 if(!allowLandHexsides && Countries.turkey.partnership() === Partnership.Neutral){
                     destinations = destinations.filter(it => it.isBlackSea() === origin.isBlackSea());
                 }
@@ -121,8 +143,10 @@ namespace SupplyLines {
                 }
 
                 //Sort this seperately instead of using movement.destination.closestHex for performance reasons. Sorting an array that's already mostly sorted is faster than sorting a completely random array.
-                destinations.sort((a, b) => a.distanceFromHex(hex) - b.distanceFromHex(hex));
-                hex = destinations[0].closestHex(allowedAdjacentHexes);
+                const distances = new Map(destinations.map(it => [it, distanceLowerBound(hex, it, allowSeaHexsides, allowLandHexsides)]));
+                destinations.sort((a, b) => distances.get(a)!! - distances.get(b)!!);
+                const destination = destinations[0];
+                hex = allowedAdjacentHexes.toSorted((a, b) => distanceLowerBound(a, destination, allowSeaHexsides, allowLandHexsides) - distanceLowerBound(b, destination, allowSeaHexsides, allowLandHexsides))[0];
                 passedHexes.push(hex);
             }
         }
@@ -0,0 +1,16 @@
+//The Javascript code for this file is generated by running /mapsheet/compile_mapsheet.py (see hexGridScript) and should be edited by editing /mapsheet/azimuthal_projection.svg with an SVG editor.
+
+/**
+ * The path data of the outline of all hexes, in zoom-independent pixels.
+ */
+export declare const hexGridPath: string;
+
+/**
+ * The positions of the city markers and labels by the index of the city hex (x * mapHeight + y), as [marker x, marker y, label x, label y] in zoom-independent pixels.
+ */
+export declare const cityAnchors: ReadonlyMap<number, readonly [number, number, number, number]>;
+
+/**
+ * The lookup table that HexMarker.hexAtPoint finds the hex at a point with, see hexLookupTable in compile_mapsheet.py for the format.
+ */
+export declare const hexLookupTable: ReadonlyArray<number>;
@@ -1,9 +1,10 @@
-import { Hex } from "../../model/mapsheet.js";
 import { date, dateToString } from "../../model/date.js";
 
 import InfoBubble from "../info/info-bubble.js";
 import HexMarker from "../markers/hex-marker.js";
 
+import { hexGridPath } from "./hex-grid.js";
+import { mapsheetUrl } from "./mapsheet-files.js";
 import { writeAllCountryNames } from "./write-all-country-names.js";
 
 namespace InitView {
@@ -18,8 +19,8 @@ namespace InitView {
 
         //Download the world map
         const worldMap = document.getElementById("worldMap")!!;
-        const worldMapHtml = await (await fetch("mapsheet/world.xml")).text();
-        worldMap.innerHTML = worldMapHtml + "<g id=\"hexGrid\"></g><g id=\"installations\"></g>";
+        const worldMapHtml = await (await fetch(mapsheetUrl("world.xml"))).text();
+        worldMap.innerHTML = worldMapHtml + `<g id="hexGrid"><path d="${hexGridPath}"/></g><g id="installations"></g>`;    //The mapsheet compiler draws the whole hex grid as one path
         writeAllCountryNames();
 
         //Enable scrolling by dragging
@@ -47,29 +48,6 @@ namespace InitView {
             }
         };
 
-        //Define some variables
-        const hexGrid = document.getElementById("hexGrid")!!;
-
-        //Draw the hex grid
-        for(let x = 0; x <= Hex.mapWidth; x++){
-            const path = document.createElementNS("http://www.w3.org/2000/svg", "path");
-            let points = "M" + (x % 2 ? x * Hex.hexWidth : (x+1/3) * Hex.hexWidth) + " 0";
-            for(let y = 0; y < Hex.mapHeight * 2 + (x === 0 ? 0 : 1); y++){
-                points += (x === Hex.mapWidth && y === 0 ? "m" : "l") + ((-1)**(x+y+1) * Hex.hexWidth / 3) + " " + (Hex.hexHeight / 2);
-            }
-            path.setAttribute("d", points);
-            hexGrid.appendChild(path);
-        }
-        for(let y = 0; y <= Hex.mapHeight; y++){
-            const path = document.createElementNS("http://www.w3.org/2000/svg", "path");
-            let points = "M" + (Hex.hexWidth / 3) + " " + (y * Hex.hexHeight);
-            for(let x = 0; x < Hex.mapWidth; x++){
-                points += "h" + (Hex.hexWidth * 2 / 3) + "m" + (Hex.hexWidth / 3) + " " + ((-1)**x * Hex.hexHeight / 2);
-            }
-            path.setAttribute("d", points);
-            hexGrid.appendChild(path);
-        }
-
         //Draw the cities and resource hexes
         HexMarker.drawAllCities();
         HexMarker.drawResourceHexes();
@@ -0,0 +1,12 @@
+//The Javascript code for this file is generated by running /mapsheet/compile_mapsheet.py (see mapsheetFilesScript).
+//When compiled with --hashed-names, the files that are downloaded from the mapsheet folder have a hash of their contents in their names, so that they can be cached forever.
+//Without --hashed-names, as in the version of this file that is checked in, every file keeps its own name.
+
+/**
+ * Gets the URL of a file that /mapsheet/compile_mapsheet.py writes to the mapsheet folder.
+ *
+ * @param fileName  The name of the file without the hash, relative to the mapsheet folder, such as "world.xml" or "tiles/0-0.xml".
+ *
+ * @returns The URL relative to the page.
+ */
+export declare function mapsheetUrl(fileName: string): string;
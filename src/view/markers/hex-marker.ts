@@ -2,6 +2,7 @@ import { Hex } from "../../model/mapsheet.js";
 
 import InfoBubble from "../info/info-bubble.js";
 import PanZoom from "../pan-zoom.js";
+import { cityAnchors, hexLookupTable } from "../init/hex-grid.js";
 
 namespace HexMarker {
     const fortPictures: ReadonlyArray<string> = [
@@ -15,6 +16,8 @@ namespace HexMarker {
         "M1.2 1 H4.8"
     ];
 
+    const textAnchors = {l: "end", r: "start", t: "middle", b: "middle"} as const;
+
     export let onhexclick: ((hex: Hex, event: Event) => void) | null = null;
 
     /**
@@ -25,17 +28,18 @@ namespace HexMarker {
             const cityMarker = document.createElementNS("http://www.w3.org/2000/svg", "g");
             cityMarker.setAttribute("class", "cityMarker");
             cityMarker.setAttribute("data-hex", `${hex.x},${hex.y}`);
+            const [pointX, pointY, labelX, labelY] = cityAnchors.get(hex.x * Hex.mapHeight + hex.y)!!;
 
             const point = document.createElementNS("http://www.w3.org/2000/svg", "circle");
-            point.setAttribute("cx", (hex.centerX() + hex.cityOffsetX * Hex.hexHeight / 4).toString());
-            point.setAttribute("cy", (hex.centerY() + hex.cityOffsetY * Hex.hexHeight / 4).toString());
+            point.setAttribute("cx", pointX.toString());
+            point.setAttribute("cy", pointY.toString());
             point.setAttribute("r", (Hex.hexHeight / 6).toString());
             cityMarker.appendChild(point);
 
             if(hex.isMajorPort()){
                 const scale = Hex.hexWidth / 2;
                 const portMarker = document.createElementNS("http://www.w3.org/2000/svg", "path");
-                portMarker.setAttribute("transform", `translate(${hex.centerX() + hex.cityOffsetX * Hex.hexHeight / 4}, ${hex.centerY() + hex.cityOffsetY * Hex.hexHeight / 4}) scale(${scale})`);
+                portMarker.setAttribute("transform", `translate(${pointX}, ${pointY}) scale(${scale})`);
                 portMarker.setAttribute("d", "M0,-0.2 V0.35 M-0.2,-0.05 h0.4 M-0.3,0.15 a0.6,1.5,0,0,0,0.6,0 M0,-0.2 a0.09,0.09,0,0,0,0,-0.18 a0.09,0.09,0,0,0,0,0.18");
                 portMarker.setAttribute("fill", "none");
                 portMarker.setAttribute("stroke", "#33bbff");
@@ -44,28 +48,9 @@ namespace HexMarker {
             }
 
             const label = document.createElementNS("http://www.w3.org/2000/svg", "text");
-            let labelOffsetX = 0;
-            let labelOffsetY = 0;
-            switch(hex.cityAlignment){
-            case "l":
-                label.setAttribute("text-anchor", "end");
-                labelOffsetX = -1;
-                break;
-            case "r":
-                label.setAttribute("text-anchor", "start");
-                labelOffsetX = 1;
-                break;
-            case "t":
-                label.setAttribute("text-anchor", "middle");
-                labelOffsetY = -2;
-                break;
-            case "b":
-                label.setAttribute("text-anchor", "middle");
-                labelOffsetY = 2;
-                break;
-            }
-            label.setAttribute("x", (hex.centerX() + (hex.cityOffsetX + labelOffsetX) * Hex.hexHeight / 4).toString());
-            label.setAttribute("y", (hex.centerY() + (hex.cityOffsetY + labelOffsetY + 0.6) * Hex.hexHeight / 4).toString());
+            label.setAttribute("text-anchor", textAnchors[hex.cityAlignment]);
+            label.setAttribute("x", labelX.toString());
+            label.setAttribute("y", labelY.toString());
             label.setAttribute("font-size", (Hex.hexHeight * 0.6) + "px");
             label.setAttribute("font-weight", "bold");
             cityMarker.appendChild(label);
@@ -222,29 +207,17 @@ namespace HexMarker {
         x /= Hex.hexWidth;
         y /= Hex.hexHeight;
 
-        //Find the x position in the hex (will be between 0 and 1). If it's greater than 1/3, we know the x coordinate of the hex, otherwise we need to look at y (if it's on the right side of the hex it will be between 0 and 1/3 of the next hex).
-        const xPositionInHex = x % 1;
-        const yPositionInHex = y % 1;    //This won't be the actual y position in odd hexes, but it doesn't matter since we only use this to find the x coordinate of the hex.
-
-        //Find the x coordinate of the hex. If xPositionInHex is greater than 1/3 this is correct, otherwise we might need to adjust it.
-        let hexX = Math.floor(x);
-
-        //Adjust hexX if needed
-        if(xPositionInHex < 1/3){
-            if(hexX % 2 === 0){
-                if((yPositionInHex < 1/2 && xPositionInHex/2 + yPositionInHex/3 < 1/6) || (yPositionInHex > 1/2 && xPositionInHex/2 - yPositionInHex/3 < -1/6)){
-                    hexX--;
-                }
-            }
-            else{
-                if((yPositionInHex < 1/2 && xPositionInHex/2 - yPositionInHex/3 < 0) || (yPositionInHex > 1/2 && xPositionInHex/2 + yPositionInHex/3 < 1/3)){
-                    hexX--;
-                }
-            }
-        }
-
-        //Now that we know if x is odd or even, finding the y coordinate of the hex is easy
-        const hexY = Math.floor(hexX % 2 ? (y - 1/2) : y);
+        //Every hexside is either on an edge or on a diagonal of the cells that are 1/3 wide and 1/2 high, and the hexes repeat every 6 cells horizontally and 2 cells vertically. The lookup table from the mapsheet compiler has 5 numbers for each of those 12 cells: 0 if the cell is in one hex, 1 if it's split from the top left to the bottom right corner or 2 if from the bottom left to the top right corner, then the column and row of the hex left of the diagonal and of the hex right of it, relative to the first hex of the repeating part.
+        const cellX = Math.floor(x * 3);
+        const cellY = Math.floor(y * 2);
+        const xPositionInCell = x * 3 - cellX;
+        const yPositionInCell = y * 2 - cellY;
+        const repeatX = Math.floor(cellX / 6);
+        const repeatY = Math.floor(cellY / 2);
+        const i = 5 * (cellX - 6 * repeatX + 6 * (cellY - 2 * repeatY));
+        const rightOfDiagonal = hexLookupTable[i] === 1 ? xPositionInCell > yPositionInCell : hexLookupTable[i] === 2 && xPositionInCell + yPositionInCell > 1;
+        const hexX = 2 * repeatX + hexLookupTable[i + (rightOfDiagonal ? 3 : 1)];
+        const hexY = repeatY + hexLookupTable[i + (rightOfDiagonal ? 4 : 2)];
 
         return Hex.fromCoordinates(hexX, hexY) ?? null;    //This can return undefined if it's out of range. When calling fromCoordinates directly that should never happen, but when calling hexAtPoint() that can happen.
     }
@@ -1,9 +1,20 @@
 import { Hex } from "../model/mapsheet.js";
 
+import { mapsheetUrl } from "./init/mapsheet-files.js";
+
 namespace PanZoom {
     let panZoomInstance: SvgPanZoom.Instance;
     let zoomFactor: number;
 
+    let levelsOfDetail: Array<number> = [];
+    let worldMapPaths: Array<SVGPathElement> = [];
+    const levelPaths = new Map<number, Promise<Array<string | null>>>();
+    let currentLevel = 0;
+    let requestedLevel = 0;
+
+    let tileManifest: {tileWidth: number, tileHeight: number, tiles: Array<string>} | null = null;
+    let tilesToLoad = new Set<string>();
+
     /**
      * Fixes the pan so that it's within the limits.
      */
@@ -36,14 +47,121 @@ namespace PanZoom {
             controlIconsEnabled: true,
             minZoom: Math.max(mapsheet.clientWidth / mapsheet.clientHeight, mapsheet.clientHeight / mapsheet.clientWidth),
             maxZoom: 50,
-            onPan: fixPanLimits,
-            onZoom: fixPanLimits
+            onPan: () => {
+                fixPanLimits();
+                loadVisibleTiles();
+            },
+            onZoom: () => {
+                fixPanLimits();
+                updateLevelOfDetail();
+                loadVisibleTiles();
+            }
         });
 
         zoomFactor = Math.max(
             Hex.svgWidth / mapsheet.clientWidth,
             Hex.svgHeight / mapsheet.clientHeight
         );
+
+        //world.xml contains the coarsest level of detail of the world map, the other levels are downloaded when they're first needed
+        const worldMap = document.querySelector<SVGGElement>("#worldMap > g");
+        levelsOfDetail = worldMap?.dataset.levelsOfDetail?.split(",").map(Number) ?? [];
+        worldMapPaths = Array.from(worldMap?.querySelectorAll("path") ?? []);
+        levelPaths.set(0, Promise.resolve(worldMapPaths.map(it => it.getAttribute("d"))));
+        updateLevelOfDetail();
+
+        //If the mapsheet was compiled with --tiles, the world map is split into tiles that are downloaded when they become visible
+        if(document.getElementById("tiles") !== null){
+            fetch(mapsheetUrl("tiles/manifest.json")).then(it => it.json()).then(it => {
+                tileManifest = it;
+                tilesToLoad = new Set(it.tiles);
+                loadVisibleTiles();
+            });
+        }
+    }
+
+    /**
+     * Downloads the tiles of the world map that are visible and haven't been downloaded yet. Tiles are kept after they've been downloaded.
+     */
+    function loadVisibleTiles(): void {
+        if(tileManifest === null || tilesToLoad.size === 0){
+            return;
+        }
+
+        const mapsheet = document.getElementById("mapsheet")!!;
+        const tiles = document.getElementById("tiles")!!;
+        const {x, y} = instance().getPan();
+        const [left, top] = clientPixelToSvgPixel(-x, -y);
+        const [right, bottom] = clientPixelToSvgPixel(-x + mapsheet.clientWidth, -y + mapsheet.clientHeight);
+        for(let tileX = Math.floor(left / tileManifest.tileWidth); tileX <= Math.floor(right / tileManifest.tileWidth); tileX++){
+            for(let tileY = Math.floor(top / tileManifest.tileHeight); tileY <= Math.floor(bottom / tileManifest.tileHeight); tileY++){
+                const tile = `${tileX}-${tileY}`;
+                if(tilesToLoad.delete(tile)){
+                    fetch(mapsheetUrl(`tiles/${tile}.xml`)).then(it => {
+                        if(!it.ok){
+                            throw new Error(`Couldn't download tile ${tile}: ${it.status} ${it.statusText}`);
+                        }
+                        return it.text();
+                    }).then(it => tiles.insertAdjacentHTML("beforeend", it)).catch(error => {
+                        //The tile is removed from tilesToLoad while it's downloading so that it's only downloaded once, put it back so that it's tried again the next time it's visible
+                        tilesToLoad.add(tile);
+                        console.warn(error);
+                    });
+                }
+            }
+        }
+    }
+
+    /**
+     * Shows the level of detail of the world map that fits the current zoom, so that the map is fast to draw when zoomed out and detailed when zoomed in.
+     */
+    async function updateLevelOfDetail(): Promise<void> {
+        if(levelsOfDetail.length === 0){
+            return;
+        }
+
+        const hexPixels = Hex.hexWidth * getAbsoluteZoom();
+        const index = levelsOfDetail.findIndex(it => hexPixels <= it);
+        const level = index === -1 ? levelsOfDetail.length - 1 : index;
+        if(level === requestedLevel){
+            return;
+        }
+        requestedLevel = level;
+
+        if(!levelPaths.has(level)){
+            levelPaths.set(level, fetch(mapsheetUrl(`world-${level}.json`)).then(it => {
+                if(!it.ok){
+                    throw new Error(`Couldn't download world-${level}.json: ${it.status} ${it.statusText}`);
+                }
+                return it.json();
+            }));
+        }
+        const download = levelPaths.get(level)!!;
+        let paths: Array<string | null>;
+        try{
+            paths = await download;
+        }
+        catch(error){
+            //Forget the failed download so that it's tried again the next time the zoom needs this level
+            if(levelPaths.get(level) === download){
+                levelPaths.delete(level);
+            }
+            if(level === requestedLevel){
+                requestedLevel = currentLevel;
+            }
+            console.warn(error);
+            return;
+        }
+        if(level !== requestedLevel){
+            return;    //The zoom changed while downloading
+        }
+        for(let i = 0; i < paths.length; i++){
+            const d = paths[i];
+            if(d !== null){
+                worldMapPaths[i].setAttribute("d", d);
+            }
+        }
+        currentLevel = level;
     }
 
     /**
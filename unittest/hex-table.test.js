@@ -0,0 +1,80 @@
+import { expect, test } from "vitest";
+import { readFileSync } from "fs";
+
+import { Hex, TerrainType, WeatherZone } from "../build/model/mapsheet.js";
+import { Countries } from "../build/model/countries.js";
+import { loadHexTable } from "../build/model/mapsheet/hex-table.js";
+
+//The 4 × 3 mapsheet from tinyMapsheet in /mapsheet/test_compile_mapsheet.py, which writes tables/hexes.bin
+//Importing mapsheet.js has already created the hexes of the real mapsheet, but the hex indices in the table start from 0
+Hex.allHexes.length = 0;
+const file = readFileSync(new URL("tables/hexes.bin", import.meta.url));
+loadHexTable(file.buffer.slice(file.byteOffset, file.byteOffset + file.byteLength));
+
+test("Hex table columns", () => {
+    expect(Hex.allHexes.length).toBe(12);
+    expect(Hex.allHexes.indexOf(Hex.fromCoordinates(2, 1))).toBe(7);
+
+    const sea = Hex.fromCoordinates(0, 0);
+    expect(sea.terrain).toBe(TerrainType.Sea);
+    expect(sea.weatherZone).toBe(WeatherZone.Fair);
+    expect(sea.country).toBe(null);
+    expect(sea.city).toBe(null);
+
+    const berlin = Hex.fromCoordinates(1, 1);
+    expect(berlin.terrain).toBe(TerrainType.Coastal);
+    expect(berlin.country).toBe(Countries.germany);
+    expect(berlin.city).toBe("Berlin");
+    expect(berlin.cityAlignment).toBe("l");
+    expect(berlin.cityOffsetX).toBe(0.5);
+    expect(berlin.cityOffsetY).toBe(-0.5);
+    expect(berlin.isCapital).toBe(true);
+    expect(berlin.isMajorPort()).toBe(true);
+    expect(berlin.isEnclaveCity).toBe(false);
+    expect(berlin.canUseRail).toBe(false);
+
+    const mountain = Hex.fromCoordinates(2, 1);
+    expect(mountain.terrain).toBe(TerrainType.CoastalMountain);
+    expect(mountain.weatherZone).toBe(WeatherZone.NorthTemperate);
+    expect(mountain.country).toBe(Countries.france);
+    expect(mountain.canUseRail).toBe(true);
+    expect(mountain.isResourceHex).toBe(true);
+    expect(mountain.city).toBe(null);
+    expect(mountain.cityAlignment).toBe("r");
+
+    const colony = Hex.fromCoordinates(3, 2);
+    expect(colony.country).toBe(Countries.france);
+    expect(colony.secondaryController).toBe(Countries.germany);
+    expect(colony.isColony).toBe(true);
+    expect(colony.isIndia).toBe(false);
+});
+
+test("Hex table neighbors", () => {
+    const coordinates = hexes => hexes.map(it => [it.x, it.y]);
+
+    //In side order: top, top left, bottom left, bottom, bottom right, top right
+    expect(coordinates(Hex.fromCoordinates(1, 0).adjacentLandHexes())).toEqual([[1, 1], [2, 1], [2, 0]]);
+    expect(coordinates(Hex.fromCoordinates(1, 1).adjacentLandHexes())).toEqual([[1, 0], [2, 1]]);
+    expect(coordinates(Hex.fromCoordinates(2, 0).adjacentLandHexes())).toEqual([[1, 0], [2, 1]]);
+    expect(coordinates(Hex.fromCoordinates(2, 1).adjacentLandHexes())).toEqual([[2, 0], [1, 0], [1, 1]]);
+    expect(coordinates(Hex.fromCoordinates(3, 2).adjacentLandHexes())).toEqual([]);
+    expect(coordinates(Hex.fromCoordinates(0, 0).adjacentLandHexes())).toEqual([]);
+
+    expect(coordinates(Hex.fromCoordinates(0, 0).adjacentSeaHexes())).toEqual([[0, 1], [1, 0]]);
+    expect(coordinates(Hex.fromCoordinates(1, 1).adjacentSeaHexes())).toEqual([[0, 1], [0, 2], [1, 2], [2, 2]]);
+    expect(coordinates(Hex.fromCoordinates(3, 2).adjacentSeaHexes())).toEqual([[3, 1], [2, 2]]);
+
+    //Both hexes of a hexside agree on it
+    for(let hex of Hex.allHexes){
+        for(let adjacentHex of hex.adjacentLandHexes()){
+            expect(adjacentHex.adjacentLandHexes()).toContain(hex);
+        }
+        for(let adjacentHex of hex.adjacentSeaHexes()){
+            expect(adjacentHex.adjacentSeaHexes()).toContain(hex);
+        }
+    }
+});
+
+test("Invalid hex table", () => {
+    expect(() => loadHexTable(new ArrayBuffer(28))).toThrow();
+});
@@ -0,0 +1,38 @@
+import { expect, test } from "vitest";
+import { readFileSync } from "fs";
+
+import { landmarkDistanceLowerBound, loadLandmarkTable } from "../build/model/mapsheet/landmark-table.js";
+
+//The 4 × 3 mapsheet from tinyMapsheet in /mapsheet/test_compile_mapsheet.py, which writes tables/landmarks.bin
+//landmarkDistanceLowerBound only needs the coordinates of the hexes
+const file = readFileSync(new URL("tables/landmarks.bin", import.meta.url));
+const hex = (x, y) => ({x: x, y: y});
+
+test("No landmark table", () => {
+    loadLandmarkTable(null);
+    expect(landmarkDistanceLowerBound(hex(1, 0), hex(3, 2), true)).toBe(0);
+    expect(landmarkDistanceLowerBound(hex(0, 0), hex(3, 2), false)).toBe(0);
+});
+
+test("Landmark lower bounds", () => {
+    loadLandmarkTable(file.buffer.slice(file.byteOffset, file.byteOffset + file.byteLength));
+
+    //The land landmarks are at 1, 0, at 3, 2 and at the capital 1, 1
+    expect(landmarkDistanceLowerBound(hex(1, 1), hex(2, 0), true)).toBe(2);
+    expect(landmarkDistanceLowerBound(hex(2, 0), hex(1, 1), true)).toBe(2);
+    expect(landmarkDistanceLowerBound(hex(1, 0), hex(1, 1), true)).toBe(1);
+    expect(landmarkDistanceLowerBound(hex(3, 2), hex(3, 2), true)).toBe(0);
+
+    //3, 2 is an island of its own
+    expect(landmarkDistanceLowerBound(hex(1, 0), hex(3, 2), true)).toBe(Infinity);
+    expect(landmarkDistanceLowerBound(hex(3, 2), hex(2, 1), true)).toBe(Infinity);
+
+    //The shortest way by sea goes past the coastal hex 1, 1 in 4 steps
+    expect(landmarkDistanceLowerBound(hex(0, 0), hex(3, 2), false)).toBe(4);
+    expect(landmarkDistanceLowerBound(hex(3, 2), hex(0, 0), false)).toBe(4);
+    expect(landmarkDistanceLowerBound(hex(0, 0), hex(0, 1), false)).toBeLessThanOrEqual(1);
+});
+
+test("Invalid landmark table", () => {
+    expect(() => loadLandmarkTable(new ArrayBuffer(24))).toThrow();
+});